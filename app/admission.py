@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Admission Control
+=================
+
+Load shedding and priority scheduling in front of generation for /query
+and /query/stream.
+
+- At most `max_in_flight` requests hold a generation slot
+- Two priority classes, each with its own bounded FIFO wait queue:
+  - interactive (clinicians, frontend): queued ahead of all batch work
+  - batch (evaluation / benchmark scripts): at most `batch_max_in_flight`
+    slots, so interactive requests always find headroom, but guaranteed
+    `batch_min_in_flight` slots while batch work is queued (fair share,
+    batch never starves)
+- A full queue rejects at once with 429
+- Deadline aware: a request whose estimated wait (queue position x average
+  generation time) exceeds its class `max_wait` is rejected at once with
+  503, and one still queued after `max_wait` gives up with 503
+- Rejections carry a Retry-After estimate
+- Answers that need no generation (no context, confidence-gated) never
+  take a slot
+
+Without a limit, a traffic spike queues every request behind Ollama until
+the client timeout and all of them fail; with it, admitted requests keep a
+bounded latency and the rest fail fast.
+
+The priority class comes from the request (`priority` field), capped by the
+caller's role: roles listed in [admission.role_priority] as "batch" cannot
+ask for interactive service.
+
+All methods run on the event loop (no locks needed).
+
+Usage:
+    from app.admission import AdmissionController, AdmissionRejected
+
+    admission = AdmissionController.from_config(config["admission"])
+    async with admission.slot(priority="batch"):
+        result = await asyncio.to_thread(rag.generate_answer, prepared)
+"""
+
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from app.metrics import ADMISSION, STAGE_SECONDS
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+
+class AdmissionRejected(Exception):
+    """Request not admitted (status_code 429 or 503, retry_after seconds)"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class Ticket:
+    """A held generation slot; release() is idempotent"""
+
+    def __init__(self, controller: "AdmissionController", priority: str, wait_time: float):
+        self._controller = controller
+        self.priority = priority
+        self.wait_time = wait_time
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if self.released:
+            return
+        self.released = True
+        self._controller._release(self.priority, time.monotonic() - self.admitted_at)
+
+
+class AdmissionController:
+    """In-flight limit with bounded, deadline-aware, per-priority FIFO queues"""
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        max_queue: int = 16,
+        max_wait: float = 30.0,
+        batch_max_in_flight: Optional[int] = None,
+        batch_min_in_flight: int = 1,
+        batch_max_queue: int = 64,
+        batch_max_wait: float = 300.0,
+        role_priority: Optional[Dict[str, str]] = None,
+        initial_service_time: float = 10.0,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            max_in_flight: Requests generating at once (all classes)
+            max_queue: Interactive requests allowed to wait for a slot
+            max_wait: Max seconds an interactive request may wait
+            batch_max_in_flight: Slots batch work may hold (default: max_in_flight - 1)
+            batch_min_in_flight: Slots batch work gets first while it has requests queued
+            batch_max_queue: Batch requests allowed to wait for a slot
+            batch_max_wait: Max seconds a batch request may wait
+            role_priority: JWT role -> highest priority class it may use
+            initial_service_time: Generation time estimate before any is measured
+            enabled: False admits everything (slots are still counted)
+        """
+        if batch_max_in_flight is None:
+            batch_max_in_flight = max(1, max_in_flight - 1)
+
+        self.max_in_flight = max_in_flight
+        self.batch_max_in_flight = min(batch_max_in_flight, max_in_flight)
+        self.batch_min_in_flight = min(batch_min_in_flight, self.batch_max_in_flight)
+        self.max_queue = {INTERACTIVE: max_queue, BATCH: batch_max_queue}
+        self.max_wait = {INTERACTIVE: max_wait, BATCH: batch_max_wait}
+        self.role_priority = role_priority or {}
+        self.enabled = enabled
+
+        self.in_flight = 0
+        self._in_flight = {p: 0 for p in PRIORITIES}
+        self._waiters: Dict[str, deque] = {p: deque() for p in PRIORITIES}  # asyncio futures, FIFO
+        self._service_time = initial_service_time  # EWMA of slot hold time
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "AdmissionController":
+        """Create controller from the [admission] section of rag_config.toml"""
+        return cls(
+            max_in_flight=config.get("max_in_flight", 4),
+            max_queue=config.get("max_queue", 16),
+            max_wait=config.get("max_wait", 30.0),
+            batch_max_in_flight=config.get("batch_max_in_flight"),
+            batch_min_in_flight=config.get("batch_min_in_flight", 1),
+            batch_max_queue=config.get("batch_max_queue", 64),
+            batch_max_wait=config.get("batch_max_wait", 300.0),
+            role_priority=config.get("role_priority", {}),
+            initial_service_time=config.get("initial_service_time", 10.0),
+            enabled=config.get("enabled", True)
+        )
+
+    def resolve_priority(self, requested: Optional[str], role: Optional[str]) -> str:
+        """
+        Priority class for a request.
+
+        Args:
+            requested: Explicit class from the request (None = interactive)
+            role: Caller's JWT role; a role mapped to "batch" is capped at batch
+        """
+        if requested is not None and requested not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {requested}")
+
+        if self.role_priority.get(role) == BATCH:
+            return BATCH
+        return requested or INTERACTIVE
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    def queued_by_priority(self) -> Dict[str, int]:
+        return {p: len(q) for p, q in self._waiters.items()}
+
+    def estimated_wait(self, priority: str = INTERACTIVE) -> float:
+        """Seconds until a new request of this class would get a slot"""
+        if priority == INTERACTIVE:
+            ahead, slots = len(self._waiters[INTERACTIVE]), self.max_in_flight
+        else:
+            ahead, slots = self.queued, self.batch_max_in_flight
+
+        if ahead == 0 and self.in_flight < self.max_in_flight and (
+            priority == INTERACTIVE or self._in_flight[BATCH] < self.batch_max_in_flight
+        ):
+            return 0.0
+        rounds = ahead // slots + 1
+        return rounds * self._service_time
+
+    def bypass(self, priority: str = INTERACTIVE):
+        """Count a request answered without generation (gated, no context)"""
+        ADMISSION.inc(priority=priority, outcome="bypassed")
+
+    async def acquire(self, max_wait: Optional[float] = None, priority: str = INTERACTIVE) -> Ticket:
+        """
+        Wait for a generation slot.
+
+        Args:
+            max_wait: Deadline for this request (default: the class max_wait)
+            priority: "interactive" or "batch"
+
+        Raises:
+            AdmissionRejected: queue full (429) or deadline cannot be met (503)
+        """
+        class_wait = self.max_wait[priority]
+        max_wait = class_wait if max_wait is None else min(max_wait, class_wait)
+        start = time.monotonic()
+
+        if not self.enabled:
+            self.in_flight += 1
+            self._in_flight[priority] += 1
+            return self._admit(priority, start)
+
+        if len(self._waiters[priority]) >= self.max_queue[priority]:
+            ADMISSION.inc(priority=priority, outcome="rejected_full")
+            raise AdmissionRejected(
+                429, f"Server busy: {len(self._waiters[priority])} {priority} requests already queued",
+                self.estimated_wait(priority)
+            )
+
+        estimate = self.estimated_wait(priority)
+        if estimate > max_wait:
+            ADMISSION.inc(priority=priority, outcome="rejected_deadline")
+            raise AdmissionRejected(
+                503, f"Server busy: estimated wait {estimate:.1f}s exceeds {max_wait:.1f}s",
+                estimate
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        self._dispatch()
+        if waiter.done():
+            return self._admit(priority, start)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max_wait)
+        except asyncio.TimeoutError:
+            if not self._abandon(priority, waiter):
+                return self._admit(priority, start)  # Slot granted as we timed out
+            ADMISSION.inc(priority=priority, outcome="timed_out")
+            raise AdmissionRejected(
+                503, f"Server busy: no generation slot within {max_wait:.1f}s",
+                self.estimated_wait(priority)
+            )
+        except asyncio.CancelledError:
+            # Client went away while queued; give back a slot we may already hold
+            if not self._abandon(priority, waiter):
+                self._release(priority, None)
+            raise
+
+        return self._admit(priority, start)
+
+    @asynccontextmanager
+    async def slot(self, max_wait: Optional[float] = None, priority: str = INTERACTIVE):
+        """`async with` form of acquire(); releases the slot on exit"""
+        ticket = await self.acquire(max_wait, priority)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "in_flight_by_priority": dict(self._in_flight),
+            "queued": self.queued_by_priority(),
+            "max_in_flight": self.max_in_flight,
+            "batch_max_in_flight": self.batch_max_in_flight,
+            "batch_min_in_flight": self.batch_min_in_flight,
+            "max_queue": dict(self.max_queue),
+            "max_wait": dict(self.max_wait),
+            "avg_service_time": round(self._service_time, 3),
+            "estimated_wait": {p: round(self.estimated_wait(p), 3) for p in PRIORITIES},
+        }
+
+    def _admit(self, priority: str, start: float) -> Ticket:
+        wait_time = time.monotonic() - start
+        ADMISSION.inc(priority=priority, outcome="admitted")
+        STAGE_SECONDS.observe(wait_time, stage="admission_wait")
+        return Ticket(self, priority, wait_time)
+
+    def _next_priority(self) -> Optional[str]:
+        """Class of the next waiter to start (None if nobody may start)"""
+        batch_waiting = bool(self._waiters[BATCH])
+        batch_running = self._in_flight[BATCH]
+
+        # Fair share first: batch keeps its guaranteed slots
+        if batch_waiting and batch_running < self.batch_min_in_flight:
+            return BATCH
+        if self._waiters[INTERACTIVE]:
+            return INTERACTIVE
+        if batch_waiting and batch_running < self.batch_max_in_flight:
+            return BATCH
+        return None
+
+    def _dispatch(self):
+        """Start waiters while slots are free"""
+        while self.in_flight < self.max_in_flight:
+            priority = self._next_priority()
+            if priority is None:
+                return
+            waiter = self._waiters[priority].popleft()
+            if waiter.done():  # Cancelled while queued
+                continue
+            self.in_flight += 1
+            self._in_flight[priority] += 1
+            waiter.set_result(True)
+
+    def _abandon(self, priority: str, waiter: asyncio.Future) -> bool:
+        """Remove a waiter; False if it had already been granted a slot"""
+        if waiter.done() and not waiter.cancelled():
+            return False
+        waiter.cancel()
+        try:
+            self._waiters[priority].remove(waiter)
+        except ValueError:
+            pass
+        return True
+
+    def _release(self, priority: str, held: Optional[float]):
+        """Free a slot, start the next waiter and update the estimate"""
+        if held is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * held
+
+        self.in_flight -= 1
+        self._in_flight[priority] -= 1
+        self._dispatch()
@@ -4,14 +4,26 @@ FastAPI Endpoints
 =================
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import StreamingResponse
-from app.schemas import QueryRequest, QueryResponse, HealthStatus, TokenRequest, TokenResponse
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from app.schemas import (
+    BatchQueryRequest, BatchRetrieveRequest, BatchRetrieveResponse, JobStatus, QueryRequest, QueryResponse,
+    HealthStatus, RetrieveRequest, RetrieveResponse, TokenRequest, TokenResponse
+)
 from app.pipeline import HealthcareRAG
-from app.deps import get_current_user
-from app.security import authenticate_user, create_access_token
+from app.deps import get_current_user, get_admin_user
+from app.security import authenticate_user, create_access_token, LoginBusyError, LoginRateLimitError
+from app.admission import BATCH, AdmissionController, AdmissionRejected
+from app.jobs import FINISHED, JobConflict, JobManager, JobQueueFull
+from app.metrics import ADMISSION_IN_FLIGHT, ANSWERS, LOGIN_ATTEMPTS, QUEUE_DEPTH
+from app.profiling import PROFILER
+from app.serialization import (
+    FastJSONResponse, FrameStats, SSEEncoder, coalesce_tokens, dumps, negotiate_encoding, sse_event
+)
+from typing import Optional
+import asyncio
 import logging
-import json
+import time
 
 router = APIRouter()
 
@@ -23,6 +35,109 @@ except Exception as e:
     logging.error(f"Failed to initialize RAG: {e}")
     rag = None
 
+# Generation admission control ([admission] section)
+admission = AdmissionController.from_config(rag.config.get("admission", {}) if rag else {})
+QUEUE_DEPTH.add_source(
+    lambda: {(f"admission:{p}",): n for p, n in admission.queued_by_priority().items()}
+)
+ADMISSION_IN_FLIGHT.add_source(lambda: {(): admission.in_flight})
+
+# Response encoding and SSE framing ([api] section)
+api_config = rag.config.get("api", {}) if rag else {}
+STREAM_COALESCE = api_config.get("stream_coalesce_ms", 30) / 1000
+STREAM_MAX_TOKENS = api_config.get("stream_max_tokens", 16)
+STREAM_COMPRESSION = api_config.get("stream_compression", ["br", "gzip"])
+VALIDATE_RESPONSES = api_config.get("validate_responses", False)
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """StreamingResponse that releases its admission ticket however it ends"""
+    
+    def __init__(self, content, ticket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Covers disconnects before the body generator ever started
+            self.ticket.release()
+
+
+def _query_content(result: dict) -> dict:
+    """
+    QueryResponse fields of a pipeline result, as a JSON-ready dict.
+    
+    Pipeline results are built internally with the right types, so by
+    default they are only trimmed to the schema (extra keys such as
+    "gated" dropped, defaults filled in) instead of re-validated field by
+    field; [api] validate_responses = true restores full validation.
+    """
+    if VALIDATE_RESPONSES:
+        return QueryResponse(**result).model_dump()
+    return {
+        name: result.get(name, field.default)
+        for name, field in QueryResponse.model_fields.items()
+    }
+
+
+def _rejected(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+
+
+async def _run_admitted(ticket, fn, *args, **kwargs):
+    """
+    Run fn in a worker thread while holding an admission ticket.
+    
+    The slot is released when the thread finishes, not when the caller is
+    cancelled (threads cannot be interrupted; generation keeps running).
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+    future.add_done_callback(lambda f: (ticket.release(), f.cancelled() or f.exception()))
+    return await asyncio.shield(future)
+
+
+async def _answer_job(
+    query: str,
+    max_tokens: int,
+    temperature: float,
+    compress_context: Optional[bool],
+    priority: str,
+    **prepare_kwargs
+) -> dict:
+    """
+    Job runner: the /query path (retrieval, then admitted generation).
+    
+    Runs on the event loop for a JobManager worker thread. A job waits and
+    retries while admission is full instead of failing.
+    """
+    prepared = await asyncio.to_thread(rag.prepare_answer, query, **prepare_kwargs)
+    if prepared.response is not None:
+        admission.bypass(priority)
+        return prepared.response
+    
+    while True:
+        try:
+            ticket = await admission.acquire(priority=priority)
+            break
+        except AdmissionRejected as e:
+            await asyncio.sleep(max(1.0, e.retry_after))
+    
+    return await _run_admitted(
+        ticket,
+        rag.generate_answer,
+        prepared,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        compress_context=compress_context,
+        priority=priority
+    )
+
+
+# Asynchronous answer jobs ([jobs] section; workers started by the API on startup)
+jobs = JobManager.from_config(_answer_job, rag.config.get("jobs", {})) if rag else None
+
 
 @router.post("/token", response_model=TokenResponse, status_code=status.HTTP_200_OK)
 async def login(payload: TokenRequest):
@@ -35,16 +150,39 @@ async def login(payload: TokenRequest):
     Demo credentials:
     - admin@transplant.ai / admin123
     - researcher@transplant.ai / research123
+    
+    Returns 429 after too many attempts for one username and 503 when the
+    password verification queue is full (both with Retry-After).
     """
-    user = authenticate_user(payload.username, payload.password)
+    try:
+        user = await authenticate_user(payload.username, payload.password)
+    
+    except LoginRateLimitError as e:
+        LOGIN_ATTEMPTS.inc(outcome="rate_limited")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, round(e.retry_after)))},
+        )
+    
+    except LoginBusyError as e:
+        LOGIN_ATTEMPTS.inc(outcome="busy")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, round(e.retry_after)))},
+        )
     
     if not user:
+        LOGIN_ATTEMPTS.inc(outcome="invalid")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    LOGIN_ATTEMPTS.inc(outcome="success")
+    
     # Create access token
     access_token = create_access_token(
         data={"sub": user["username"], "role": user["role"]}
@@ -69,8 +207,23 @@ async def query_rag(
     - **top_k**: Number of context chunks to retrieve (1-10)
     - **max_tokens**: Maximum tokens in response (128-2048)
     - **model**: Ollama model name (default: phi3:mini)
+    - **organ_filter** / **tier_filter**: Answer from one organ / tier only
+      (400 for values not in the knowledge base)
     
     Requires: Bearer token in Authorization header
+    
+    Generation is admission-controlled: 429 when the wait queue is full,
+    503 when no slot is free within [admission] max_wait (both with
+    Retry-After). No-context and confidence-gated answers skip the queue.
+    
+    Generated answers are cached ([cache], shared by all workers): the same
+    question with the same options is answered from the cache without
+    retrieval or a generation slot (`cached: true`). Debug requests bypass
+    the cache.
+    
+    - **priority**: "batch" for evaluation/benchmark traffic; interactive
+      requests are scheduled first (roles in [admission.role_priority]
+      mapped to "batch" always run as batch)
     """
     if rag is None:
         raise HTTPException(
@@ -78,21 +231,62 @@ async def query_rag(
             detail="RAG system not initialized"
         )
     
+    priority = admission.resolve_priority(payload.priority, user.get("role"))
+    
+    answer_cache = rag.cache.answers if not payload.debug else None
+    cache_params = payload.model_dump(exclude={"debug", "priority"})
+    
     try:
-        result = rag.answer(
-            query=payload.query,
+        if answer_cache is not None:
+            cached = await asyncio.to_thread(answer_cache.get, cache_params)
+            if cached is not None:
+                admission.bypass(priority)
+                ANSWERS.inc(model=payload.model, outcome="cached")
+                cached.update(user=user.get("sub"), cached=True)
+                return FastJSONResponse(_query_content(cached))
+        
+        # Retrieval + confidence gating (no generation slot needed)
+        prepared = await asyncio.to_thread(
+            rag.prepare_answer,
+            payload.query,
             top_k=payload.top_k,
-            max_tokens=payload.max_tokens,
             model=payload.model,
-            temperature=payload.temperature,
             answer_mode=payload.answer_mode,
-            confidence_threshold=payload.confidence_threshold
+            confidence_threshold=payload.confidence_threshold,
+            rerank=payload.rerank,
+            debug=payload.debug,
+            organ_filter=payload.organ_filter,
+            tier_filter=payload.tier_filter
         )
         
+        if prepared.response is not None:
+            # No context / gated: answered without generation
+            admission.bypass(priority)
+            result = prepared.response
+        else:
+            # Slot held until generation ends, even if the client disconnects
+            ticket = await admission.acquire(priority=priority)
+            result = await _run_admitted(
+                ticket,
+                rag.generate_answer,
+                prepared,
+                max_tokens=payload.max_tokens,
+                temperature=payload.temperature,
+                compress_context=payload.compress_context,
+                priority=priority
+            )
+            # Failed generations (Ollama errors) must not be served for answer_ttl_hours
+            if answer_cache is not None and not result.get("error"):
+                await asyncio.to_thread(answer_cache.put, cache_params, result)
+        
         # Add user info to response
         result["user"] = user.get("sub")
         
-        return QueryResponse(**result)
+        # Returned as a Response, so FastAPI does not validate it again
+        return FastJSONResponse(_query_content(result))
+    
+    except AdmissionRejected as e:
+        raise _rejected(e)
     
     except ValueError as e:
         raise HTTPException(
@@ -111,12 +305,23 @@ async def query_rag(
 @router.post("/query/stream", status_code=status.HTTP_200_OK)
 async def query_rag_stream(
     payload: QueryRequest,
+    request: Request,
     user: dict = Depends(get_current_user)
 ):
     """
     Query the medical RAG system with streaming response (Protected endpoint)
     
     Returns Server-Sent Events (SSE) stream with real-time token generation
+    
+    Tokens are sent in frames: one `token` event (concatenated content)
+    per [api] stream_max_tokens tokens or stream_coalesce_ms, whichever
+    comes first. The stream is compressed (gzip, or br with the brotli
+    package) when the client's Accept-Encoding allows it and the encoding
+    is listed in [api] stream_compression. The `done` event carries frame
+    statistics (`frames`: tokens, frames, bytes before/after compression).
+    
+    The admission slot is taken before the stream starts (429/503 with
+    Retry-After when busy) and released as soon as generation ends.
     """
     if rag is None:
         raise HTTPException(
@@ -124,22 +329,505 @@ async def query_rag_stream(
             detail="RAG system not initialized"
         )
     
+    try:
+        rag.retriever.validate_filters(payload.organ_filter, payload.tier_filter)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    priority = admission.resolve_priority(payload.priority, user.get("role"))
+    
+    try:
+        ticket = await admission.acquire(priority=priority)
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), STREAM_COMPRESSION)
+    stats = FrameStats()
+    encoder = SSEEncoder(encoding, stats)
+    
     async def generate():
         try:
             # Stream tokens from RAG pipeline
-            async for chunk in rag.answer_stream(
+            events = rag.answer_stream(
                 query=payload.query,
                 top_k=payload.top_k,
                 max_tokens=payload.max_tokens,
                 model=payload.model,
-                temperature=payload.temperature
-            ):
-                yield f"data: {json.dumps(chunk)}\n\n"
+                temperature=payload.temperature,
+                compress_context=payload.compress_context,
+                rerank=payload.rerank,
+                debug=payload.debug,
+                priority=priority,
+                organ_filter=payload.organ_filter,
+                tier_filter=payload.tier_filter
+            )
+            async for chunk in coalesce_tokens(events, STREAM_COALESCE, STREAM_MAX_TOKENS, stats):
+                if chunk.get("type") == "done":
+                    chunk["frames"] = stats.to_dict()
+                yield encoder.event(chunk)
         
         except Exception as e:
             logging.error(f"Streaming query failed: {e}")
             error_data = {"error": str(e), "done": True}
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield encoder.event(error_data)
+        
+        finally:
+            ticket.release()
+        
+        tail = encoder.close()
+        if tail:
+            yield tail
+    
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no"
+    }
+    if STREAM_COMPRESSION:
+        headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    
+    return AdmittedStreamingResponse(
+        generate(),
+        ticket,
+        media_type="text/event-stream",
+        headers=headers
+    )
+
+
+@router.post("/query/batch", status_code=status.HTTP_200_OK)
+async def query_rag_batch(
+    payload: BatchQueryRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Answer many queries in one request (Protected endpoint)
+    
+    Retrieval for all queries runs as one batched embedding + vector search
+    pass; generations then run concurrently, up to each model's concurrency
+    limit, under admission control. Items default to the "batch" priority.
+    
+    Returns NDJSON (one line per query, in completion order):
+    - `{"index": i, "status": 200, "result": {...QueryResponse}}`
+    - `{"index": i, "status": 429|503|500, "error": "...", "retry_after": s}`
+    - final line: `{"done": true, "count": n, "total_time": s}`
+    """
+    if rag is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RAG system not initialized"
+        )
+    
+    start_time = time.time()
+    items = payload.queries
+    priorities = [
+        admission.resolve_priority(item.priority or "batch", user.get("role"))
+        for item in items
+    ]
+    
+    try:
+        prepared = await asyncio.to_thread(rag.prepare_answers, [
+            {
+                "query": item.query,
+                "top_k": item.top_k,
+                "model": item.model,
+                "answer_mode": item.answer_mode,
+                "confidence_threshold": item.confidence_threshold,
+                "rerank": item.rerank,
+                "debug": item.debug,
+                "organ_filter": item.organ_filter,
+                "tier_filter": item.tier_filter
+            }
+            for item in items
+        ])
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    except Exception as e:
+        logging.error(f"Batch retrieval failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal error: {str(e)}"
+        )
+    
+    # Generations per model never exceed what the gateway can run at once
+    model_slots = {
+        model: asyncio.Semaphore(rag.gateway.model_limit(model))
+        for model in {item.model for item in items}
+    }
+    
+    async def run(index: int) -> dict:
+        item, ready, priority = items[index], prepared[index], priorities[index]
+        
+        if ready.response is not None:
+            # No context / gated: answered without generation
+            admission.bypass(priority)
+            result = ready.response
+        else:
+            async with model_slots[item.model]:
+                try:
+                    ticket = await admission.acquire(priority=priority)
+                except AdmissionRejected as e:
+                    return {
+                        "index": index,
+                        "status": e.status_code,
+                        "error": str(e),
+                        "retry_after": e.headers["Retry-After"]
+                    }
+                
+                try:
+                    result = await _run_admitted(
+                        ticket,
+                        rag.generate_answer,
+                        ready,
+                        max_tokens=item.max_tokens,
+                        temperature=item.temperature,
+                        compress_context=item.compress_context,
+                        priority=priority
+                    )
+                except Exception as e:
+                    logging.error(f"Batch query {index} failed: {e}")
+                    return {"index": index, "status": 500, "error": f"Internal error: {str(e)}"}
+        
+        result["user"] = user.get("sub")
+        return {"index": index, "status": 200, "result": _query_content(result)}
+    
+    async def generate():
+        tasks = [asyncio.ensure_future(run(i)) for i in range(len(items))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield dumps(await next_done) + b"\n"
+            
+            yield dumps({
+                "done": True,
+                "count": len(items),
+                "total_time": round(time.time() - start_time, 3)
+            }) + b"\n"
+        
+        finally:
+            # Client disconnected: drop items still waiting for a slot
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _retrieve_content(result, payload: RetrieveRequest) -> dict:
+    """RetrieveResponse for a RetrievalResult, as a JSON-ready dict"""
+    chunks = []
+    for chunk in result.chunks:
+        chunks.append({
+            "chunk_id": chunk.chunk_id,
+            "doc_id": chunk.doc_id,
+            "doc_title": chunk.doc_title,
+            "section_title": chunk.section_title,
+            "organ_type": chunk.organ_type,
+            "tier": chunk.tier,
+            "token_count": chunk.token_count,
+            "similarity_score": round(chunk.similarity_score, 4),
+            "rerank_score": round(chunk.rerank_score, 4) if chunk.rerank_score is not None else None,
+            "rank": chunk.rank,
+            "text": chunk.text if payload.include_text else None
+        })
+    
+    content = {
+        "query": result.query,
+        "chunks": chunks,
+        "total_tokens": result.total_tokens,
+        "retrieval_time": round(result.retrieval_time, 4),
+        "reranked": result.reranked,
+        "routing": result.routing.to_dict() if result.routing is not None else None,
+        "retrieval_timings": result.timings.to_dict() if payload.debug else None
+    }
+    if VALIDATE_RESPONSES:
+        content = RetrieveResponse(**content).model_dump()
+    return content
+
+
+def _retrieve_batch(items: list) -> list:
+    """
+    MedicalRetriever.batch_retrieve for requests with mixed search modes.
+    
+    The hybrid, routing and coarse search toggles apply to a whole batch, so
+    requests are grouped by them: one encode pass per group (filters may
+    differ per query).
+    """
+    groups = {}
+    for index, item in enumerate(items):
+        groups.setdefault((item.hybrid, item.route, item.coarse), []).append(index)
+    
+    results = [None] * len(items)
+    for (hybrid, route, coarse), indexes in groups.items():
+        batch = rag.retriever.batch_retrieve(
+            [items[i].query for i in indexes],
+            top_k=[items[i].top_k for i in indexes],
+            use_reranker=[items[i].rerank for i in indexes],
+            organ_filter=[items[i].organ_filter for i in indexes],
+            tier_filter=[items[i].tier_filter for i in indexes],
+            use_hybrid=hybrid,
+            use_routing=route,
+            use_coarse=coarse
+        )
+        for index, result in zip(indexes, batch):
+            results[index] = result
+    return results
+
+
+@router.post("/retrieve", response_model=RetrieveResponse, status_code=status.HTTP_200_OK)
+async def retrieve(
+    payload: RetrieveRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Retrieval only: deduplicated, budgeted chunks without generation (Protected endpoint)
+    
+    For clients that bring their own generator. Never calls Ollama and
+    never takes an admission slot.
+    
+    - **query**: Search query (5-500 characters)
+    - **top_k**: Number of chunks (1-20)
+    - **organ_filter** / **tier_filter**: Restrict to one organ / tier
+    - **hybrid**: BM25 + vector hybrid search
+    - **route**: Search the predicted organ's chunks first (`routing` in the
+      response shows the decision)
+    - **coarse**: Coarse-to-fine search (best sections first, then their chunks)
+    - **rerank**: Cross-encoder reranking
+    - **include_text**: false returns IDs, metadata and scores only
+    """
+    if rag is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RAG system not initialized"
+        )
+    
+    try:
+        result = await asyncio.to_thread(
+            rag.retriever.retrieve,
+            payload.query,
+            top_k=payload.top_k,
+            organ_filter=payload.organ_filter,
+            tier_filter=payload.tier_filter,
+            use_hybrid=payload.hybrid,
+            use_reranker=payload.rerank,
+            use_routing=payload.route,
+            use_coarse=payload.coarse
+        )
+        return FastJSONResponse(_retrieve_content(result, payload))
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    except Exception as e:
+        logging.error(f"Retrieval failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal error: {str(e)}"
+        )
+
+
+@router.post("/retrieve/batch", response_model=BatchRetrieveResponse, status_code=status.HTTP_200_OK)
+async def retrieve_batch(
+    payload: BatchRetrieveRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Retrieval only for many queries (Protected endpoint)
+    
+    Queries are grouped by their (hybrid, route, coarse) settings; each group
+    is embedded with one encoder call and searched with one vector search
+    call per distinct filter. Results are returned in request order.
+    """
+    if rag is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RAG system not initialized"
+        )
+    
+    start_time = time.time()
+    
+    try:
+        results = await asyncio.to_thread(_retrieve_batch, payload.queries)
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    except Exception as e:
+        logging.error(f"Batch retrieval failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal error: {str(e)}"
+        )
+    
+    return FastJSONResponse({
+        "results": [_retrieve_content(result, item) for result, item in zip(results, payload.queries)],
+        "total_time": round(time.time() - start_time, 4)
+    })
+
+
+def _job_status(request: Request, job: dict) -> JobStatus:
+    result = job["result"]
+    if result is not None:
+        result = {**result, "user": job["owner"]}
+    
+    return JobStatus(
+        job_id=job["id"],
+        status=job["status"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        expires_at=job["expires_at"],
+        result=result,
+        error=job["error"],
+        status_url=request.url_for("job_status", job_id=job["id"]).path,
+        events_url=request.url_for("job_events", job_id=job["id"]).path
+    )
+
+
+async def _owned_job(job_id: str, user: dict) -> dict:
+    """Job visible to this user (owner or admin), else 404"""
+    if jobs is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RAG system not initialized"
+        )
+    
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if job is None or (job["owner"] != user.get("sub") and user.get("role") != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}"
+        )
+    return job
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    payload: QueryRequest,
+    request: Request,
+    response: Response,
+    user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(default=None, max_length=128)
+):
+    """
+    Submit a query as a background job (Protected endpoint)
+    
+    For long answers (answer_mode="detailed", large max_tokens) that would
+    outlive proxy timeouts. Returns 202 with the job ID at once; poll
+    `status_url` or subscribe to `events_url` (SSE) for the result.
+    
+    Submitting the same request again (or the same `Idempotency-Key`
+    header) returns the existing job with 200 unless it failed; reusing an
+    `Idempotency-Key` for a different request returns 409.
+    Jobs generate at batch priority through admission control.
+    Finished jobs are kept for [jobs] ttl_hours.
+    """
+    if jobs is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RAG system not initialized"
+        )
+    
+    try:
+        rag.retriever.validate_filters(payload.organ_filter, payload.tier_filter)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    answer_kwargs = payload.model_dump()
+    answer_kwargs["priority"] = BATCH
+    
+    try:
+        job, created = await asyncio.to_thread(
+            jobs.submit, answer_kwargs, user.get("sub"), idempotency_key
+        )
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Job queue full: {e}",
+            headers={"Retry-After": "30"},
+        )
+    
+    except JobConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    view = _job_status(request, job)
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    response.headers["Location"] = view.status_url
+    return view
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus, status_code=status.HTTP_200_OK)
+async def job_status(job_id: str, request: Request, user: dict = Depends(get_current_user)):
+    """
+    Job status, with the answer once it succeeded (Protected endpoint)
+    """
+    return _job_status(request, await _owned_job(job_id, user))
+
+
+@router.get("/jobs/{job_id}/events", status_code=status.HTTP_200_OK)
+async def job_events(job_id: str, request: Request, user: dict = Depends(get_current_user)):
+    """
+    Job status changes as Server-Sent Events (Protected endpoint)
+    
+    Sends a `status` event with the JobStatus on every change and closes
+    the stream once the job has succeeded or failed. Jobs run by another
+    worker process are seen within [jobs] events_poll_interval.
+    """
+    await _owned_job(job_id, user)
+    
+    async def generate():
+        # Registered before each read, so no change is missed in between
+        listener = jobs.listen()
+        last_status = None
+        idle = 0.0
+        try:
+            while True:
+                listener.clear()
+                job = await asyncio.to_thread(jobs.get, job_id)
+                if job is None:
+                    yield sse_event({"error": "Job expired"}, event="error")
+                    return
+                
+                if job["status"] != last_status:
+                    last_status = job["status"]
+                    yield f"event: status\ndata: {_job_status(request, job).model_dump_json()}\n\n"
+                if last_status in FINISHED:
+                    return
+                
+                # Woken at once by changes in this process; the timeout
+                # re-reads the store for changes made by other workers
+                if await listener.wait(timeout=jobs.events_poll_interval):
+                    idle = 0.0
+                else:
+                    idle += jobs.events_poll_interval
+                    if idle >= 15.0:
+                        idle = 0.0
+                        yield ": keep-alive\n\n"
+        finally:
+            listener.close()
     
     return StreamingResponse(
         generate(),
@@ -169,3 +857,58 @@ async def health_check():
     
     health_data = rag.health_check()
     return HealthStatus(**health_data)
+
+
+@router.get("/generation/stats", status_code=status.HTTP_200_OK)
+async def generation_stats(user: dict = Depends(get_admin_user)):
+    """
+    Generation gateway statistics (Admin only)
+    
+    Returns loaded model, queue depth per model, in-flight generations,
+    queue wait times, admission control state, job counts and cache sizes
+    """
+    if rag is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RAG system not initialized"
+        )
+    
+    return {
+        **rag.gateway.stats(),
+        "admission": admission.stats(),
+        "jobs": await asyncio.to_thread(jobs.stats),
+        "cache": await asyncio.to_thread(rag.cache.stats)
+    }
+
+
+@router.get("/profiles", status_code=status.HTTP_200_OK)
+async def list_profiles(user: dict = Depends(get_admin_user)):
+    """
+    List captured request profiles (Admin only)
+    
+    - **sampled**: stack samples of requests slower than [profiling] slow_threshold
+    - **cprofile**: requests sent with `X-Profile: 1` by an admin
+    """
+    return {
+        "slow_threshold": PROFILER.slow_threshold,
+        "sampler_running": PROFILER.sampler is not None and PROFILER.sampler.running,
+        "profiles": PROFILER.list_profiles()
+    }
+
+
+@router.get("/profiles/{name}", status_code=status.HTTP_200_OK)
+async def download_profile(name: str, user: dict = Depends(get_admin_user)):
+    """
+    Download a profile file (Admin only)
+    
+    `.collapsed` opens in speedscope / flamegraph.pl, `.pstats` in snakeviz
+    or `python -m pstats`, `.txt` is the cProfile summary.
+    """
+    path = PROFILER.profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile not found: {name}"
+        )
+    
+    return FileResponse(path, filename=name, media_type="application/octet-stream")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Shared Caches
+=============
+
+Answer and query-embedding caches in a local SQLite database (WAL), so
+every API worker process (gunicorn, see gunicorn.conf.py) sees the same
+hits instead of keeping a private in-memory copy.
+
+- EmbeddingCache: query text -> normalized embedding (float32 bytes);
+  used by MedicalRetriever for single and batched query encoding
+- AnswerCache: /query parameters -> generated QueryResponse (JSON); a hit
+  skips retrieval, admission and generation (opt-in: answer_enabled)
+- Entries expire after `ttl` seconds and the oldest are evicted beyond
+  `max_entries` (insertion order: reads never write, so readers in other
+  processes never wait on the write lock)
+- Keys include a namespace (embedding model, knowledge base build), so a
+  rebuilt knowledge base or a new embedding model never serves stale hits
+
+Usage:
+    from app.cache import CacheStore
+
+    caches = CacheStore.from_config(
+        config["cache"], namespace="all-mpnet-base-v2:medical_transplant_kb:2025-12-26T19:42:04"
+    )
+    vector = caches.embeddings.get("acute rejection")
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.metrics import CACHE_HITS, CACHE_MISSES
+from app.serialization import dumps, loads
+
+logger = logging.getLogger("cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at);
+"""
+
+# Evictions run every this many writes (not on every put)
+_EVICT_EVERY = 100
+
+
+class SQLiteCache:
+    """Key -> bytes table with TTL and size bound (thread-safe, fork-aware)"""
+
+    def __init__(self, path: Path, table: str, max_entries: int = 10000, ttl: float = 0.0):
+        """
+        Args:
+            path: SQLite database file (shared by all caches and workers)
+            table: Table name
+            max_entries: Entries kept (oldest evicted first)
+            ttl: Seconds an entry is valid (0 = until evicted)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA.format(table=table))
+
+    def _connect(self) -> sqlite3.Connection:
+        # timeout = busy wait when another process holds the write lock
+        conn = sqlite3.connect(
+            str(self.path), timeout=5.0, check_same_thread=False, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def after_fork(self):
+        """New connection in a forked worker (SQLite handles must not cross fork)"""
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Values of the keys present and not expired"""
+        if not keys:
+            return {}
+
+        oldest = time.time() - self.ttl if self.ttl > 0 else 0.0
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} "
+                    f"WHERE key IN ({placeholders}) AND created_at >= ?",
+                    (*keys, oldest)
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Cache read from {self.table} failed: {e}")
+                return {}
+        return {key: value for key, value in rows}
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, bytes]):
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                    [(key, value, now) for key, value in items.items()]
+                )
+                self._writes += len(items)
+                if self._writes >= _EVICT_EVERY:
+                    self._writes = 0
+                    self._evict(now)
+            except sqlite3.OperationalError as e:
+                # Busy beyond the timeout: a cache write is never worth failing a request
+                logger.warning(f"Cache write to {self.table} failed: {e}")
+
+    def put(self, key: str, value: bytes):
+        self.put_many({key: value})
+
+    def _evict(self, now: float):
+        if self.ttl > 0:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Query text -> embedding (MedicalRetriever.embedding_cache)"""
+
+    def __init__(self, store: SQLiteCache, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        keys = {_digest(self.namespace, text): text for text in texts}
+        found = self.store.get_many(list(keys))
+
+        CACHE_HITS.inc(len(found), cache="embedding")
+        CACHE_MISSES.inc(len(keys) - len(found), cache="embedding")
+        return {keys[key]: np.frombuffer(value, dtype=np.float32) for key, value in found.items()}
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text]).get(text)
+
+    def put_many(self, embeddings: Dict[str, np.ndarray]):
+        self.store.put_many({
+            _digest(self.namespace, text): np.asarray(vector, dtype=np.float32).tobytes()
+            for text, vector in embeddings.items()
+        })
+
+    def put(self, text: str, embedding: np.ndarray):
+        self.put_many({text: embedding})
+
+
+class AnswerCache:
+    """/query request parameters -> generated answer"""
+
+    def __init__(self, store: SQLiteCache, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    def key(self, params: Dict) -> str:
+        """Cache key; whitespace differences in the query do not matter"""
+        params = {**params, "query": " ".join(params["query"].split())}
+        return _digest(self.namespace, json.dumps(params, sort_keys=True, separators=(",", ":")))
+
+    def get(self, params: Dict) -> Optional[Dict]:
+        value = self.store.get(self.key(params))
+        if value is None:
+            CACHE_MISSES.inc(cache="answer")
+            return None
+        CACHE_HITS.inc(cache="answer")
+        return loads(value)
+
+    def put(self, params: Dict, result: Dict):
+        """Store a generated answer; failed generations ("error" set) are not cached"""
+        if result.get("error"):
+            return
+        self.store.put(self.key(params), dumps(result))
+
+
+class CacheStore:
+    """The configured caches of one process ([cache] section)"""
+
+    def __init__(self, embeddings: Optional[EmbeddingCache], answers: Optional[AnswerCache]):
+        self.embeddings = embeddings
+        self.answers = answers
+
+    @classmethod
+    def from_config(cls, config: Dict, namespace: str) -> "CacheStore":
+        """
+        Create caches from the [cache] section of rag_config.toml.
+
+        Args:
+            config: [cache] section
+            namespace: Identifies the model + knowledge base the entries belong to
+        """
+        path = Path(config.get("db_path", "./data/cache.db"))
+
+        embeddings = None
+        if config.get("embedding_enabled", True):
+            embeddings = EmbeddingCache(
+                SQLiteCache(path, "embeddings", max_entries=config.get("embedding_max_entries", 100000)),
+                namespace
+            )
+
+        answers = None
+        if config.get("answer_enabled", False):
+            answers = AnswerCache(
+                SQLiteCache(
+                    path, "answers",
+                    max_entries=config.get("answer_max_entries", 10000),
+                    ttl=config.get("answer_ttl_hours", 24) * 3600
+                ),
+                namespace
+            )
+
+        return cls(embeddings, answers)
+
+    def _stores(self) -> List[SQLiteCache]:
+        return [cache.store for cache in (self.embeddings, self.answers) if cache is not None]
+
+    def after_fork(self):
+        for store in self._stores():
+            store.after_fork()
+
+    def stats(self) -> Dict:
+        return {store.table: store.count() for store in self._stores()}
+
+    def close(self):
+        for store in self._stores():
+            store.close()
@@ -9,11 +9,13 @@ Authentication dependencies for protected endpoints.
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.security import verify_token
+from app.tracing import current_span, traced
 
 # HTTP Bearer token security scheme
 security = HTTPBearer()
 
 
+@traced("auth.get_current_user")
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
@@ -30,6 +32,7 @@ def get_current_user(
     """
     token = credentials.credentials
     payload = verify_token(token)
+    current_span().set_attribute("auth.valid", payload is not None)
     
     if payload is None:
         raise HTTPException(
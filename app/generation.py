@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Generation Gateway
+==================
+
+Single entry point for all Ollama calls.
+
+- Pooled HTTP client (keep-alive connections reused across requests)
+- Global and per-model concurrency limits
+- Model-affinity queue: waiting requests for the model already in VRAM go
+  first, and a different model only starts once the current one drains,
+  so concurrent users of several models don't force constant swaps
+- Starvation guard: a request waiting longer than `affinity_max_wait`
+  gets the next free slot of its priority class regardless of model
+- Priority: queued interactive requests start before batch requests
+  (evaluation / benchmark traffic), however long the batch ones waited;
+  fairness for batch work is AdmissionController's fair share
+- Configurable `keep_alive` passed to every call
+- Queue-depth and wait-time statistics
+- Cold-start vs warm latency tracked separately (Ollama `load_duration`)
+
+ModelWarmer pre-loads configured models at startup and pings them
+periodically while traffic is expected, so the first request after an idle
+period does not pay the model load.
+"""
+
+import math
+import time
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+try:
+    import ollama
+except ImportError:
+    raise ImportError("Ollama not installed. Run: uv pip install ollama")
+
+from app.metrics import GENERATION_SECONDS
+from app.tracing import open_span, set_error, start_span
+
+logger = logging.getLogger("generation")
+
+
+def _duration_seconds(value) -> Optional[float]:
+    """Ollama keep_alive ("30m", "1h", "300s" or seconds; negative = forever), None if unparsable"""
+    try:
+        if isinstance(value, (int, float)):
+            seconds = float(value)
+        else:
+            text = str(value).strip()
+            for unit, factor in (("ms", 0.001), ("h", 3600.0), ("m", 60.0), ("s", 1.0)):
+                if text.endswith(unit):
+                    seconds = float(text[:-len(unit)]) * factor
+                    break
+            else:
+                seconds = float(text)
+    except ValueError:
+        return None
+    return math.inf if seconds < 0 else seconds
+
+
+@dataclass
+class _Waiter:
+    """Queued generation request"""
+    model: str
+    priority: str = "interactive"
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class GenerationGateway:
+    """Pooled, concurrency-limited Ollama client shared by the whole API"""
+
+    def __init__(
+        self,
+        host: str,
+        keep_alive: str = "30m",
+        max_concurrent: int = 2,
+        default_model_concurrency: int = 1,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        affinity_max_wait: float = 10.0,
+        max_connections: int = 8,
+        timeout: float = 120.0,
+        cold_start_threshold: float = 0.5
+    ):
+        """
+        Initialize gateway.
+
+        Args:
+            host: Ollama base URL
+            keep_alive: How long Ollama keeps a model loaded after a call
+            max_concurrent: Max generations in flight across all models
+            default_model_concurrency: Max in-flight generations per model
+            model_concurrency: Per-model overrides (e.g. {"gemma3:1b": 2})
+            affinity_max_wait: Seconds before a queued request overrides model affinity
+            max_connections: HTTP connection pool size
+            timeout: HTTP timeout for Ollama calls (seconds)
+            cold_start_threshold: Model load time (seconds) above which a call counts as cold
+        """
+        self.host = host
+        self.keep_alive = keep_alive
+        self.max_concurrent = max_concurrent
+        self.default_model_concurrency = default_model_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.affinity_max_wait = affinity_max_wait
+        self.cold_start_threshold = cold_start_threshold
+
+        self.client = ollama.Client(
+            host=host,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+
+        self._cond = threading.Condition()
+        self._waiters: List[_Waiter] = []  # FIFO
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self.loaded_model: Optional[str] = None
+        self.last_request_at: Optional[float] = None
+        self._known_models: set = set()  # Validated via /api/show
+        # Model -> monotonic time its keep_alive runs out (last successful call)
+        self._resident_until: Dict[str, float] = {}
+        self._keep_alive_seconds = _duration_seconds(keep_alive)
+
+        self._stats = {
+            "requests": 0,
+            "errors": 0,
+            "model_switches": 0,
+            "total_queue_wait": 0.0,
+            "max_queue_wait": 0.0,
+        }
+        # Generation latency split by cold (model load) vs warm calls
+        self._latency = {
+            "cold": {"count": 0, "total": 0.0, "max": 0.0, "load_total": 0.0},
+            "warm": {"count": 0, "total": 0.0, "max": 0.0, "load_total": 0.0},
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict, host: str) -> "GenerationGateway":
+        """Create gateway from the [generation] section of rag_config.toml"""
+        return cls(
+            host=host,
+            keep_alive=config.get("keep_alive", "30m"),
+            max_concurrent=config.get("max_concurrent", 2),
+            default_model_concurrency=config.get("default_model_concurrency", 1),
+            model_concurrency=config.get("model_concurrency", {}),
+            affinity_max_wait=config.get("affinity_max_wait", 10.0),
+            max_connections=config.get("max_connections", 8),
+            timeout=config.get("timeout", 120.0),
+            cold_start_threshold=config.get("cold_start_threshold", 0.5)
+        )
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def model_limit(self, model: str) -> int:
+        """Max concurrent generations for `model`"""
+        return self.model_concurrency.get(model, self.default_model_concurrency)
+
+    def _has_capacity(self, model: str) -> bool:
+        """Free slot for this model without co-scheduling another model"""
+        if sum(self._in_flight.values()) >= self.max_concurrent:
+            return False
+        if self._in_flight[model] >= self.model_limit(model):
+            return False
+        # Never run two models at once: that is what thrashes VRAM
+        return all(m == model for m, n in self._in_flight.items() if n > 0)
+
+    def _pick(self) -> Optional[_Waiter]:
+        """Choose the next waiter to start (caller holds the lock)"""
+        # Interactive before batch: a batch waiter only starts when no
+        # interactive waiter can
+        for priority in ("interactive", "batch"):
+            same_class = [w for w in self._waiters if w.priority == priority]
+            if not same_class:
+                continue
+
+            # Starvation guard: the oldest waiter of the class goes next,
+            # even if that means letting the current model drain first
+            oldest = same_class[0]
+            if time.monotonic() - oldest.enqueued_at >= self.affinity_max_wait:
+                return oldest if self._has_capacity(oldest.model) else None
+
+            # Within a class prefer the model already loaded in VRAM
+            eligible = [w for w in same_class if self._has_capacity(w.model)]
+            for waiter in eligible:
+                if waiter.model == self.loaded_model:
+                    return waiter
+            if eligible:
+                return eligible[0]
+
+        return None
+
+    def _acquire(self, model: str, background: bool = False, priority: str = "interactive"):
+        """Block until this request may start generating"""
+        waiter = _Waiter(model, priority)
+
+        with self._cond:
+            self._waiters.append(waiter)
+            while self._pick() is not waiter:
+                # Timed wait so the starvation guard is re-evaluated
+                self._cond.wait(timeout=0.25)
+
+            self._waiters.remove(waiter)
+            self._in_flight[model] += 1
+
+            if self.loaded_model != model:
+                if self.loaded_model is not None:
+                    self._stats["model_switches"] += 1
+                self.loaded_model = model
+
+            # Warm-up/keep-alive calls are not traffic
+            if not background:
+                wait = time.monotonic() - waiter.enqueued_at
+                self.last_request_at = time.monotonic()
+                self._stats["requests"] += 1
+                self._stats["total_queue_wait"] += wait
+                self._stats["max_queue_wait"] = max(self._stats["max_queue_wait"], wait)
+
+            # Other waiters for the same model may fit too
+            self._cond.notify_all()
+
+    def _release(self, model: str):
+        with self._cond:
+            self._in_flight[model] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, model: str, background: bool = False, priority: str = "interactive"):
+        """Hold a generation slot for `model`"""
+        self._acquire(model, background, priority)
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    # ------------------------------------------------------------------
+    # Ollama calls
+    # ------------------------------------------------------------------
+
+    def chat(
+        self,
+        model: str,
+        messages: List[Dict],
+        options: Dict,
+        stream: bool = False,
+        priority: str = "interactive"
+    ):
+        """
+        Chat completion through the gateway.
+
+        With stream=True the slot is held until the returned iterator is
+        exhausted or closed. `priority` is "interactive" or "batch".
+        """
+        if stream:
+            return self._chat_stream(model, messages, options, priority)
+
+        attributes = {"llm.model": model, "llm.stream": False, "generation.priority": priority}
+        with start_span("ollama.chat", kind="client", **attributes) as span:
+            queued_at = time.monotonic()
+            with self.slot(model, priority=priority):
+                start = time.monotonic()
+                span.set_attribute("generation.queue_wait_ms", round((start - queued_at) * 1000, 3))
+                try:
+                    response = self.client.chat(
+                        model=model,
+                        messages=messages,
+                        options=options,
+                        keep_alive=self.keep_alive
+                    )
+                except Exception:
+                    self._count_error()
+                    raise
+
+                self._record_latency(model, time.monotonic() - start, response)
+                self._annotate_span(span, response)
+                return response
+
+    def _chat_stream(self, model: str, messages: List[Dict], options: Dict, priority: str) -> Iterator:
+        # Not a current span: this generator is advanced from several threads
+        attributes = {"llm.model": model, "llm.stream": True, "generation.priority": priority}
+        span = open_span("ollama.chat", kind="client", **attributes)
+        queued_at = time.monotonic()
+        try:
+            with self.slot(model, priority=priority):
+                start = time.monotonic()
+                span.set_attribute("generation.queue_wait_ms", round((start - queued_at) * 1000, 3))
+                last_chunk = None
+                try:
+                    for chunk in self.client.chat(
+                        model=model,
+                        messages=messages,
+                        options=options,
+                        stream=True,
+                        keep_alive=self.keep_alive
+                    ):
+                        last_chunk = chunk
+                        yield chunk
+                except Exception as e:
+                    self._count_error()
+                    set_error(span, e)
+                    raise
+
+                # Final chunk carries load/eval durations
+                if last_chunk is not None:
+                    self._record_latency(model, time.monotonic() - start, last_chunk)
+                    self._annotate_span(span, last_chunk)
+        finally:
+            span.end()
+
+    @staticmethod
+    def _annotate_span(span, response):
+        """Token counts and Ollama-side durations on the generation span"""
+        if not span.is_recording():
+            return
+        span.set_attributes({
+            "llm.prompt_tokens": response.get("prompt_eval_count") or 0,
+            "llm.completion_tokens": response.get("eval_count") or 0,
+            "llm.load_ms": round((response.get("load_duration") or 0) / 1e6, 3),
+            "llm.prompt_eval_ms": round((response.get("prompt_eval_duration") or 0) / 1e6, 3),
+            "llm.eval_ms": round((response.get("eval_duration") or 0) / 1e6, 3),
+        })
+
+    def preload(self, model: str) -> float:
+        """
+        Load a model into VRAM (empty prompt: no tokens generated).
+
+        Returns:
+            Model load time in seconds reported by Ollama (0.0 if already loaded)
+        """
+        with self.slot(model, background=True):
+            response = self.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+        self._mark_resident(model)
+        return (response.get("load_duration") or 0) / 1e9
+
+    def _mark_resident(self, model: str):
+        if self._keep_alive_seconds is not None:
+            with self._cond:
+                self._resident_until[model] = time.monotonic() + self._keep_alive_seconds
+
+    def is_resident(self, model: str) -> bool:
+        """
+        Model loaded in Ollama, judged from the gateway's own calls: it is
+        the model used last and its keep_alive has not run out. Only an
+        unparsable keep_alive falls back to asking Ollama (/api/ps).
+        """
+        if self._keep_alive_seconds is None:
+            return model in {m.model for m in self.client.ps().models}
+        with self._cond:
+            return model == self.loaded_model and time.monotonic() < self._resident_until.get(model, 0.0)
+
+    def prepare(self, model: str) -> Dict:
+        """
+        Get ready to generate with `model` (meant to overlap with retrieval).
+
+        - Validates the model exists (first use only; opens a pooled connection)
+        - Pre-loads it if not resident (gateway state, no Ollama call) and
+          no other model is generating
+
+        Raises:
+            ollama.ResponseError: if the model is not available
+        """
+        start = time.monotonic()
+
+        if model not in self._known_models:
+            self.client.show(model)
+            self._known_models.add(model)
+
+        preloaded = False
+        if not self.is_resident(model) and self._can_preload(model):
+            self.preload(model)
+            preloaded = True
+
+        return {
+            "prepare_time": round(time.monotonic() - start, 3),
+            "preloaded": preloaded,
+        }
+
+    def _can_preload(self, model: str) -> bool:
+        """Loading now would not evict a model that is busy or wanted next"""
+        with self._cond:
+            busy_models = {m for m, n in self._in_flight.items() if n > 0}
+            busy_models.update(w.model for w in self._waiters)
+            return busy_models <= {model}
+
+    def is_busy(self) -> bool:
+        """Any generation queued or in flight"""
+        with self._cond:
+            return bool(self._waiters) or any(n > 0 for n in self._in_flight.values())
+
+    def _count_error(self):
+        with self._cond:
+            self._stats["errors"] += 1
+
+    def _record_latency(self, model: str, elapsed: float, response):
+        """Bucket a completed call as cold (model was loaded) or warm"""
+        load_time = (response.get("load_duration") or 0) / 1e9
+        bucket = "cold" if load_time >= self.cold_start_threshold else "warm"
+        GENERATION_SECONDS.observe(elapsed, model=model, start=bucket)
+        self._mark_resident(model)
+
+        if load_time >= self.cold_start_threshold:
+            logger.info(f"Cold start: model load took {load_time:.2f}s")
+
+        with self._cond:
+            stats = self._latency[bucket]
+            stats["count"] += 1
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            stats["load_total"] += load_time
+
+    def list(self):
+        """List locally available models"""
+        return self.client.list()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        """Queue depth, in-flight counts and wait times"""
+        with self._cond:
+            queued: Dict[str, int] = defaultdict(int)
+            for waiter in self._waiters:
+                queued[waiter.model] += 1
+
+            requests = self._stats["requests"]
+            return {
+                "loaded_model": self.loaded_model,
+                "keep_alive": self.keep_alive,
+                "queue_depth": len(self._waiters),
+                "queued": dict(queued),
+                "in_flight": {m: n for m, n in self._in_flight.items() if n > 0},
+                "requests": requests,
+                "errors": self._stats["errors"],
+                "model_switches": self._stats["model_switches"],
+                "avg_queue_wait": round(self._stats["total_queue_wait"] / requests, 4) if requests else 0.0,
+                "max_queue_wait": round(self._stats["max_queue_wait"], 4),
+                "latency": {
+                    bucket: {
+                        "count": stats["count"],
+                        "avg": round(stats["total"] / stats["count"], 3) if stats["count"] else 0.0,
+                        "max": round(stats["max"], 3),
+                        "avg_load_time": round(stats["load_total"] / stats["count"], 3) if stats["count"] else 0.0,
+                    }
+                    for bucket, stats in self._latency.items()
+                },
+            }
+
+
+class ModelWarmer:
+    """
+    Startup warm-up and keep-alive pings for configured models.
+
+    Pings only run while traffic is expected: inside `active_hours`, or
+    within `traffic_window` seconds of the last generation. A ping refreshes
+    models already resident in VRAM; if none is resident, the first
+    configured model is loaded. Pings are skipped while the gateway is busy
+    (real traffic keeps the model warm by itself).
+    """
+
+    def __init__(
+        self,
+        gateway: GenerationGateway,
+        models: List[str],
+        ping_interval: float = 240.0,
+        active_hours: Tuple[int, int] = (0, 24),
+        traffic_window: float = 1800.0
+    ):
+        """
+        Initialize warmer.
+
+        Args:
+            gateway: Shared generation gateway
+            models: Models to warm up (first = primary)
+            ping_interval: Seconds between keep-alive checks (keep below keep_alive)
+            active_hours: [start, end) local hours when traffic is expected
+            traffic_window: Seconds after the last request during which pings continue
+        """
+        self.gateway = gateway
+        self.models = list(models)
+        self.ping_interval = ping_interval
+        self.active_hours = tuple(active_hours)
+        self.traffic_window = traffic_window
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.pings = 0
+
+    @classmethod
+    def from_config(cls, gateway: GenerationGateway, config: Dict) -> "ModelWarmer":
+        """Create warmer from the [generation] section of rag_config.toml"""
+        return cls(
+            gateway,
+            models=config.get("warmup_models", []),
+            ping_interval=config.get("keepalive_interval", 240.0),
+            active_hours=config.get("active_hours", [0, 24]),
+            traffic_window=config.get("traffic_window", 1800.0)
+        )
+
+    def warm_up(self):
+        """Load every configured model once (blocking; primary last so it stays resident)"""
+        for model in reversed(self.models):
+            start = time.monotonic()
+            try:
+                load_time = self.gateway.preload(model)
+                logger.info(
+                    f"Warmed up {model} in {time.monotonic() - start:.2f}s "
+                    f"(load: {load_time:.2f}s)"
+                )
+            except Exception as e:
+                logger.warning(f"Warm-up failed for {model}: {e}")
+
+    def start(self):
+        """Start the keep-alive thread"""
+        if not self.models or self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, name="model-keepalive", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the keep-alive thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def traffic_expected(self) -> bool:
+        """Inside active hours, or recent traffic"""
+        start_hour, end_hour = self.active_hours
+        if start_hour <= datetime.now().hour < end_hour:
+            return True
+
+        last = self.gateway.last_request_at
+        return last is not None and time.monotonic() - last < self.traffic_window
+
+    def _run(self):
+        while not self._stop.wait(self.ping_interval):
+            if not self.traffic_expected() or self.gateway.is_busy():
+                continue
+            try:
+                self._ping()
+            except Exception as e:
+                logger.warning(f"Keep-alive ping failed: {e}")
+
+    def _ping(self):
+        """Refresh resident configured models (or load the primary one)"""
+        resident = {m.model for m in self.gateway.client.ps().models}
+        targets = [m for m in self.models if m in resident] or self.models[:1]
+
+        for model in targets:
+            self.gateway.preload(model)
+            self.pings += 1
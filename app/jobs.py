@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Answer Jobs
+===========
+
+Asynchronous execution of long-running answers (e.g. answer_mode="detailed"
+with max_tokens=2048 on phi3:mini), so no HTTP connection is held open for
+minutes behind a proxy timeout.
+
+- POST /api/v1/jobs returns a job ID at once (202)
+- A worker pool runs queued jobs; the API's runner goes through admission
+  control at batch priority, like /query, so jobs never take generation
+  slots away from interactive traffic
+- Clients poll GET /api/v1/jobs/{id} or subscribe to
+  GET /api/v1/jobs/{id}/events (SSE, one event per status change). Changes
+  made in this process wake subscribers at once; the store is also re-read
+  every `events_poll_interval` seconds for jobs run by another worker process
+- Jobs live in a local SQLite database (WAL), so results survive restarts;
+  jobs interrupted by a restart are re-queued on startup
+- Finished jobs expire after `ttl_hours` and are deleted by a cleanup thread
+- Multiple worker processes (gunicorn) share the database: a job is
+  claimed atomically before it runs, so it runs in one process only
+- Idempotency: the key is derived from the owner and the request (or taken
+  from an `Idempotency-Key` header); resubmitting returns the existing job
+  unless it failed. A reused key with a different request raises JobConflict
+
+Usage:
+    from app.jobs import JobManager
+
+    jobs = JobManager.from_config(rag.answer, config["jobs"])  # or an async runner
+    jobs.start()
+    job, created = jobs.submit(request, owner="admin@transplant.ai")
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    owner TEXT NOT NULL,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    request_hash TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+"""
+
+
+class JobQueueFull(Exception):
+    """Too many jobs waiting for a worker"""
+
+
+class JobConflict(Exception):
+    """Idempotency key already used for a different request"""
+
+
+class JobListener:
+    """Event-loop side wake-up for job status changes (SSE subscribers)"""
+
+    def __init__(self, manager: "JobManager"):
+        self._manager = manager
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def _wake(self):
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self, timeout: float) -> bool:
+        """True if some job changed since clear(), False on timeout"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def close(self):
+        self._manager._unlisten(self)
+
+
+def _canonical(request: Dict) -> str:
+    return json.dumps(request, sort_keys=True, separators=(",", ":"))
+
+
+def idempotency_key(owner: str, request: Dict) -> str:
+    """Stable key for (owner, request): same question + options = same job"""
+    return hashlib.sha256(f"{owner}\n{_canonical(request)}".encode("utf-8")).hexdigest()
+
+
+def request_hash(request: Dict) -> str:
+    """Request body fingerprint (detects a client key reused for another request)"""
+    return hashlib.sha256(_canonical(request).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """SQLite persistence for jobs (thread-safe, one shared connection)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _connect(self) -> sqlite3.Connection:
+        # timeout = busy wait when another worker process holds the write lock
+        conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self):
+        """Add columns missing from databases created by older versions"""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "request_hash" not in columns:
+            try:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN request_hash TEXT")
+            except sqlite3.OperationalError:  # Added by another worker process meanwhile
+                pass
+
+    def after_fork(self):
+        """New connection in a forked worker (SQLite handles must not cross fork)"""
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def create(
+        self,
+        owner: str,
+        request: Dict,
+        key: str,
+        max_queued: Optional[int] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Insert a queued job unless a live job with the same key exists.
+
+        The lookup, the queue-size check and the insert run in one write
+        transaction, so concurrent worker processes cannot overshoot
+        `max_queued` or create the same job twice.
+
+        Returns:
+            (job, created); failed or expired jobs with the key are replaced
+
+        Raises:
+            JobConflict: a live job with the key has a different request
+            JobQueueFull: `max_queued` jobs are already queued
+        """
+        now = time.time()
+        body_hash = request_hash(request)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE idempotency_key = ?", (key,)
+                ).fetchone()
+                expired = row is not None and row["expires_at"] is not None and row["expires_at"] <= now
+                if row is not None and row["status"] != FAILED and not expired:
+                    stored_hash = row["request_hash"] or request_hash(json.loads(row["request"]))
+                    if stored_hash != body_hash:
+                        raise JobConflict("Idempotency key already used for a different request")
+                    self._conn.execute("COMMIT")
+                    return self._to_dict(row), False
+
+                if max_queued is not None:
+                    queued = self._conn.execute(
+                        "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+                    ).fetchone()[0]
+                    if queued >= max_queued:
+                        raise JobQueueFull(f"{max_queued} jobs already queued")
+
+                if row is not None:
+                    self._conn.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO jobs (id, idempotency_key, owner, status, request, request_hash, "
+                    "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, key, owner, QUEUED, json.dumps(request), body_hash, now, now)
+                )
+                row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._to_dict(row), True
+
+    def update(self, job_id: str, status: str, result: Optional[Dict] = None,
+               error: Optional[str] = None, expires_at: Optional[float] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ? "
+                "WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error,
+                 time.time(), expires_at, job_id)
+            )
+
+    def claim(self, job_id: str) -> bool:
+        """Move a queued job to running; False if another worker got it first"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), job_id, QUEUED)
+            )
+        return cursor.rowcount == 1
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)
+            ).fetchone()[0]
+
+    def queued(self) -> List[Dict]:
+        """Queued jobs, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def requeue_running(self) -> int:
+        """Running jobs back to queued (their process is gone after a restart)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (QUEUED, time.time(), RUNNING)
+            )
+        return cursor.rowcount
+
+    def delete_expired(self, now: Optional[float] = None) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now if now is not None else time.time(),)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """Worker pool, status notifications and TTL cleanup for answer jobs"""
+
+    def __init__(
+        self,
+        runner: Callable[..., Dict],
+        store: JobStore,
+        workers: int = 1,
+        max_pending: int = 100,
+        ttl: float = 24 * 3600,
+        cleanup_interval: float = 300.0,
+        events_poll_interval: float = 1.0
+    ):
+        """
+        Args:
+            runner: Called as runner(**request) in a worker thread (HealthcareRAG.answer);
+                a coroutine function runs on the event loop that called start()
+            store: Job persistence
+            workers: Jobs executed at once
+            max_pending: Max queued jobs before submit() raises JobQueueFull
+            ttl: Seconds a finished job (and its result) is kept
+            cleanup_interval: Seconds between expired-job sweeps
+            events_poll_interval: Seconds between store reads for SSE subscribers
+                (catches changes made by other worker processes)
+        """
+        self.runner = runner
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self.events_poll_interval = events_poll_interval
+
+        # False in forked workers: only the master may requeue running jobs,
+        # since in a worker they may belong to a live sibling process
+        self.recover_running = True
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listeners_lock = threading.Lock()
+        self._listeners: set = set()
+        self._stop = threading.Event()
+        self._cleanup_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, runner: Callable[..., Dict], config: Dict) -> "JobManager":
+        """Create manager from the [jobs] section of rag_config.toml"""
+        return cls(
+            runner,
+            JobStore(config.get("db_path", "./data/jobs.db")),
+            workers=config.get("workers", 1),
+            max_pending=config.get("max_pending", 100),
+            ttl=config.get("ttl_hours", 24) * 3600,
+            cleanup_interval=config.get("cleanup_interval", 300),
+            events_poll_interval=config.get("events_poll_interval", 1.0)
+        )
+
+    def recover(self) -> int:
+        """Re-queue jobs that were running when the server stopped"""
+        recovered = self.store.requeue_running()
+        if recovered:
+            logger.info(f"Re-queued {recovered} interrupted jobs")
+        return recovered
+
+    def after_fork(self):
+        """Prepare a forked worker process (gunicorn preload; master runs recover())"""
+        self.store.after_fork()
+        self.recover_running = False
+
+    def start(self):
+        """
+        Start workers and cleanup; pick up queued (and interrupted) jobs.
+
+        Call from the event loop when the runner is a coroutine function.
+        """
+        if self._executor is not None:
+            return
+
+        if asyncio.iscoroutinefunction(self.runner):
+            self._loop = asyncio.get_running_loop()
+
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+
+        if self.recover_running:
+            self.recover()
+        # Jobs another worker also picks up run once (claim() in _run)
+        for job in self.store.queued():
+            self._executor.submit(self._run, job["id"], job["request"])
+
+        self._cleanup_thread = threading.Thread(target=self._cleanup_loop, name="job-cleanup", daemon=True)
+        self._cleanup_thread.start()
+
+    def stop(self):
+        """Stop accepting work; running jobs finish, queued ones resume on next start"""
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._cleanup_thread is not None:
+            self._cleanup_thread.join(timeout=2)
+            self._cleanup_thread = None
+
+    # ------------------------------------------------------------------
+    # API side
+    # ------------------------------------------------------------------
+
+    def submit(self, request: Dict, owner: str, key: Optional[str] = None) -> Tuple[Dict, bool]:
+        """
+        Queue a job (or return the existing one with the same idempotency key).
+
+        Args:
+            request: HealthcareRAG.answer keyword arguments
+            owner: Username of the submitter
+            key: Client idempotency key (default: derived from owner + request)
+
+        Returns:
+            (job, created)
+
+        Raises:
+            JobQueueFull: too many jobs waiting
+            JobConflict: `key` was used for a different request
+        """
+        if self._executor is None:
+            raise RuntimeError("Job manager not started")
+
+        key = f"{owner}:{key}" if key else idempotency_key(owner, request)
+        job, created = self.store.create(owner, request, key, max_queued=self.max_pending)
+        if created:
+            self._executor.submit(self._run, job["id"], request)
+            self._notify()
+        return job, created
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def listen(self) -> JobListener:
+        """
+        Subscribe to status changes (call from the event loop; close() when done).
+
+        Register before reading a job so no change is missed in between.
+        """
+        listener = JobListener(self)
+        with self._listeners_lock:
+            self._listeners.add(listener)
+        return listener
+
+    def _unlisten(self, listener: JobListener):
+        with self._listeners_lock:
+            self._listeners.discard(listener)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            **{status: self.store.count(status) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)},
+        }
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _notify(self):
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener._wake()
+            except RuntimeError:  # Event loop already closed
+                self._unlisten(listener)
+
+    def _run(self, job_id: str, request: Dict):
+        if self._stop.is_set() or not self.store.claim(job_id):
+            return
+
+        self._notify()
+        start = time.monotonic()
+
+        try:
+            if self._loop is not None:
+                result = asyncio.run_coroutine_threadsafe(self.runner(**request), self._loop).result()
+            else:
+                result = self.runner(**request)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, FAILED, error=str(e), expires_at=time.time() + self.ttl)
+        else:
+            if result.get("error"):
+                # Generation errors come back as a result (HealthcareRAG.generate_answer);
+                # FAILED lets a resubmission with the same key run again
+                logger.error(f"Job {job_id} failed: {result['error']}")
+                self.store.update(job_id, FAILED, error=result["error"], expires_at=time.time() + self.ttl)
+            else:
+                self.store.update(job_id, SUCCEEDED, result=result, expires_at=time.time() + self.ttl)
+                logger.info(f"Job {job_id} finished in {time.monotonic() - start:.1f}s")
+
+        self._notify()
+
+    def _cleanup_loop(self):
+        while not self._stop.wait(self.cleanup_interval):
+            try:
+                removed = self.store.delete_expired()
+                if removed:
+                    logger.info(f"Deleted {removed} expired jobs")
+            except Exception as e:
+                logger.warning(f"Job cleanup failed: {e}")
@@ -11,10 +11,14 @@ Usage:
 """
 
 import os
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import router
-from app.middleware import log_requests
+from app.api import router, rag, jobs
+from app.middleware import RequestMiddleware
+from app.metrics import REGISTRY, CONTENT_TYPE
+from app.profiling import PROFILER
+from app.serialization import FastJSONResponse
 import logging
 
 # Configure logging
@@ -38,11 +42,12 @@ app = FastAPI(
     version="1.0.0",
     description="Clinical-grade Retrieval-Augmented Generation for Transplant Medicine",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse  # orjson when installed
 )
 
-# Request logging middleware
-app.middleware("http")(log_requests)
+# Request logging / timing middleware (pure ASGI: streams pass through untouched)
+app.add_middleware(RequestMiddleware)
 
 # CORS middleware (configure for production)
 app.add_middleware(
@@ -64,21 +69,49 @@ async def root():
         "message": "Medical Transplant RAG API",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/api/v1/health"
+        "health": "/api/v1/health",
+        "metrics": "/metrics"
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (stage latency histograms, counters, gauges)"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Startup tasks"""
     logging.info("Starting Medical RAG API...")
     logging.info("Documentation available at /docs")
+    
+    # Slow-request stack sampler / X-Profile cProfile ([profiling])
+    PROFILER.configure(rag.config.get("profiling", {}) if rag is not None else {})
+    PROFILER.start()
+    
+    # Load configured models before serving, then keep them warm
+    if rag is not None:
+        await asyncio.to_thread(rag.warmer.warm_up)
+        rag.warmer.start()
+    
+    # Answer job workers (re-queues jobs interrupted by the last shutdown)
+    if jobs is not None:
+        jobs.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logging.info("Shutting down Medical RAG API...")
+    
+    PROFILER.stop()
+    
+    if jobs is not None:
+        jobs.stop()
+    
+    if rag is not None:
+        rag.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Metrics
+=======
+
+Minimal in-process metrics registry with Prometheus text exposition
+(served at GET /metrics).
+
+- Histogram: per-stage latencies (p50/p95/p99 via histogram_quantile)
+- Counter: answers by outcome, cache hits, HTTP responses
+- Gauge: in-flight requests, queue depths
+
+Counters and gauges can also pull values from a source callback at scrape
+time (e.g. gateway queue depth, reranker cache stats), so components that
+already keep their own stats don't need to be instrumented twice.
+
+Usage:
+    from app.metrics import STAGE_SECONDS, REGISTRY
+
+    STAGE_SECONDS.observe(0.012, stage="embedding")
+    text = REGISTRY.render()
+"""
+
+import abc
+import math
+import logging
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond CPU stages up to slow CPU generations
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    """Base class: name, help text, label names and a lock"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._sources: List[Callable[[], Dict[LabelValues, float]]] = []
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def add_source(self, source: Callable[[], Dict[LabelValues, float]]):
+        """
+        Register a scrape-time callback returning {label values: value}.
+
+        Source values are added to (counters) or override (gauges) values
+        recorded directly on the metric.
+        """
+        self._sources.append(source)
+
+    def _source_values(self) -> Dict[LabelValues, float]:
+        values: Dict[LabelValues, float] = {}
+        for source in self._sources:
+            try:
+                for key, value in source().items():
+                    values[tuple(str(v) for v in key)] = float(value)
+            except Exception as e:
+                logging.debug(f"Metric source for {self.name} failed: {e}")
+        return values
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        """Exposition lines (HELP, TYPE and samples)"""
+
+
+class _ScalarMetric(_Metric):
+    """One value per label set (counters, gauges)"""
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, value in sorted(self._samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    @abc.abstractmethod
+    def _samples(self) -> Dict[LabelValues, float]:
+        """Current {label values: value}, including source values"""
+
+
+class Counter(_ScalarMetric):
+    """Monotonically increasing count"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            samples = dict(self._values)
+        for key, value in self._source_values().items():
+            samples[key] = samples.get(key, 0.0) + value
+        return samples
+
+
+class Gauge(_ScalarMetric):
+    """Value that can go up and down"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            samples = dict(self._values)
+        samples.update(self._source_values())
+        return samples
+
+
+class Histogram(_Metric):
+    """Bucketed observations with sum and count"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            snapshot = {key: ([*state[0]], state[1], state[2]) for key, state in self._values.items()}
+
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------------------------------------------------------------------------
+# Application metrics
+# ---------------------------------------------------------------------------
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "rag_stage_seconds",
+    "Pipeline stage latency (embedding, routing, vector_search, parse, bm25, rerank, dedup, "
+    "budget, retrieval, admission_wait, compression, prompt_build, ttft, generation, total)",
+    ["stage"]
+))
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "rag_http_request_seconds",
+    "HTTP request latency until response headers",
+    ["method", "route"]
+))
+
+HTTP_TTFB_SECONDS = REGISTRY.register(Histogram(
+    "rag_http_ttfb_seconds",
+    "HTTP time to first response body byte (SSE: first event)",
+    ["method", "route"]
+))
+
+HTTP_RESPONSE_SECONDS = REGISTRY.register(Histogram(
+    "rag_http_response_seconds",
+    "HTTP request latency until the last body byte (SSE: stream completion)",
+    ["method", "route"]
+))
+
+HTTP_RESPONSES = REGISTRY.register(Counter(
+    "rag_http_responses_total",
+    "HTTP responses by route and status code",
+    ["method", "route", "status"]
+))
+
+ANSWERS = REGISTRY.register(Counter(
+    "rag_answers_total",
+    "Pipeline outcomes per model (answered, cached, gated, no_context, error)",
+    ["model", "outcome"]
+))
+
+CACHE_HITS = REGISTRY.register(Counter(
+    "rag_cache_hits_total",
+    "Cache hits by cache",
+    ["cache"]
+))
+
+CACHE_MISSES = REGISTRY.register(Counter(
+    "rag_cache_misses_total",
+    "Cache misses by cache",
+    ["cache"]
+))
+
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "rag_http_in_flight_requests",
+    "HTTP requests currently being processed"
+))
+
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "rag_queue_depth",
+    "Items waiting per queue (admission:<priority>, generation:<model>, query_log, password_verify)",
+    ["queue"]
+))
+
+GENERATION_SECONDS = REGISTRY.register(Histogram(
+    "rag_generation_seconds",
+    "Ollama call latency per model, cold (model was loaded) or warm start",
+    ["model", "start"]
+))
+
+GENERATION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "rag_generation_in_flight",
+    "Ollama generations currently running per model",
+    ["model"]
+))
+
+ADMISSION = REGISTRY.register(Counter(
+    "rag_admission_total",
+    "Admission decisions per priority class (admitted, bypassed, rejected_full, "
+    "rejected_deadline, timed_out)",
+    ["priority", "outcome"]
+))
+
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "rag_admission_in_flight",
+    "Requests holding an admission (generation) slot"
+))
+
+LOGIN_ATTEMPTS = REGISTRY.register(Counter(
+    "rag_login_attempts_total",
+    "Login attempts by outcome (success, invalid, rate_limited, busy)",
+    ["outcome"]
+))
+
+QUERY_LOG_DROPPED = REGISTRY.register(Counter(
+    "rag_query_log_dropped_total",
+    "Query log entries dropped (queue full or write error)"
+))
+
+
+def observe_stages(stage_times: Dict[str, float]):
+    """Record a {stage: seconds} mapping in the stage histogram"""
+    for stage, seconds in stage_times.items():
+        if seconds is not None:
+            STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def observe_retrieval_timings(timings):
+    """MedicalRetriever.timing_sink: record a RetrievalTimings breakdown"""
+    observe_stages(timings.stage_seconds())
+
+
+def observe_request(record):
+    """RequestMiddleware sink: record a RequestRecord's timings and status"""
+    labels = {"method": record.method, "route": record.route}
+    if record.headers_time is not None:
+        HTTP_REQUEST_SECONDS.observe(record.headers_time, **labels)
+    if record.ttfb is not None:
+        HTTP_TTFB_SECONDS.observe(record.ttfb, **labels)
+    HTTP_RESPONSE_SECONDS.observe(record.duration, **labels)
+    HTTP_RESPONSES.inc(status=record.status, **labels)
@@ -4,46 +4,230 @@ FastAPI Middleware
 ==================
 
 Request logging and monitoring.
+
+RequestMiddleware is a pure ASGI middleware (no BaseHTTPMiddleware): it
+passes response messages straight through instead of re-wrapping the body
+stream, and it sees the end of streaming responses, so SSE requests are
+timed to stream completion, not just to the response headers.
+
+Per request it produces a RequestRecord (status, time to headers, time to
+first body byte, total duration, bytes sent) that is logged and handed to
+record sinks (metrics.observe_request by default).
 """
 
+import re
 import time
+import uuid
+import asyncio
 import logging
-from fastapi import Request
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.metrics import IN_FLIGHT, observe_request
+from app.profiling import PROFILER
+from app.security import verify_token
+from app.tracing import extract_context, start_span, trace_id_of
 
 logger = logging.getLogger("api")
 
+# Client-supplied request IDs are reused only if safe as file names
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
 
-async def log_requests(request: Request, call_next):
+@dataclass
+class RequestRecord:
+    """Timing and outcome of one HTTP request (seconds from request start)"""
+    request_id: str
+    method: str
+    path: str
+    client_ip: str
+    route: str = "unmatched"
+    status: int = 500  # Stays 500 if the app fails before responding
+    headers_time: Optional[float] = None  # Response headers sent
+    ttfb: Optional[float] = None  # First non-empty body chunk sent
+    duration: float = 0.0  # Last body chunk sent (stream completion)
+    bytes_sent: int = 0
+    streamed: bool = False  # Body sent in more than one chunk
+    disconnected: bool = False  # Client went away before the end
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _request_id(headers: Headers) -> str:
+    """X-Request-ID from the client, or a new random ID"""
+    request_id = headers.get("x-request-id", "")
+    return request_id if _REQUEST_ID.match(request_id) else uuid.uuid4().hex[:16]
+
+
+def _is_admin(headers: Headers) -> bool:
+    """Bearer token in the request belongs to an admin"""
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    
+    payload = verify_token(token)
+    return payload is not None and payload.get("role") == "admin"
+
+
+def _client_ip(scope, headers: Headers) -> str:
+    """Client IP (handles proxy headers)"""
+    if "x-forwarded-for" in headers:
+        return headers["x-forwarded-for"].split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _route_label(scope) -> str:
+    """Path template of the matched route (e.g. /api/v1/jobs/{job_id})"""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    
+    # Newer FastAPI keeps the unprefixed route for include_router(prefix=...):
+    # put the prefix (the part of the path the route does not match) back
+    path = scope["path"]
+    regex = getattr(route, "path_regex", None)
+    if regex is not None and not regex.match(path):
+        for i in range(1, len(path)):
+            if path[i] == "/" and regex.match(path[i:]):
+                return path[:i] + template
+    return template
+
+
+class RequestMiddleware:
     """
-    Middleware to log all HTTP requests
+    Pure ASGI request logging, metrics, tracing and profiling
     
     Logs:
         - Client IP
         - HTTP method
         - URL path
         - Status code
-        - Response time
-    """
-    start_time = time.time()
+        - Response time (headers), time to first byte and total duration
     
-    # Get client IP (handle proxy headers)
-    client_ip = request.client.host if request.client else "unknown"
-    if "x-forwarded-for" in request.headers:
-        client_ip = request.headers["x-forwarded-for"].split(",")[0].strip()
+    Also keeps the in-flight gauge, opens the request's root span
+    (continuing an incoming W3C traceparent) and sets X-Request-ID,
+    X-Process-Time (seconds to response headers) and X-Trace-Id headers.
     
-    # Process request
-    response = await call_next(request)
-    
-    # Calculate duration
-    duration = round(time.time() - start_time, 3)
+    Profiling: requests whose first byte takes longer than [profiling]
+    slow_threshold get their stack samples dumped, and admins can send
+    `X-Profile: 1` to run the request under cProfile. Files are named after
+    the request ID (X-Request-ID).
+    """
     
-    # Log request
-    logger.info(
-        f"{client_ip} | {request.method} {request.url.path} | "
-        f"Status {response.status_code} | {duration}s"
-    )
+    def __init__(self, app, sinks: Iterable[Callable[[RequestRecord], None]] = (observe_request,)):
+        self.app = app
+        self.sinks = list(sinks)
     
-    # Add custom header with response time
-    response.headers["X-Process-Time"] = str(duration)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        monotonic_start = time.monotonic()
+        headers = Headers(scope=scope)
+        
+        request_id = _request_id(headers)
+        scope.setdefault("state", {})["request_id"] = request_id  # request.state.request_id
+        
+        record = RequestRecord(
+            request_id=request_id,
+            method=scope["method"],
+            path=scope["path"],
+            client_ip=_client_ip(scope, headers)
+        )
+        
+        # Admin-requested cProfile
+        profile = None
+        if headers.get("x-profile") == "1" and PROFILER.allow_header and _is_admin(headers):
+            profile = PROFILER.start_cprofile()
+        
+        trace_id = None
+        
+        async def send_wrapper(message):
+            message_type = message["type"]
+            
+            if message_type == "http.response.start":
+                record.status = message["status"]
+                record.headers_time = time.perf_counter() - start
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Process-Time"] = str(round(record.headers_time, 3))
+                response_headers["X-Request-ID"] = request_id
+                if trace_id:
+                    response_headers["X-Trace-Id"] = trace_id
+            
+            elif message_type == "http.response.body":
+                body = message.get("body", b"")
+                if body:
+                    if record.ttfb is None:
+                        record.ttfb = time.perf_counter() - start
+                    record.bytes_sent += len(body)
+                if message.get("more_body", False):
+                    record.streamed = True
+            
+            try:
+                await send(message)
+            except OSError:
+                record.disconnected = True
+                raise
+        
+        # Process request inside the root span (endpoint spans become children)
+        IN_FLIGHT.inc()
+        try:
+            with start_span(
+                f"{record.method} {record.path}",
+                context=extract_context(headers),
+                kind="server",
+                **{
+                    "http.method": record.method,
+                    "http.target": record.path,
+                    "client.address": record.client_ip,
+                    "request.id": request_id
+                }
+            ) as span:
+                trace_id = trace_id_of(span)
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    # Route template (not raw path) keeps label cardinality bounded
+                    record.route = _route_label(scope)
+                    span.update_name(f"{record.method} {record.route}")
+                    span.set_attribute("http.route", record.route)
+                    span.set_attribute("http.status_code", record.status)
+                    if record.ttfb is not None:
+                        span.set_attribute("http.ttfb_ms", round(record.ttfb * 1000, 3))
+        finally:
+            IN_FLIGHT.dec()
+            record.duration = time.perf_counter() - start
+            if profile is not None:
+                PROFILER.finish_cprofile(profile, request_id, f"{record.method} {record.path}")
+            self._finish(record)
+        
+        # Slow request: dump what every thread was doing meanwhile
+        first_byte = record.ttfb if record.ttfb is not None else record.duration
+        if PROFILER.is_slow(first_byte):
+            await asyncio.to_thread(
+                PROFILER.dump_samples, request_id, monotonic_start,
+                monotonic_start + first_byte, f"{record.method} {record.path}"
+            )
     
-    return response
+    def _finish(self, record: RequestRecord):
+        """Log the request and hand its record to the sinks"""
+        for sink in self.sinks:
+            try:
+                sink(record)
+            except Exception as e:
+                logger.debug(f"Request record sink failed: {e}")
+        
+        ttfb = f"{record.ttfb:.3f}s" if record.ttfb is not None else "-"
+        logger.info(
+            f"{record.client_ip} | {record.method} {record.path} | "
+            f"Status {record.status} | {record.duration:.3f}s | ttfb {ttfb} | "
+            f"{record.bytes_sent}B{' (disconnected)' if record.disconnected else ''} | "
+            f"{record.request_id}"
+        )
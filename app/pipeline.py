@@ -7,9 +7,12 @@ Wraps the RAG logic with confidence scoring, logging, and validation.
 
 import os
 import sys
-import time
 import json
+import hashlib
+import time
+import asyncio
 import logging
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -25,16 +28,39 @@ logging.getLogger("chromadb.telemetry").setLevel(logging.CRITICAL)
 # Add scripts to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
 
-from retrieval import MedicalRetriever, RetrievedChunk
+from retrieval import MedicalRetriever, RetrievedChunk, RetrievalResult
+from compression import ContextCompressor
+from sentence_index import SentenceIndex, best_sentence_preview
 
-try:
-    import ollama
-except ImportError:
-    raise ImportError("Ollama not installed. Run: uv pip install ollama")
+from app.cache import CacheStore
+from app.generation import GenerationGateway, ModelWarmer
+from app.query_log import QueryLogWriter
+from app.tracing import (
+    current_span, open_span, setup_tracing, shutdown_tracing, span_context,
+    start_span, traced, with_context
+)
+from app.metrics import (
+    ANSWERS, CACHE_HITS, CACHE_MISSES, GENERATION_IN_FLIGHT, QUERY_LOG_DROPPED,
+    QUEUE_DEPTH, observe_retrieval_timings, observe_stages
+)
 
-# Configure Ollama client with environment variable support
+# Ollama endpoint with environment variable support
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-ollama_client = ollama.Client(host=OLLAMA_BASE_URL)
+
+
+@dataclass
+class PreparedAnswer:
+    """Retrieval + confidence state handed from prepare_answer to generate_answer"""
+    query: str
+    model: str
+    answer_mode: str
+    result: RetrievalResult
+    start_time: float
+    retrieval_time: float
+    confidence_label: str = "Low"
+    confidence_score: float = 0.0
+    debug_info: Dict = field(default_factory=dict)
+    response: Optional[Dict] = None  # Final answer that needs no generation
 
 
 class HealthcareRAG:
@@ -56,7 +82,107 @@ class HealthcareRAG:
             chroma_path=chroma_path,
             config_path=config_path
         )
+        self.config = self.retriever.config
+        
+        # Optional OpenTelemetry export ([tracing] section)
+        setup_tracing(self.config.get("tracing", {}), self.log_dir)
+        
+        # Retrieval stage timings feed the /metrics histograms
+        self.retriever.timing_sink = observe_retrieval_timings
+        
+        # Background, batched query log writer (logs/queries.jsonl)
+        self.query_log = QueryLogWriter.from_config(self.log_dir, self.config.get("query_log", {}))
+        
+        # Answer + query embedding caches shared by all worker processes ([cache]);
+        # keyed to the embedding model and knowledge base build
+        self.cache = CacheStore.from_config(
+            self.config.get("cache", {}),
+            namespace=(
+                f"{self.config['embeddings']['model_name']}:"
+                f"{self.config['chroma']['collection_name']}:{self._knowledge_base_version()}"
+            )
+        )
+        self.retriever.embedding_cache = self.cache.embeddings
+        
+        # Shared Ollama gateway (pooled client, per-model concurrency limits)
+        self.gateway = GenerationGateway.from_config(
+            self.config.get("generation", {}),
+            host=OLLAMA_BASE_URL
+        )
+        
+        # Startup warm-up + keep-alive pings (started by the API on startup)
+        self.warmer = ModelWarmer.from_config(self.gateway, self.config.get("generation", {}))
+        
+        # Extractive context compression (shares the retriever's encoder)
+        compression_config = self.config.get("compression", {})
+        self.compress_by_default = compression_config.get("enabled", False)
+        self.compressor = ContextCompressor(
+            self.retriever.model,
+            target_tokens=compression_config.get("target_tokens", 800),
+            min_sentences_per_chunk=compression_config.get("min_sentences_per_chunk", 1)
+        )
+        
+        # Optional sentence-level index (build_kb.py --sentence-index)
+        sentence_index_dir = self.config.get("sentence_index", {}).get(
+            "output_dir", "./data/sentence_index"
+        )
+        self.sentence_index = SentenceIndex.load(
+            sentence_index_dir,
+            model_name=self.config["embeddings"]["model_name"],
+            dim=self.retriever.model.get_sentence_embedding_dimension(),
+            n_chunks=self.retriever.collection.count()
+        )
+        if self.sentence_index is not None:
+            logging.info(f"Sentence index loaded: {len(self.sentence_index)} sentences")
+        
+        self._register_metric_sources()
         
+    def _knowledge_base_version(self) -> str:
+        """
+        Identify the knowledge base build (cache namespace)
+        
+        Uses the build timestamp from build_kb.py's manifest; without a
+        manifest, falls back to a hash of the chunk ids and texts.
+        
+        Returns:
+            Build timestamp or content hash
+        """
+        manifest_path = Path(
+            self.config.get("data_paths", {}).get("metadata_output_dir", "./data/metadata")
+        ) / "build_manifest.json"
+        try:
+            with open(manifest_path) as f:
+                return json.load(f)["build_timestamp"]
+        except (OSError, ValueError, KeyError):
+            logging.warning(f"No build timestamp in {manifest_path}, hashing knowledge base contents")
+        
+        data = self.retriever.collection.get(include=["documents"])
+        digest = hashlib.sha256()
+        for chunk_id, text in zip(data["ids"], data["documents"]):
+            digest.update(chunk_id.encode())
+            digest.update((text or "").encode())
+        return digest.hexdigest()[:16]
+    
+    def _register_metric_sources(self):
+        """Expose component stats (queues, caches) as scrape-time metrics"""
+        gateway, query_log, reranker = self.gateway, self.query_log, self.retriever.reranker
+        
+        def queue_depths():
+            depths = {("query_log",): query_log.stats()["queue_depth"]}
+            for model, n in gateway.stats()["queued"].items():
+                depths[(f"generation:{model}",)] = n
+            return depths
+        
+        QUEUE_DEPTH.add_source(queue_depths)
+        GENERATION_IN_FLIGHT.add_source(
+            lambda: {(model,): n for model, n in gateway.stats()["in_flight"].items()}
+        )
+        QUERY_LOG_DROPPED.add_source(lambda: {(): query_log.stats()["dropped"]})
+        
+        if reranker is not None:
+            CACHE_HITS.add_source(lambda: {("rerank",): reranker.stats["cache_hits"]})
+            CACHE_MISSES.add_source(lambda: {("rerank",): reranker.stats["cache_misses"]})
+    
     def compute_confidence(self, chunks: List[RetrievedChunk]) -> tuple[str, float]:
         """
         Compute confidence score based on retrieval quality
@@ -129,20 +255,112 @@ Instructions:
         
         return prompt
     
+    def _score_sentences(self, result) -> Dict:
+        """Rank sentences of retrieved chunks via the sentence index (one product)"""
+        if self.sentence_index is None or result.query_embedding is None:
+            return {}
+        
+        return self.sentence_index.score_chunks(
+            result.query_embedding,
+            [c.chunk_id for c in result.chunks]
+        )
+    
+    def _maybe_compress(self, result, compress_context: Optional[bool], sentence_scores: Optional[Dict] = None):
+        """Run extractive compression if requested (or enabled in config)"""
+        if compress_context is None:
+            compress_context = self.compress_by_default
+        
+        if not compress_context or result.query_embedding is None:
+            return None
+        
+        return self.compressor.compress(result.query_embedding, result.chunks, sentence_scores)
+    
+    @staticmethod
+    def _text_preview(chunk: RetrievedChunk, sentence_scores: Dict) -> str:
+        """Best-matching sentences of the chunk, falling back to truncation"""
+        if chunk.chunk_id in sentence_scores:
+            sentences, scores = sentence_scores[chunk.chunk_id]
+            preview = best_sentence_preview(sentences, scores, max_chars=200)
+            if preview:
+                return preview
+        
+        return chunk.text[:200] + "..." if len(chunk.text) > 200 else chunk.text
+    
+    @staticmethod
+    def _compression_report(compression, response) -> Dict:
+        """
+        Compression stats plus its effect on generation latency.
+        
+        Ollama reports prompt evaluation time separately; the per-token
+        prompt cost times the tokens removed estimates the time saved.
+        """
+        report = compression.to_dict()
+        
+        prompt_eval_count = response.get("prompt_eval_count") or 0
+        prompt_eval_duration = response.get("prompt_eval_duration") or 0  # nanoseconds
+        
+        report["prompt_eval_time"] = round(prompt_eval_duration / 1e9, 3)
+        if prompt_eval_count > 0:
+            per_token = prompt_eval_duration / 1e9 / prompt_eval_count
+            saved_tokens = compression.original_tokens - compression.compressed_tokens
+            report["estimated_time_saved"] = round(per_token * saved_tokens, 3)
+        else:
+            report["estimated_time_saved"] = None
+        
+        return report
+    
+    @staticmethod
+    def _record_metrics(model: str, outcome: str, span=None, **stage_times):
+        """Feed pipeline stage timings and the outcome into /metrics (retrieval reports via timing_sink)"""
+        observe_stages(stage_times)
+        ANSWERS.inc(model=model, outcome=outcome)
+        (span if span is not None else current_span()).set_attribute("rag.outcome", outcome)
+    
+    @staticmethod
+    def _annotate_retrieval(span, result):
+        """Retrieval summary and stage breakdown on the answer span"""
+        if not span.is_recording():
+            return
+        span.set_attributes({
+            "rag.chunks": len(result.chunks),
+            "rag.context_tokens": result.total_tokens,
+            "rag.reranked": result.reranked,
+            **{f"retrieval.{name}": ms for name, ms in result.timings.to_dict().items()}
+        })
+    
     def log_query(self, data: Dict):
-        """Log query to JSONL file"""
-        log_file = self.log_dir / "queries.jsonl"
+        """Queue query for the background JSONL writer (never blocks on disk I/O)"""
+        log_entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            **data
+        }
         
-        try:
-            with open(log_file, "a", encoding="utf-8") as f:
-                log_entry = {
-                    "timestamp": datetime.utcnow().isoformat(),
-                    **data
-                }
-                f.write(json.dumps(log_entry) + "\n")
-        except Exception as e:
-            logging.error(f"Failed to log query: {e}")
+        with start_span("query_log.submit") as span:
+            queued = self.query_log.submit(log_entry)
+            span.set_attribute("query_log.queued", queued)
+        
+        if not queued:
+            logging.debug("Query log entry dropped (queue full)")
+    
+    def after_fork(self):
+        """
+        Re-create per-process resources in a forked worker (gunicorn preload).
+        
+        Models stay shared copy-on-write with the master; database handles
+        and background threads do not survive fork() and are re-opened.
+        """
+        self.retriever.reconnect()
+        self.cache.after_fork()
+        self.query_log.after_fork()
     
+    def close(self):
+        """Stop background workers and drain the query log"""
+        self.warmer.stop()
+        self.query_log.close()
+        self.cache.close()
+        shutdown_tracing()
+    
+    @traced("rag.answer")
     def answer(
         self,
         query: str,
@@ -151,24 +369,139 @@ Instructions:
         model: str = "phi3:mini",
         temperature: float = 0.05,
         answer_mode: str = "clinical",
-        confidence_threshold: float = 0.50  # Lowered from 0.55 to reduce false negatives
+        confidence_threshold: float = 0.50,  # Lowered from 0.55 to reduce false negatives
+        compress_context: Optional[bool] = None,
+        rerank: Optional[bool] = None,
+        debug: bool = False,
+        priority: str = "interactive",
+        organ_filter: Optional[str] = None,
+        tier_filter: Optional[str] = None
     ) -> Dict:
         """
         Complete RAG pipeline with confidence scoring
         
+        Runs prepare_answer() then generate_answer(). The API calls the two
+        separately so answers that need no generation skip admission control.
+        
+        With debug=True the response includes the per-stage retrieval
+        timing breakdown ("retrieval_timings", milliseconds).
+        
+        organ_filter / tier_filter restrict retrieval to one organ_type /
+        tier of the knowledge base (ValueError for unknown values).
+        
         Returns:
             Dictionary with answer, sources, confidence, and timing
         """
+        prepared = self.prepare_answer(
+            query, top_k=top_k, model=model, answer_mode=answer_mode,
+            confidence_threshold=confidence_threshold, rerank=rerank, debug=debug,
+            organ_filter=organ_filter, tier_filter=tier_filter
+        )
+        if prepared.response is not None:
+            return prepared.response
+        
+        return self.generate_answer(
+            prepared, max_tokens=max_tokens, temperature=temperature,
+            compress_context=compress_context, priority=priority
+        )
+    
+    @traced("rag.prepare")
+    def prepare_answer(
+        self,
+        query: str,
+        top_k: int = 5,
+        model: str = "phi3:mini",
+        answer_mode: str = "clinical",
+        confidence_threshold: float = 0.50,
+        rerank: Optional[bool] = None,
+        debug: bool = False,
+        organ_filter: Optional[str] = None,
+        tier_filter: Optional[str] = None
+    ) -> PreparedAnswer:
+        """
+        Retrieval, confidence scoring and gating (everything before generation)
+        
+        Returns:
+            PreparedAnswer; its `response` is already final when no chunks
+            were found or the answer was confidence-gated
+        """
         start_time = time.time()
+        current_span().set_attributes({"rag.model": model, "rag.top_k": top_k})
         
         # Step 1: Retrieve
         retrieval_start = time.time()
-        result = self.retriever.retrieve(query, top_k=top_k)
-        chunks = result.chunks
+        result = self.retriever.retrieve(
+            query, top_k=top_k, organ_filter=organ_filter, tier_filter=tier_filter, use_reranker=rerank
+        )
         retrieval_time = time.time() - retrieval_start
+        self._annotate_retrieval(current_span(), result)
+        
+        return self._gate(
+            result, start_time, retrieval_time, model, answer_mode, confidence_threshold, debug
+        )
+    
+    @traced("rag.prepare_batch")
+    def prepare_answers(self, items: List[Dict]) -> List[PreparedAnswer]:
+        """
+        prepare_answer() for many queries with one batched retrieval pass
+        (single embedding call, one vector search per filter, see batch_retrieve)
+        
+        Args:
+            items: prepare_answer keyword arguments per query
+        
+        Returns:
+            PreparedAnswer per item, in order
+        """
+        start_time = time.time()
+        current_span().set_attribute("rag.batch_size", len(items))
+        
+        results = self.retriever.batch_retrieve(
+            [item["query"] for item in items],
+            top_k=[item.get("top_k", 5) for item in items],
+            use_reranker=[item.get("rerank") for item in items],
+            organ_filter=[item.get("organ_filter") for item in items],
+            tier_filter=[item.get("tier_filter") for item in items]
+        )
+        retrieval_time = time.time() - start_time
+        
+        return [
+            self._gate(
+                result, start_time, retrieval_time,
+                item.get("model", "phi3:mini"),
+                item.get("answer_mode", "clinical"),
+                item.get("confidence_threshold", 0.50),
+                item.get("debug", False)
+            )
+            for item, result in zip(items, results)
+        ]
+    
+    def _gate(
+        self,
+        result: RetrievalResult,
+        start_time: float,
+        retrieval_time: float,
+        model: str,
+        answer_mode: str,
+        confidence_threshold: float,
+        debug: bool
+    ) -> PreparedAnswer:
+        """Confidence scoring and gating of a retrieval result"""
+        query, chunks = result.query, result.chunks
+        debug_info = {"retrieval_timings": result.timings.to_dict()} if debug else {}
+        
+        prepared = PreparedAnswer(
+            query=query,
+            model=model,
+            answer_mode=answer_mode,
+            result=result,
+            start_time=start_time,
+            retrieval_time=retrieval_time,
+            debug_info=debug_info
+        )
         
         if not chunks:
-            return {
+            self._record_metrics(model, "no_context", total=time.time() - start_time)
+            prepared.response = {
                 "query": query,
                 "answer": "No relevant information found in the knowledge base.",
                 "confidence": "Low",
@@ -179,15 +512,20 @@ Instructions:
                 "total_time": time.time() - start_time,
                 "chunks_used": 0,
                 "total_tokens": 0,
-                "model": model
+                "model": model,
+                **debug_info
             }
+            return prepared
         
         # Step 2: Compute confidence
         confidence_label, confidence_score = self.compute_confidence(chunks)
+        prepared.confidence_label = confidence_label
+        prepared.confidence_score = confidence_score
         
         # Step 2.5: Confidence gating (production safety)
         if confidence_score < confidence_threshold:
-            return {
+            self._record_metrics(model, "gated", total=time.time() - start_time)
+            prepared.response = {
                 "query": query,
                 "answer": f"⚠️ Insufficient evidence in knowledge base (confidence: {confidence_score:.2f} < {confidence_threshold:.2f}). Please consult medical documentation or a specialist for this specific query.",
                 "confidence": "Low",
@@ -199,28 +537,69 @@ Instructions:
                 "chunks_used": len(chunks),
                 "total_tokens": result.total_tokens,
                 "model": model,
-                "gated": True
+                "gated": True,
+                **debug_info
             }
         
+        return prepared
+    
+    @traced("rag.generate")
+    def generate_answer(
+        self,
+        prepared: PreparedAnswer,
+        max_tokens: int = 512,
+        temperature: float = 0.05,
+        compress_context: Optional[bool] = None,
+        priority: str = "interactive"
+    ) -> Dict:
+        """
+        Compression, prompt building, generation and logging for a
+        PreparedAnswer without an early response
+        
+        `priority` ("interactive" or "batch") orders the generation queue.
+        
+        Returns:
+            Dictionary with answer, sources, confidence, and timing
+        """
+        query, model, result = prepared.query, prepared.model, prepared.result
+        chunks = result.chunks
+        start_time = prepared.start_time
+        retrieval_time = prepared.retrieval_time
+        confidence_label = prepared.confidence_label
+        confidence_score = prepared.confidence_score
+        debug_info = prepared.debug_info
+        
+        # Step 2.75: Optional extractive compression (citations preserved)
+        sentence_scores = self._score_sentences(result)
+        compression = self._maybe_compress(result, compress_context, sentence_scores)
+        prompt_chunks = compression.chunks if compression else chunks
+        
         # Step 3: Build prompt
-        prompt = self.build_prompt(query, chunks, answer_mode)
+        prompt_start = time.time()
+        prompt = self.build_prompt(query, prompt_chunks, prepared.answer_mode)
+        prompt_build_time = time.time() - prompt_start
         
         # Step 4: Generate
         generation_start = time.time()
         try:
-            response = ollama_client.chat(
+            response = self.gateway.chat(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
                 options={
                     "temperature": temperature,
                     "num_predict": max_tokens
-                }
+                },
+                priority=priority
             )
             answer = response['message']['content'].strip()
             generation_time = time.time() - generation_start
             
+            if compression:
+                compression_info = self._compression_report(compression, response)
+            
         except Exception as e:
             logging.error(f"Generation error: {e}")
+            self._record_metrics(model, "error", total=time.time() - start_time)
             return {
                 "query": query,
                 "answer": f"Error generating response: {str(e)}",
@@ -232,7 +611,9 @@ Instructions:
                 "total_time": time.time() - start_time,
                 "chunks_used": len(chunks),
                 "total_tokens": result.total_tokens,
-                "model": model
+                "model": model,
+                "error": str(e),  # Marks the failure (never cached; not in QueryResponse)
+                **debug_info
             }
         
         # Step 5: Format sources
@@ -244,7 +625,7 @@ Instructions:
                 "organ_type": chunk.organ_type,
                 "similarity_score": round(chunk.similarity_score, 3),
                 "token_count": chunk.token_count,
-                "text_preview": chunk.text[:200] + "..." if len(chunk.text) > 200 else chunk.text
+                "text_preview": self._text_preview(chunk, sentence_scores)
             })
         
         total_time = time.time() - start_time
@@ -261,8 +642,20 @@ Instructions:
             "total_time": round(total_time, 3),
             "chunks_used": len(chunks),
             "total_tokens": result.total_tokens,
-            "model": model
+            "model": model,
+            "reranked": result.reranked,
+            **debug_info
         }
+        if compression:
+            response_data["compression"] = compression_info
+        
+        self._record_metrics(
+            model, "answered",
+            compression=compression.compression_time if compression else None,
+            prompt_build=prompt_build_time,
+            generation=generation_time,
+            total=total_time
+        )
         
         # Step 7: Log query
         self.log_query({
@@ -271,6 +664,8 @@ Instructions:
             "confidence_score": confidence_score,
             "chunks_used": len(chunks),
             "total_time": total_time,
+            "generation_time": generation_time,
+            "compression_ratio": compression_info["compression_ratio"] if compression else None,
             "model": model
         })
         
@@ -282,23 +677,73 @@ Instructions:
         top_k: int = 4,
         max_tokens: int = 512,
         model: str = "gemma3:1b",
-        temperature: float = 0.1
+        temperature: float = 0.1,
+        compress_context: Optional[bool] = None,
+        rerank: Optional[bool] = None,
+        debug: bool = False,
+        priority: str = "interactive",
+        organ_filter: Optional[str] = None,
+        tier_filter: Optional[str] = None
     ):
         """
         Streaming RAG pipeline - yields tokens as they're generated
         
+        Model validation/pre-loading runs concurrently with retrieval, and
+        the metadata event is sent as soon as retrieval finishes.
+        
         Yields:
             Dictionary chunks with streaming tokens and metadata
         """
+        # Span stays open across yields, so it is passed down explicitly
+        # instead of being attached as the current span
+        span = open_span("rag.answer_stream", **{"rag.model": model, "rag.top_k": top_k})
+        try:
+            async for event in self._answer_stream(
+                span, query, top_k, max_tokens, model, temperature,
+                compress_context, rerank, debug, priority, organ_filter, tier_filter
+            ):
+                yield event
+        finally:
+            span.end()
+    
+    async def _answer_stream(
+        self,
+        span,
+        query: str,
+        top_k: int,
+        max_tokens: int,
+        model: str,
+        temperature: float,
+        compress_context: Optional[bool],
+        rerank: Optional[bool],
+        debug: bool,
+        priority: str,
+        organ_filter: Optional[str],
+        tier_filter: Optional[str]
+    ):
+        """answer_stream body; thread work runs with `span` as trace parent"""
+        ctx = span_context(span)
         start_time = time.time()
         
-        # Step 1: Retrieve (non-streaming)
+        # Step 0: Prepare generation (validate + pre-load model) in parallel with retrieval
+        prepare_task = asyncio.ensure_future(
+            asyncio.to_thread(with_context(ctx, self.gateway.prepare), model)
+        )
+        # Mark failures as retrieved when we return before awaiting (no chunks)
+        prepare_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        
+        # Step 1: Retrieve (non-streaming, off the event loop)
         retrieval_start = time.time()
-        result = self.retriever.retrieve(query, top_k=top_k)
+        result = await asyncio.to_thread(
+            with_context(ctx, self.retriever.retrieve), query, top_k=top_k,
+            organ_filter=organ_filter, tier_filter=tier_filter, use_reranker=rerank
+        )
         chunks = result.chunks
         retrieval_time = time.time() - retrieval_start
+        self._annotate_retrieval(span, result)
         
         if not chunks:
+            self._record_metrics(model, "no_context", span, total=time.time() - start_time)
             yield {
                 "type": "error",
                 "message": "No relevant information found in the knowledge base.",
@@ -309,7 +754,7 @@ Instructions:
         # Step 2: Compute confidence
         confidence_label, confidence_score = self.compute_confidence(chunks)
         
-        # Step 3: Send metadata first
+        # Step 3: Send metadata immediately
         sources = []
         for chunk in chunks[:3]:
             sources.append({
@@ -319,7 +764,7 @@ Instructions:
                 "similarity_score": round(chunk.similarity_score, 3)
             })
         
-        yield {
+        metadata = {
             "type": "metadata",
             "query": query,
             "confidence": confidence_label,
@@ -327,30 +772,70 @@ Instructions:
             "sources": sources,
             "retrieval_time": round(retrieval_time, 3),
             "chunks_used": len(chunks),
+            "reranked": result.reranked,
             "model": model
         }
+        if debug:
+            metadata["retrieval_timings"] = result.timings.to_dict()
+        yield metadata
+        
+        # Step 4: Build prompt (optionally from compressed context; compression
+        # may encode every sentence, so it runs off the event loop too)
+        def compress_and_build():
+            compression = self._maybe_compress(result, compress_context, self._score_sentences(result))
+            prompt_start = time.time()
+            prompt = self.build_prompt(query, compression.chunks if compression else chunks)
+            return compression, prompt, time.time() - prompt_start
+        
+        compression, prompt, prompt_build_time = await asyncio.to_thread(
+            with_context(ctx, compress_and_build)
+        )
         
-        # Step 4: Build prompt
-        prompt = self.build_prompt(query, chunks)
+        # Step 5: Model must be ready (usually finished during retrieval)
+        try:
+            prepare_info = await prepare_task
+        except Exception as e:
+            logging.error(f"Model preparation failed for {model}: {e}")
+            self._record_metrics(model, "error", span, total=time.time() - start_time)
+            yield {
+                "type": "error",
+                "message": f"Model not available: {model} ({e})",
+                "done": True
+            }
+            return
         
-        # Step 5: Stream generation
+        # Step 6: Stream generation (sync Ollama iterator advanced off the event loop)
         generation_start = time.time()
         full_answer = ""
+        time_to_first_token = None
+        final_chunk = None
+        
+        stream = self.gateway.chat(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            options={
+                "temperature": temperature,
+                "num_predict": max_tokens
+            },
+            stream=True,
+            priority=priority
+        )
         
+        read = None
         try:
-            stream = ollama_client.chat(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                options={
-                    "temperature": temperature,
-                    "num_predict": max_tokens
-                },
-                stream=True
-            )
-            
-            for chunk in stream:
+            while True:
+                # Shielded: a cancelled await must not lose track of the running read
+                read = asyncio.ensure_future(asyncio.to_thread(with_context(ctx, next), stream, None))
+                chunk = await asyncio.shield(read)
+                if chunk is None:
+                    break
+                
                 token = chunk['message']['content']
                 full_answer += token
+                final_chunk = chunk
+                
+                if time_to_first_token is None and token:
+                    time_to_first_token = time.time() - start_time
                 
                 yield {
                     "type": "token",
@@ -359,6 +844,7 @@ Instructions:
         
         except Exception as e:
             logging.error(f"Streaming generation error: {e}")
+            self._record_metrics(model, "error", span, total=time.time() - start_time)
             yield {
                 "type": "error",
                 "message": str(e),
@@ -366,24 +852,55 @@ Instructions:
             }
             return
         
+        finally:
+            # Releases the gateway slot if the client disconnected mid-stream
+            if read is None or read.done():
+                stream.close()
+            else:
+                # Cancelled mid-read: the worker thread is still inside the
+                # generator, which can only be closed once that read returns
+                def close_stream(task):
+                    if not task.cancelled():
+                        task.exception()
+                    stream.close()
+                
+                read.add_done_callback(close_stream)
+        
         generation_time = time.time() - generation_start
         total_time = time.time() - start_time
         
-        # Step 6: Send completion
-        yield {
+        self._record_metrics(
+            model, "answered", span,
+            compression=compression.compression_time if compression else None,
+            prompt_build=prompt_build_time,
+            ttft=time_to_first_token,
+            generation=generation_time,
+            total=total_time
+        )
+        
+        # Step 7: Send completion
+        done_event = {
             "type": "done",
+            "time_to_first_token": round(time_to_first_token, 3) if time_to_first_token is not None else None,
+            "model_prepare_time": prepare_info["prepare_time"],
+            "model_preloaded": prepare_info["preloaded"],
             "generation_time": round(generation_time, 3),
             "total_time": round(total_time, 3),
             "total_tokens": result.total_tokens,
             "done": True
         }
+        if compression and final_chunk is not None:
+            # Final stream chunk carries Ollama's prompt eval statistics
+            done_event["compression"] = self._compression_report(compression, final_chunk)
+        yield done_event
         
-        # Step 7: Log query
-        self.log_query({
+        # Step 8: Log query
+        with_context(ctx, self.log_query)({
             "query": query,
             "confidence": confidence_label,
             "confidence_score": confidence_score,
             "chunks_used": len(chunks),
+            "time_to_first_token": time_to_first_token,
             "total_time": total_time,
             "model": model,
             "streamed": True
@@ -398,7 +915,7 @@ Instructions:
             
             # Check Ollama
             try:
-                ollama_client.list()
+                self.gateway.list()
                 ollama_ok = True
             except:
                 ollama_ok = False
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Request Profiling
+=================
+
+After-the-fact diagnosis of slow requests.
+
+- Stack sampler: one background thread samples every thread's stack every
+  `sample_interval` seconds into a bounded ring buffer. When a request's
+  first response byte takes longer than `slow_threshold` (for SSE: the
+  first event), the samples taken until then are written as collapsed
+  stacks (flamegraph.pl / speedscope format):
+  logs/profiles/{request_id}.collapsed
+- cProfile on demand: an admin sends `X-Profile: 1` and the request runs
+  under cProfile (event-loop thread; worker threads are covered by the
+  sampler): logs/profiles/{request_id}.pstats and {request_id}.txt
+
+The sampler sees the whole process, so a slow-request profile also shows
+what concurrent requests were doing at the time (queueing, lock waits).
+Each stack is rooted at its thread name (MainThread = event loop).
+
+Usage:
+    from app.profiling import PROFILER
+
+    PROFILER.configure(config["profiling"])
+    PROFILER.start()
+"""
+
+import io
+import os
+import re
+import sys
+import time
+import pstats
+import logging
+import cProfile
+import threading
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("profiling")
+
+# Profile file names are generated here; anything else is rejected on download
+PROFILE_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}\.(collapsed|pstats|txt)$")
+
+
+class StackSampler:
+    """Periodic all-thread stack sampler with a time-bounded ring buffer"""
+
+    def __init__(self, interval: float = 0.01, buffer_seconds: float = 120.0):
+        """
+        Args:
+            interval: Seconds between samples
+            buffer_seconds: History kept in memory (longer requests are truncated)
+        """
+        self.interval = interval
+        self._samples: deque = deque(maxlen=max(1, int(buffer_seconds / interval)))
+        self._labels: Dict[object, str] = {}  # code object -> frame label
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame) -> str:
+        parts = []
+        while frame is not None:
+            parts.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = {}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                thread_name = names.get(ident, f"thread-{ident}")
+                stacks[thread_name] = self._collapse(frame)
+
+            with self._lock:
+                self._samples.append((time.monotonic(), stacks))
+
+    def window(self, start: float, end: float) -> Counter:
+        """Collapsed stack counts for samples taken in [start, end] (monotonic)"""
+        with self._lock:
+            samples = [s for s in self._samples if start <= s[0] <= end]
+
+        counts: Counter = Counter()
+        for _, stacks in samples:
+            for thread_name, stack in stacks.items():
+                counts[f"{thread_name};{stack}"] += 1
+        return counts
+
+
+class RequestProfiler:
+    """Slow-request sampling dumps, admin-triggered cProfile, profile listing"""
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_threshold = 5.0
+        self.allow_header = True
+        self.max_profiles = 200
+        self.output_dir = Path("./logs/profiles")
+        self.sampler: Optional[StackSampler] = None
+        self._cprofile_lock = threading.Lock()  # One cProfile at a time per process
+
+    def configure(self, config: Dict):
+        """Apply the [profiling] section of rag_config.toml"""
+        self.enabled = config.get("enabled", False)
+        self.slow_threshold = config.get("slow_threshold", 5.0)
+        self.allow_header = config.get("allow_header", True)
+        self.max_profiles = config.get("max_profiles", 200)
+        self.output_dir = Path(config.get("output_dir", "./logs/profiles"))
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        if self.enabled:
+            self.sampler = StackSampler(
+                interval=config.get("sample_interval", 0.01),
+                buffer_seconds=config.get("buffer_seconds", 120.0)
+            )
+
+    def start(self):
+        if self.sampler is not None:
+            self.sampler.start()
+            logger.info(
+                f"Stack sampler running ({self.sampler.interval * 1000:.0f}ms interval, "
+                f"dumps requests slower than {self.slow_threshold}s)"
+            )
+
+    def stop(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    # ------------------------------------------------------------------
+    # Slow-request dumps
+    # ------------------------------------------------------------------
+
+    def is_slow(self, elapsed: float) -> bool:
+        return self.sampler is not None and self.sampler.running and elapsed >= self.slow_threshold
+
+    def dump_samples(self, request_id: str, start: float, end: float, label: str = "") -> Optional[Path]:
+        """
+        Write stack samples taken between start and end (monotonic seconds).
+
+        Returns:
+            Path of the collapsed-stack file, or None if nothing was sampled
+        """
+        counts = self.sampler.window(start, end)
+        if not counts:
+            return None
+
+        path = self.output_dir / f"{request_id}.collapsed"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+        logger.warning(
+            f"Slow request {request_id} {label} ({end - start:.2f}s): "
+            f"{sum(counts.values())} samples -> {path}"
+        )
+        self._prune()
+        return path
+
+    # ------------------------------------------------------------------
+    # cProfile (admin header)
+    # ------------------------------------------------------------------
+
+    def start_cprofile(self) -> Optional[cProfile.Profile]:
+        """Start cProfile unless one is already running (returns None then)"""
+        if not self._cprofile_lock.acquire(blocking=False):
+            logger.info("cProfile already active, skipping X-Profile request")
+            return None
+
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish_cprofile(self, profile: cProfile.Profile, request_id: str, label: str = "") -> Path:
+        """Stop cProfile and write .pstats plus a text summary"""
+        try:
+            profile.disable()
+        finally:
+            self._cprofile_lock.release()
+
+        stats_path = self.output_dir / f"{request_id}.pstats"
+        profile.dump_stats(stats_path)
+
+        summary = io.StringIO()
+        summary.write(f"# {label}\n")
+        stats = pstats.Stats(profile, stream=summary)
+        stats.sort_stats("cumulative").print_stats(50)
+        (self.output_dir / f"{request_id}.txt").write_text(summary.getvalue(), encoding="utf-8")
+
+        logger.info(f"cProfile for {request_id} written to {stats_path}")
+        self._prune()
+        return stats_path
+
+    # ------------------------------------------------------------------
+    # Listing / download
+    # ------------------------------------------------------------------
+
+    def list_profiles(self) -> List[Dict]:
+        """Profile files, newest first"""
+        if not self.output_dir.exists():
+            return []
+
+        profiles = []
+        for path in self.output_dir.iterdir():
+            if not PROFILE_NAME.match(path.name):
+                continue
+            stat = path.stat()
+            profiles.append({
+                "name": path.name,
+                "request_id": path.stem,
+                "kind": "sampled" if path.suffix == ".collapsed" else "cprofile",
+                "size_bytes": stat.st_size,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stat.st_mtime)),
+            })
+        return sorted(profiles, key=lambda p: p["created"], reverse=True)
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        """Resolve a profile file name (None if invalid or missing)"""
+        if not PROFILE_NAME.match(name):
+            return None
+        path = self.output_dir / name
+        return path if path.is_file() else None
+
+    def _prune(self):
+        """Keep only the newest max_profiles files"""
+        files = sorted(
+            (p for p in self.output_dir.iterdir() if PROFILE_NAME.match(p.name)),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+        for path in files[self.max_profiles:]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+# Process-wide profiler (configured on API startup)
+PROFILER = RequestProfiler()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Query Log Writer
+================
+
+Background JSONL writer for the query audit log (logs/queries.jsonl).
+
+- Request path only enqueues (bounded in-memory queue)
+- Writer thread flushes in batches, by size or by time
+- Rotation by file size and/or calendar date, optional gzip of rotated files
+- Overflow policy: "drop" (never block a request) or "block" (wait up to
+  `block_timeout`, then drop); every outcome is counted
+- Queue is drained on close (API shutdown / interpreter exit)
+"""
+
+import os
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from app.tracing import start_span
+
+logger = logging.getLogger("query_log")
+
+_STOP = object()  # Queue sentinel
+
+
+class QueryLogWriter:
+    """Bounded-queue, batched, rotating JSONL writer"""
+
+    def __init__(
+        self,
+        log_dir: Path,
+        filename: str = "queries.jsonl",
+        max_queue: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        rotate_bytes: int = 50 * 1024 * 1024,
+        rotate_daily: bool = True,
+        compress: bool = True,
+        overflow_policy: str = "drop",
+        block_timeout: float = 0.05
+    ):
+        """
+        Initialize writer and start its thread.
+
+        Args:
+            log_dir: Directory for the log file
+            filename: Active log file name
+            max_queue: Max entries waiting to be written
+            batch_size: Max entries per write
+            flush_interval: Max seconds an entry waits before being flushed
+            rotate_bytes: Rotate when the file would exceed this size (0 = never)
+            rotate_daily: Rotate when the date changes
+            compress: Gzip rotated files
+            overflow_policy: "drop" or "block" when the queue is full
+            block_timeout: Max seconds to block before dropping ("block" policy)
+        """
+        if overflow_policy not in ("drop", "block"):
+            raise ValueError(f"Invalid overflow_policy: {overflow_policy}")
+
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.log_dir / filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._file_date = None
+        self._closed = False
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "written": 0,
+            "dropped": 0,
+            "blocked": 0,
+            "batches": 0,
+            "rotations": 0,
+            "write_errors": 0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_config(cls, log_dir: Path, config: Dict) -> "QueryLogWriter":
+        """Create writer from the [query_log] section of rag_config.toml"""
+        return cls(
+            log_dir,
+            max_queue=config.get("max_queue", 10000),
+            batch_size=config.get("batch_size", 100),
+            flush_interval=config.get("flush_interval", 1.0),
+            rotate_bytes=config.get("rotate_mb", 50) * 1024 * 1024,
+            rotate_daily=config.get("rotate_daily", True),
+            compress=config.get("compress", True),
+            overflow_policy=config.get("overflow_policy", "drop"),
+            block_timeout=config.get("block_timeout", 0.05)
+        )
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def submit(self, entry: Dict) -> bool:
+        """
+        Enqueue one log entry (non-blocking unless policy is "block").
+
+        Returns:
+            True if queued, False if dropped
+        """
+        if self._closed:
+            return False
+
+        self._count("submitted")
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == "block":
+            self._count("blocked")
+            try:
+                self._queue.put(entry, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                pass
+
+        self._count("dropped")
+        return False
+
+    def after_fork(self):
+        """
+        Restart in a forked worker process (the writer thread does not
+        survive fork).
+
+        Each worker writes its own file (queries.{pid}.jsonl), so workers
+        never rotate a file another process is still appending to. Entries
+        queued in the master before the fork stay with the master.
+        """
+        self.path = self.path.with_name(f"{self.path.stem}.{os.getpid()}{self.path.suffix}")
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._file = None
+        self._file_date = None
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(self._stats, 0)
+
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict:
+        """Counters plus current queue depth"""
+        with self._lock:
+            return {**self._stats, "queue_depth": self._queue.qsize()}
+
+    def close(self, timeout: float = 5.0):
+        """Drain the queue, flush and close the file"""
+        if self._closed:
+            return
+        self._closed = True
+
+        # Sentinel goes in even if the queue is full (blocking put)
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Query log queue full at shutdown; pending entries may be lost")
+        self._thread.join(timeout=timeout)
+
+        stats = self.stats()
+        logger.info(
+            f"Query log closed: {stats['written']} written, {stats['dropped']} dropped"
+        )
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch: List[Dict] = []
+            if first is _STOP:
+                stopping = True
+            else:
+                batch.append(first)
+
+            # Drain everything available (all of it when stopping)
+            while stopping or len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+                if not stopping and len(batch) >= self.batch_size:
+                    break
+
+            if batch:
+                self._write(batch)
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch: List[Dict]):
+        """Write one batch with a single write() call"""
+        data = "".join(json.dumps(entry) + "\n" for entry in batch)
+
+        with start_span("query_log.write", **{"query_log.batch_size": len(batch)}) as span:
+            try:
+                self._maybe_rotate(len(data.encode("utf-8")))
+                if self._file is None:
+                    self._open()
+                self._file.write(data)
+                self._file.flush()
+            except Exception as e:
+                logger.error(f"Failed to write query log batch: {e}")
+                span.set_attribute("query_log.error", str(e))
+                self._count("write_errors")
+                self._count("dropped", len(batch))
+                return
+
+        self._count("written", len(batch))
+        self._count("batches")
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self.path.stat().st_size > 0:
+            self._file_date = datetime.fromtimestamp(self.path.stat().st_mtime).date()
+        else:
+            self._file_date = datetime.now().date()
+
+    def _maybe_rotate(self, incoming_bytes: int):
+        """Rotate the active file on date change or size limit"""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+
+        if self._file_date is None:
+            self._file_date = datetime.fromtimestamp(self.path.stat().st_mtime).date()
+
+        date_changed = self.rotate_daily and datetime.now().date() != self._file_date
+        too_big = self.rotate_bytes > 0 and self.path.stat().st_size + incoming_bytes > self.rotate_bytes
+
+        if date_changed or too_big:
+            self._rotate()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        rotated = self.path.with_name(f"{self.path.stem}_{stamp}{self.path.suffix}")
+        os.replace(self.path, rotated)
+
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            rotated.unlink()
+
+        self._file_date = None
+        self._count("rotations")
@@ -6,7 +6,7 @@ Pydantic Schemas for API Request/Response
 
 import os
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class QueryRequest(BaseModel):
@@ -18,6 +18,12 @@ class QueryRequest(BaseModel):
     temperature: float = Field(default=float(os.getenv("DEFAULT_TEMPERATURE", "0.1")), ge=0.0, le=1.0, description="Sampling temperature")
     answer_mode: str = Field(default="clinical", description="Answer style: brief, clinical, or detailed")
     confidence_threshold: float = Field(default=0.50, ge=0.0, le=1.0, description="Minimum confidence to return answer")
+    compress_context: Optional[bool] = Field(default=None, description="Extractive context compression (default: rag_config.toml)")
+    rerank: Optional[bool] = Field(default=None, description="Cross-encoder reranking of over-fetched candidates (default: rag_config.toml)")
+    organ_filter: Optional[str] = Field(default=None, description="Organ type: kidney, liver, heart, pancreas or foundational")
+    tier_filter: Optional[str] = Field(default=None, description='Knowledge base tier, e.g. "Tier 2: Kidney"')
+    debug: bool = Field(default=False, description="Include per-stage retrieval timings in the response")
+    priority: Optional[str] = Field(default=None, pattern="^(interactive|batch)$", description="Scheduling class: interactive or batch (default: from the caller's role)")
     
     @field_validator('query')
     @classmethod
@@ -44,6 +50,70 @@ class QueryRequest(BaseModel):
         return v
 
 
+class BatchQueryRequest(BaseModel):
+    """Request schema for /query/batch (results streamed back as NDJSON)"""
+    queries: List[QueryRequest] = Field(..., min_length=1, max_length=int(os.getenv("MAX_BATCH_QUERIES", "32")), description="Queries to answer")
+
+
+class RetrieveRequest(BaseModel):
+    """Request schema for retrieval-only search (no generation)"""
+    query: str = Field(..., min_length=5, max_length=500, description="Search query")
+    top_k: int = Field(default=8, ge=1, le=20, description="Number of chunks (before dedup and context budget)")
+    organ_filter: Optional[str] = Field(default=None, description="Organ type: kidney, liver, heart, pancreas or foundational")
+    tier_filter: Optional[str] = Field(default=None, description='Knowledge base tier, e.g. "Tier 2: Kidney"')
+    hybrid: Optional[bool] = Field(default=None, description="BM25 + vector hybrid search (default: retriever setting)")
+    route: Optional[bool] = Field(default=None, description="Search the predicted organ's chunks first (default: rag_config.toml [routing])")
+    coarse: Optional[bool] = Field(default=None, description="Coarse-to-fine search via section centroids (default: rag_config.toml [coarse_search])")
+    rerank: Optional[bool] = Field(default=None, description="Cross-encoder reranking of over-fetched candidates (default: rag_config.toml)")
+    include_text: bool = Field(default=True, description="Return chunk texts (false: IDs, metadata and scores only)")
+    debug: bool = Field(default=False, description="Include per-stage retrieval timings in the response")
+    
+    @field_validator('query')
+    @classmethod
+    def validate_query(cls, v: str) -> str:
+        v = v.strip()
+        if len(v) < 5:
+            raise ValueError("Query must be at least 5 characters")
+        return v
+
+
+class BatchRetrieveRequest(BaseModel):
+    """Request schema for /retrieve/batch"""
+    queries: List[RetrieveRequest] = Field(..., min_length=1, max_length=int(os.getenv("MAX_BATCH_QUERIES", "32")), description="Searches to run")
+
+
+class ChunkInfo(BaseModel):
+    """Retrieved chunk (/retrieve)"""
+    chunk_id: str
+    doc_id: str
+    doc_title: str
+    section_title: str
+    organ_type: str
+    tier: str
+    token_count: int
+    similarity_score: float
+    rerank_score: Optional[float] = None
+    rank: int
+    text: Optional[str] = None  # Omitted when include_text is false
+
+
+class RetrieveResponse(BaseModel):
+    """Response schema for retrieval-only search"""
+    query: str
+    chunks: List[ChunkInfo]
+    total_tokens: int
+    retrieval_time: float  # Seconds
+    reranked: bool = False
+    routing: Optional[Dict] = None  # Organ routing decision (routed searches only)
+    retrieval_timings: Optional[Dict[str, float]] = None  # Milliseconds per stage (debug only)
+
+
+class BatchRetrieveResponse(BaseModel):
+    """Response schema for /retrieve/batch (results in request order)"""
+    results: List[RetrieveResponse]
+    total_time: float
+
+
 class SourceInfo(BaseModel):
     """Source citation information"""
     document: str
@@ -54,6 +124,18 @@ class SourceInfo(BaseModel):
     text_preview: Optional[str] = None
 
 
+class CompressionInfo(BaseModel):
+    """Context compression statistics"""
+    original_tokens: int
+    compressed_tokens: int
+    compression_ratio: float
+    sentences_total: int
+    sentences_kept: int
+    compression_time: float
+    prompt_eval_time: float
+    estimated_time_saved: Optional[float] = None
+
+
 class QueryResponse(BaseModel):
     """Response schema for RAG query"""
     query: str
@@ -68,6 +150,23 @@ class QueryResponse(BaseModel):
     total_tokens: int
     model: str
     user: Optional[str] = None  # User who made the query
+    compression: Optional[CompressionInfo] = None
+    reranked: bool = False
+    retrieval_timings: Optional[Dict[str, float]] = None  # Milliseconds per stage (debug only)
+    cached: bool = False  # Served from the answer cache ([cache])
+
+
+class JobStatus(BaseModel):
+    """Answer job status (POST /jobs, GET /jobs/{job_id})"""
+    job_id: str
+    status: str  # "queued", "running", "succeeded", "failed"
+    created_at: float
+    updated_at: float
+    expires_at: Optional[float] = None  # Unix time the finished job is deleted
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None
+    status_url: str
+    events_url: str
 
 
 class HealthStatus(BaseModel):
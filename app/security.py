@@ -7,17 +7,53 @@ Handles token creation, verification, and password hashing.
 """
 
 import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
+from app.metrics import CACHE_HITS, CACHE_MISSES, QUEUE_DEPTH, STAGE_SECONDS
+
 # Load from environment or use development default
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# Verified-token cache size (0 disables the cache)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Password verification pool: concurrent argon2 hashes (64 MiB each) and
+# how many more logins may wait before new ones are rejected
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", "2"))
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", "32"))
+
+# Per-username login attempts allowed per window (seconds)
+LOGIN_RATE_LIMIT = int(os.getenv("LOGIN_RATE_LIMIT", "10"))
+LOGIN_RATE_WINDOW = float(os.getenv("LOGIN_RATE_WINDOW", "60"))
+
+
+class LoginBusyError(Exception):
+    """Password verification queue is full"""
+    
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__("Too many concurrent logins, retry shortly")
+        self.retry_after = retry_after
+
+
+class LoginRateLimitError(Exception):
+    """Too many login attempts for one username"""
+    
+    def __init__(self, retry_after: float):
+        super().__init__("Too many login attempts, retry later")
+        self.retry_after = retry_after
+
 # Password hashing with argon2 (more modern and secure than bcrypt)
 pwd_context = CryptContext(
     schemes=["argon2"],
@@ -59,21 +95,183 @@ def create_access_token(data: dict, expires_delta: Optional[int] = None) -> str:
     return encoded_jwt
 
 
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT payloads.
+    
+    Keyed by the SHA-256 of the token (raw tokens are never stored); each
+    entry expires at the token's own `exp` claim. Only valid tokens are
+    cached, so garbage tokens cannot evict real ones.
+    """
+    
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get(self, token: str) -> Optional[dict]:
+        """Cached payload, or None if missing/expired"""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            payload, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return dict(payload)
+    
+    def put(self, token: str, payload: dict):
+        """Cache a verified payload until its exp claim"""
+        expires_at = payload.get("exp")
+        if self.max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(payload), float(expires_at))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+
 def verify_token(token: str) -> Optional[dict]:
     """
     Verify and decode JWT token
     
+    Repeated tokens are served from the verified-token cache until they
+    expire, skipping HMAC verification and claim parsing.
+    
     Args:
         token: JWT token string
     
     Returns:
         Decoded payload if valid, None if invalid/expired
     """
+    payload = _token_cache.get(token)
+    if payload is not None:
+        CACHE_HITS.inc(cache="jwt")
+        return payload
+    CACHE_MISSES.inc(cache="jwt")
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    _token_cache.put(token, payload)
+    return payload
+
+
+class PasswordVerifier:
+    """
+    Runs argon2 verification on a dedicated bounded thread pool.
+    
+    argon2-cffi releases the GIL while hashing, so the event loop keeps
+    serving (streaming) requests during a login burst. At most
+    `max_concurrency` hashes run at once; beyond `max_pending` waiting
+    logins, new ones fail fast with LoginBusyError.
+    """
+    
+    def __init__(self, max_concurrency: int = 2, max_pending: int = 32):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="argon2")
+        self._lock = threading.Lock()
+        self._pending = 0  # Queued + running
+    
+    @property
+    def queued(self) -> int:
+        """Verifications waiting for a worker"""
+        return max(0, self._pending - self.max_concurrency)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify off the event loop (raises LoginBusyError if the queue is full)"""
+        with self._lock:
+            if self._pending >= self.max_concurrency + self.max_pending:
+                raise LoginBusyError()
+            self._pending += 1
+        
+        queued_at = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._timed_verify, plain_password, hashed_password, queued_at
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+    
+    @staticmethod
+    def _timed_verify(plain_password: str, hashed_password: str, queued_at: float) -> bool:
+        start = time.perf_counter()
+        STAGE_SECONDS.observe(start - queued_at, stage="password_queue_wait")
+        try:
+            return verify_password_safe(plain_password, hashed_password)
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="password_verify")
+
+
+class LoginRateLimiter:
+    """Sliding-window limit on login attempts per username"""
+    
+    def __init__(self, max_attempts: int = 10, window: float = 60.0, max_tracked: int = 10000):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_tracked = max_tracked
+        # Least recently attempted username first
+        self._attempts: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def check(self, username: str):
+        """Record an attempt (raises LoginRateLimitError if over the limit)"""
+        if self.max_attempts <= 0:
+            return
+        
+        key = username.strip().lower()
+        now = time.monotonic()
+        
+        with self._lock:
+            attempts = self._attempts.setdefault(key, deque())
+            self._attempts.move_to_end(key)
+            while attempts and now - attempts[0] >= self.window:
+                attempts.popleft()
+            
+            if len(attempts) >= self.max_attempts:
+                raise LoginRateLimitError(retry_after=self.window - (now - attempts[0]))
+            
+            attempts.append(now)
+            
+            # Bound memory: forget usernames with no recent attempts, then the
+            # least recently attempted ones beyond max_tracked
+            while self._attempts:
+                oldest = next(iter(self._attempts.values()))
+                if len(self._attempts) <= self.max_tracked and oldest and now - oldest[-1] < self.window:
+                    break
+                self._attempts.popitem(last=False)
+
+
+password_verifier = PasswordVerifier(LOGIN_MAX_CONCURRENCY, LOGIN_MAX_PENDING)
+login_rate_limiter = LoginRateLimiter(LOGIN_RATE_LIMIT, LOGIN_RATE_WINDOW)
+
+QUEUE_DEPTH.add_source(lambda: {("password_verify",): password_verifier.queued})
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -105,16 +303,25 @@ DEMO_USERS = {
 }
 
 
-def authenticate_user(username: str, password: str) -> Optional[dict]:
+async def authenticate_user(username: str, password: str) -> Optional[dict]:
     """
     Authenticate user with username/password
     
+    Password hashing runs on the bounded verification pool, never on the
+    event loop.
+    
+    Raises:
+        LoginRateLimitError: Too many attempts for this username
+        LoginBusyError: Verification queue is full
+    
     Returns:
         User dict if valid, None if invalid
     """
+    login_rate_limiter.check(username)
+    
     user = DEMO_USERS.get(username)
     if not user:
         return None
-    if not verify_password(password, user["hashed_password"]):
+    if not await password_verifier.verify(password, user["hashed_password"]):
         return None
     return user
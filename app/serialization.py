@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Serialization
+=============
+
+Fast JSON encoding for API responses and SSE events.
+
+- dumps() / loads(): orjson when installed (several times faster than
+  json.dumps, returns bytes directly), stdlib json otherwise
+- FastJSONResponse: JSONResponse rendered with dumps() (default response
+  class of the app)
+- sse_event(): one `data: {...}\\n\\n` Server-Sent Event as bytes
+- coalesce_tokens(): merges token events into frames (at most
+  `max_tokens` tokens, first token held at most `interval` seconds), so a
+  streamed answer is sent as a few dozen frames instead of one write per
+  token
+- SSEEncoder: encodes events for one stream, optionally compressed (gzip,
+  or br with the brotli package) with a sync flush per frame so every
+  frame reaches the client at once, and counts frame statistics
+
+Usage:
+    from app.serialization import FrameStats, SSEEncoder, coalesce_tokens, negotiate_encoding
+
+    stats = FrameStats()
+    encoder = SSEEncoder(negotiate_encoding(accept_encoding, ["gzip"]), stats)
+    async for event in coalesce_tokens(rag.answer_stream(query), 0.03, 16, stats):
+        yield encoder.event(event)
+    yield encoder.close()
+"""
+
+import json
+import zlib
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:  # Falls back to the stdlib encoder
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:  # "br" is simply not offered
+    BROTLI_AVAILABLE = False
+
+# Stream encodings we can produce
+ENCODINGS = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+# Moderate levels: frames are small and compressed on the event loop
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any):
+    """Stdlib fallback for numpy scalars/arrays and other array-likes"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def loads(data):
+    """Parse JSON (bytes or str)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson (when installed)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> bytes:
+    """Encode one Server-Sent Event (JSON data, optional event name)"""
+    prefix = f"event: {event}\n".encode("utf-8") if event else b""
+    return prefix + b"data: " + dumps(data) + b"\n\n"
+
+
+@dataclass
+class FrameStats:
+    """Framing statistics of one event stream (reported in the done event)"""
+    tokens: int = 0  # Token events from the pipeline
+    frames: int = 0  # Token events sent
+    events: int = 0  # All events sent
+    bytes: int = 0  # Encoded event bytes before compression
+    wire_bytes: int = 0  # Bytes written (after compression)
+    encoding: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "tokens": self.tokens,
+            "frames": self.frames,
+            "tokens_per_frame": round(self.tokens / self.frames, 2) if self.frames else 0.0,
+            "events": self.events,
+            "bytes": self.bytes,
+            "wire_bytes": self.wire_bytes,
+            "encoding": self.encoding or "identity",
+        }
+
+
+def negotiate_encoding(accept_encoding: str, allowed: Sequence[str]) -> Optional[str]:
+    """
+    First encoding in `allowed` the client accepts (None = uncompressed).
+
+    Args:
+        accept_encoding: Accept-Encoding request header
+        allowed: Encodings to offer, in server preference order
+    """
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name] = q
+
+    for encoding in allowed:
+        if encoding in ENCODINGS and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class SSEEncoder:
+    """Encodes (and optionally compresses) the events of one SSE stream"""
+
+    def __init__(self, encoding: Optional[str] = None, stats: Optional[FrameStats] = None):
+        """
+        Args:
+            encoding: "gzip", "br" or None (identity)
+            stats: Shared with coalesce_tokens() (default: a new FrameStats)
+        """
+        self.encoding = encoding
+        self.stats = stats or FrameStats()
+        self.stats.encoding = encoding
+
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # gzip container
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+        elif encoding is None:
+            self._compressor = None
+        else:
+            raise ValueError(f"Unsupported stream encoding: {encoding}")
+
+    def event(self, data: Any, event: Optional[str] = None) -> bytes:
+        """Encode one event; compressed output is flushed so it is sent now"""
+        if isinstance(data, dict) and data.get("type") == "token":
+            self.stats.frames += 1
+        self.stats.events += 1
+
+        raw = sse_event(data, event)
+        self.stats.bytes += len(raw)
+        if self._compressor is None:
+            out = raw
+        elif self.encoding == "gzip":
+            out = self._compressor.compress(raw) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        else:
+            out = self._compressor.process(raw) + self._compressor.flush()
+        self.stats.wire_bytes += len(out)
+        return out
+
+    def close(self) -> bytes:
+        """End of the compressed stream (gzip trailer / brotli final block)"""
+        if self._compressor is None:
+            return b""
+        out = self._compressor.flush() if self.encoding == "gzip" else self._compressor.finish()
+        self._compressor = None
+        self.stats.wire_bytes += len(out)
+        return out
+
+
+async def coalesce_tokens(
+    events: AsyncIterator[Dict],
+    interval: float,
+    max_tokens: int = 0,
+    stats: Optional[FrameStats] = None
+) -> AsyncIterator[Dict]:
+    """
+    Merge consecutive {"type": "token"} events into frames.
+
+    A frame is sent once it holds `max_tokens` tokens or its first token is
+    `interval` seconds old, whichever comes first; its content is the
+    concatenated tokens. Any other event flushes pending tokens first, so
+    event order is preserved. The source is read ahead and never cancelled
+    mid-step (a stalled generation just flushes on time).
+
+    Args:
+        events: Pipeline stream (HealthcareRAG.answer_stream)
+        interval: Max seconds a token is held (0 = no time limit)
+        max_tokens: Max tokens per frame (0 = no count limit)
+        stats: Token count is added here (FrameStats.tokens)
+
+    With both limits off (or max_tokens=1) events pass through unchanged.
+    """
+    stats = stats if stats is not None else FrameStats()
+
+    if max_tokens == 1 or (interval <= 0 and max_tokens <= 0):
+        async for event in events:
+            if event.get("type") == "token":
+                stats.tokens += 1
+            yield event
+        return
+
+    loop = asyncio.get_running_loop()
+    pending: list = []  # Token contents waiting to be sent
+    deadline = 0.0
+    next_event = None
+
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(events.__anext__())
+
+            if pending and interval > 0:
+                done, _ = await asyncio.wait({next_event}, timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    # Held too long with no new event: send what we have
+                    yield {"type": "token", "content": "".join(pending)}
+                    pending = []
+                    continue
+
+            try:
+                event = await next_event
+            except StopAsyncIteration:
+                break
+            finally:
+                next_event = None
+
+            if event.get("type") == "token":
+                stats.tokens += 1
+                if not pending:
+                    deadline = loop.time() + interval
+                pending.append(event["content"])
+                if max_tokens > 0 and len(pending) >= max_tokens:
+                    yield {"type": "token", "content": "".join(pending)}
+                    pending = []
+                continue
+
+            if pending:
+                yield {"type": "token", "content": "".join(pending)}
+                pending = []
+            yield event
+
+        if pending:
+            yield {"type": "token", "content": "".join(pending)}
+
+    finally:
+        if next_event is not None:
+            # Client went away while we waited on the source
+            next_event.cancel()
+            await asyncio.wait({next_event})
+        aclose = getattr(events, "aclose", None)
+        if aclose is not None:
+            await aclose()
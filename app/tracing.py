@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Tracing
+=======
+
+OpenTelemetry-compatible request tracing with graceful degradation.
+
+- opentelemetry-api missing: every helper is a no-op
+- API only (no SDK): spans are non-recording (near-zero cost)
+- SDK installed and [tracing] enabled: spans are exported in batches to
+  OTLP/HTTP (`exporter = "otlp"`, needs opentelemetry-exporter-otlp-proto-http)
+  or to a local JSON-lines file (`exporter = "file"`, works offline)
+
+Span tree for POST /api/v1/query:
+
+    POST /api/v1/query                  (middleware, W3C traceparent honoured)
+    ├── auth.get_current_user
+    ├── rag.prepare
+    │   ├── retrieval.encode / retrieval.vector_search / retrieval.rerank
+    │   └── retrieval.dedup / retrieval.budget
+    └── rag.generate                    (after admission)
+        ├── ollama.chat                 (queue wait, token counts)
+        └── query_log.submit
+
+Optional install:
+    pip install opentelemetry-sdk opentelemetry-exporter-otlp-proto-http
+"""
+
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+    OTEL_AVAILABLE = True
+except ImportError:  # Tracing is optional
+    OTEL_AVAILABLE = False
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    OTEL_SDK_AVAILABLE = True
+except ImportError:
+    OTEL_SDK_AVAILABLE = False
+
+logger = logging.getLogger("tracing")
+
+_provider = None
+
+
+class _NoopSpan:
+    """Stand-in span when opentelemetry-api is not installed"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def update_name(self, name):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+    def end(self):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+if OTEL_SDK_AVAILABLE:
+
+    class JsonFileSpanExporter(SpanExporter):
+        """Append finished spans to a JSON-lines file (offline tracing)"""
+
+        def __init__(self, path: Path):
+            self.path = Path(path)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._lock = threading.Lock()
+
+        def export(self, spans) -> "SpanExportResult":
+            lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+            try:
+                with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            except OSError as e:
+                logger.error(f"Failed to export spans: {e}")
+                return SpanExportResult.FAILURE
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            pass
+
+
+def setup_tracing(config: Dict, log_dir: Path) -> bool:
+    """
+    Install the global tracer provider from the [tracing] config section.
+
+    Returns:
+        True if spans will be exported
+    """
+    global _provider
+
+    if not config.get("enabled", False) or _provider is not None:
+        return _provider is not None
+
+    if not OTEL_SDK_AVAILABLE:
+        logger.warning("Tracing enabled but opentelemetry-sdk is not installed; spans are not exported")
+        return False
+
+    exporter_name = config.get("exporter", "file")
+    if exporter_name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("OTLP exporter not installed (opentelemetry-exporter-otlp-proto-http); tracing disabled")
+            return False
+        exporter = OTLPSpanExporter(endpoint=config.get("otlp_endpoint", "http://localhost:4318/v1/traces"))
+    elif exporter_name == "file":
+        exporter = JsonFileSpanExporter(Path(config.get("file_path", Path(log_dir) / "traces.jsonl")))
+    else:
+        raise ValueError(f"Unknown tracing exporter: {exporter_name}")
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": config.get("service_name", "transplant-rag")}),
+        sampler=ParentBased(TraceIdRatioBased(config.get("sample_ratio", 1.0)))
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _provider = provider
+
+    logger.info(f"Tracing enabled ({exporter_name} exporter)")
+    return True
+
+
+def shutdown_tracing():
+    """Flush pending spans"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+@contextmanager
+def start_span(name: str, context=None, kind: str = "internal", **attributes):
+    """
+    Start a span as the current span (no-op without opentelemetry-api).
+
+    Args:
+        name: Span name
+        context: Parent context (default: current context)
+        kind: "internal", "server" or "client"
+        **attributes: Span attributes (None values are skipped)
+    """
+    if not OTEL_AVAILABLE:
+        yield _NOOP_SPAN
+        return
+
+    span_kind = {"server": SpanKind.SERVER, "client": SpanKind.CLIENT}.get(kind, SpanKind.INTERNAL)
+    tracer = trace.get_tracer("transplant-rag")
+    with tracer.start_as_current_span(name, context=context, kind=span_kind) as span:
+        if span.is_recording():
+            span.set_attributes({k: v for k, v in attributes.items() if v is not None})
+        yield span
+
+
+def open_span(name: str, kind: str = "internal", **attributes):
+    """
+    Start a span WITHOUT making it current; the caller must call span.end().
+
+    For generators consumed from several threads, where attaching a
+    context in one step and detaching it in another is not possible.
+    """
+    if not OTEL_AVAILABLE:
+        return _NOOP_SPAN
+
+    span_kind = {"server": SpanKind.SERVER, "client": SpanKind.CLIENT}.get(kind, SpanKind.INTERNAL)
+    span = trace.get_tracer("transplant-rag").start_span(name, kind=span_kind)
+    if span.is_recording():
+        span.set_attributes({k: v for k, v in attributes.items() if v is not None})
+    return span
+
+
+def traced(name: str) -> Callable:
+    """Decorator: run a sync function inside a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """Current span (no-op span if none / tracing unavailable)"""
+    if not OTEL_AVAILABLE:
+        return _NOOP_SPAN
+    return trace.get_current_span()
+
+
+def current_context():
+    """Current trace context (pass to `with_context` for worker threads)"""
+    return otel_context.get_current() if OTEL_AVAILABLE else None
+
+
+def span_context(span):
+    """Trace context with span as parent (for `with_context`)"""
+    return trace.set_span_in_context(span) if OTEL_AVAILABLE else None
+
+
+def with_context(ctx, fn: Callable) -> Callable:
+    """
+    Wrap fn so it runs with ctx as the current trace context.
+
+    Used for work handed to threads from async generators, where the span
+    cannot stay attached across `yield`.
+    """
+    if not OTEL_AVAILABLE or ctx is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        token = otel_context.attach(ctx)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            otel_context.detach(token)
+    return run
+
+
+def extract_context(headers):
+    """Parent context from incoming W3C `traceparent` headers"""
+    return propagate.extract(headers) if OTEL_AVAILABLE else None
+
+
+def set_error(span, exception: BaseException):
+    """Mark span as failed"""
+    if OTEL_AVAILABLE and span.is_recording():
+        span.record_exception(exception)
+        span.set_status(Status(StatusCode.ERROR, str(exception)))
+
+
+def trace_id_of(span) -> Optional[str]:
+    """Hex trace ID of a recording span, else None"""
+    if not OTEL_AVAILABLE or not span.is_recording():
+        return None
+    return format(span.get_span_context().trace_id, "032x")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Gunicorn Configuration (multi-worker mode)
+==========================================
+
+Runs the API in several uvicorn worker processes with the app preloaded
+in the master:
+
+- The embedding model, reranker and tokenizer weights are loaded once and
+  shared copy-on-write by all workers (no N copies in RAM)
+- After fork each worker re-opens what must not be shared: the Chroma
+  client, the SQLite cache/job handles and the query log writer thread
+- Answer and embedding caches live in one SQLite file ([cache]), so all
+  workers see the same hits
+- torch threads are split between workers so CPU encoding does not
+  oversubscribe the cores
+
+Per-process limits multiply with the worker count: [admission]
+max_in_flight and [generation.model_concurrency] apply per worker, and
+/metrics reports the worker that served the scrape.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app.main:app
+    WEB_CONCURRENCY=4 gunicorn -c gunicorn.conf.py app.main:app
+
+Environment:
+    WEB_CONCURRENCY: Worker processes (default: 1)
+    BIND: Listen address (default: 0.0.0.0:8000)
+    TORCH_THREADS: torch threads per worker (default: cores / workers)
+    GUNICORN_TIMEOUT: Seconds a silent worker may take before restart (default: 300)
+"""
+
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Load models once in the master; workers inherit them on fork
+preload_app = True
+
+# Long CPU generations keep a worker busy; don't kill it as hung
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = None  # RequestMiddleware logs every request
+errorlog = "-"
+loglevel = "info"
+
+
+def when_ready(server):
+    """Master, before workers start: re-queue jobs the last shutdown interrupted"""
+    from app.api import jobs
+
+    if jobs is not None:
+        jobs.recover()
+
+
+def post_fork(server, worker):
+    """Worker: re-open per-process resources inherited from the master"""
+    import torch
+    from app.api import jobs, rag
+
+    threads = int(os.getenv("TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(threads)
+
+    if rag is not None:
+        rag.after_fork()
+    if jobs is not None:
+        jobs.after_fork()
+
+    server.log.info(f"Worker {worker.pid} ready ({threads} torch threads)")
@@ -42,7 +42,7 @@ class RAGBenchmark:
         try:
             response = requests.post(
                 f"{self.api_url}/query",
-                json={"query": question},
+                json={"query": question, "priority": "batch"},
                 headers={"Authorization": f"Bearer {self.token}"},
                 timeout=120
             )
@@ -158,7 +158,8 @@ def main():
     bench.authenticate()
     print("✅ Authenticated")
     
-    # Warm-up
+    # Warm-up (the API pre-loads [generation] warmup_models at startup;
+    # this primes connections and covers models outside that list)
     print("\n🔥 Warming up...")
     bench.single_query(questions[0])
     print("✅ Warm-up complete")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Retrieval Strategy Benchmark
+============================
+Latency and recall of routed retrieval (organ sub-indexes, [routing]) and
+coarse-to-fine retrieval (section/document centroids, [coarse_search])
+versus flat global search, measured in-process (no API, no Ollama).
+
+Each question runs --repeat times per mode. Coarse modes are run for every
+--levels x --top-m combination. Per mode the report shows:
+- search_ms: routing + vector search (p50 / p95 / mean)
+- retrieve_ms: the whole retrieve() call, including query encoding
+- recall_vs_flat: share of the flat search's chunks the mode also returns
+- doc_recall: share of the relevant documents (eval set) retrieved
+- rows_scanned: centroids + chunks scored per query (coarse modes; flat
+  scores every chunk)
+- Routing decisions: method, organ and fallbacks
+
+Questions come from the evaluation set (data/eval_dataset.json, or the
+evaluate_rag.py sample set) plus organ-specific questions that exercise
+the router.
+
+Usage:
+    python scripts/benchmark_retrieval.py
+    python scripts/benchmark_retrieval.py --top-k 8 --repeat 20
+    python scripts/benchmark_retrieval.py --levels section document --top-m 2 4 8 16
+"""
+
+import sys
+import json
+import argparse
+import statistics
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from retrieval import MedicalRetriever, RetrievalResult
+from hierarchical import CoarseIndex
+
+# Organ-specific questions (no relevant documents labelled)
+ROUTING_QUESTIONS = [
+    "What causes delayed graft function after kidney transplant?",
+    "How is BK polyomavirus nephropathy managed?",
+    "When is a liver transplant indicated?",
+    "How is the MELD score calculated?",
+    "What is cardiac allograft vasculopathy?",
+    "How are LVAD patients bridged to heart transplant?",
+    "What are the outcomes of pancreas transplantation?",
+    "How is islet transplantation performed?",
+    "What is the role of induction therapy?",
+    "How is CMV prophylaxis managed after transplant?",
+]
+
+# Mode name -> retrieve() options (coarse modes are added per level / top_m)
+MODES = {
+    "flat": {"use_routing": False, "use_coarse": False},
+    "routed": {"use_routing": True, "use_coarse": False},
+}
+
+
+def load_questions() -> List[Dict]:
+    """Evaluation questions (with relevant documents) plus routing questions"""
+    from evaluate_rag import load_test_dataset
+
+    questions = [
+        {"question": case.question, "relevant_docs": case.relevant_docs}
+        for case in load_test_dataset()
+    ]
+    questions += [{"question": q, "relevant_docs": []} for q in ROUTING_QUESTIONS]
+    return questions
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def doc_recall(result: RetrievalResult, relevant_docs: List[str]) -> Optional[float]:
+    """Fraction of relevant documents retrieved (eval titles may be shortened)"""
+    if not relevant_docs:
+        return None
+    titles = {chunk.doc_title for chunk in result.chunks}
+    found = sum(1 for doc in relevant_docs if any(title.startswith(doc) for title in titles))
+    return found / len(relevant_docs)
+
+
+def run_mode(
+    retriever: MedicalRetriever,
+    questions: List[Dict],
+    top_k: int,
+    repeat: int,
+    options: Dict
+) -> Dict:
+    """Time every question `repeat` times; keep the last result per question"""
+    search_ms: List[float] = []
+    retrieve_ms: List[float] = []
+    results: Dict[str, RetrievalResult] = {}
+
+    for item in questions:
+        question = item["question"]
+        retriever.retrieve(question, top_k=top_k, use_reranker=False, **options)  # Warm-up
+        for _ in range(repeat):
+            result = retriever.retrieve(question, top_k=top_k, use_reranker=False, **options)
+            timings = result.timings
+            search_ms.append((timings.query_ns + (timings.route_ns or 0)) / 1e6)
+            retrieve_ms.append(timings.total_ns / 1e6)
+        results[question] = result
+
+    return {
+        "search_ms": {
+            "p50": round(statistics.median(search_ms), 3),
+            "p95": round(percentile(search_ms, 0.95), 3),
+            "mean": round(statistics.mean(search_ms), 3),
+        },
+        "retrieve_ms": {
+            "p50": round(statistics.median(retrieve_ms), 3),
+            "p95": round(percentile(retrieve_ms, 0.95), 3),
+        },
+        "results": results,
+    }
+
+
+def rows_scanned(retriever: MedicalRetriever, questions: List[Dict], top_k: int) -> float:
+    """Mean centroids + chunk rows scored per query by the current coarse index"""
+    coarse = retriever.coarse_index
+    embeddings = retriever._encode_queries([item["question"] for item in questions])
+    rows = coarse.candidate_rows(embeddings, min_rows=top_k)
+    return round(len(coarse) + statistics.mean(len(r) for r in rows), 1)
+
+
+def summarize(mode: Dict, flat: Dict, questions: List[Dict]) -> Dict:
+    """Recall against flat search and against the eval set's relevant documents"""
+    overlaps = []
+    doc_recalls = []
+    decisions = Counter()
+
+    for item in questions:
+        question = item["question"]
+        result = mode["results"][question]
+        flat_ids = {chunk.chunk_id for chunk in flat["results"][question].chunks}
+        if flat_ids:
+            ids = {chunk.chunk_id for chunk in result.chunks}
+            overlaps.append(len(ids & flat_ids) / len(flat_ids))
+
+        recall = doc_recall(result, item["relevant_docs"])
+        if recall is not None:
+            doc_recalls.append(recall)
+
+        routing = result.routing
+        if routing is not None:
+            label = f"{routing.method}:{routing.organ or 'all'}"
+            decisions[label + (" (fallback)" if routing.fallback else "")] += 1
+
+    return {
+        "search_ms": mode["search_ms"],
+        "retrieve_ms": mode["retrieve_ms"],
+        "recall_vs_flat": round(statistics.mean(overlaps), 4) if overlaps else None,
+        "doc_recall": round(statistics.mean(doc_recalls), 4) if doc_recalls else None,
+        "rows_scanned": mode.get("rows_scanned"),
+        "decisions": dict(decisions.most_common()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Routed and coarse-to-fine vs. flat retrieval: latency and recall")
+    parser.add_argument("--chroma", default="./data/chroma", help="ChromaDB directory")
+    parser.add_argument("--config", default="rag_config.toml", help="Config file")
+    parser.add_argument("--top-k", type=int, default=8, help="Chunks per query")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per question and mode")
+    parser.add_argument("--levels", nargs="+", default=["section", "document"], help="Coarse search levels")
+    parser.add_argument("--top-m", type=int, nargs="+", default=[2, 4, 8], help="Groups searched per query (coarse)")
+    parser.add_argument("--output", default="logs/benchmark_retrieval.json", help="JSON results file")
+    args = parser.parse_args()
+
+    retriever = MedicalRetriever(args.chroma, args.config)
+    if retriever.filter_index is None:
+        print("⚠️  Routing and coarse search unavailable ([chroma] filter_index is off)")
+
+    questions = load_questions()
+
+    print("\n🔬 Retrieval Strategy Benchmark")
+    print("=" * 60)
+    print(f"{len(questions)} questions, top_k={args.top_k}, {args.repeat} runs each")
+
+    runs = {name: run_mode(retriever, questions, args.top_k, args.repeat, options) for name, options in MODES.items()}
+
+    if retriever.coarse_index is not None:
+        centroids_dir = retriever.config.get("routing", {}).get("centroids_dir", "./data/centroids")
+        for level in args.levels:
+            retriever.coarse_index = CoarseIndex.build(
+                retriever.filter_index, level, centroids_dir,
+                model_name=retriever.config["embeddings"]["model_name"]
+            )
+            for top_m in args.top_m:
+                retriever.coarse_index.top_m = top_m
+                name = f"{level}@{top_m}"
+                runs[name] = run_mode(
+                    retriever, questions, args.top_k, args.repeat, {"use_routing": False, "use_coarse": True}
+                )
+                runs[name]["rows_scanned"] = rows_scanned(retriever, questions, args.top_k)
+
+    report = {name: summarize(run, runs["flat"], questions) for name, run in runs.items()}
+    chunks = retriever.collection.count()
+
+    print("\n📊 Results:")
+    print(
+        f"  {'Mode':>12} | {'search p50':>10} | {'search p95':>10} | {'retrieve p50':>12} | "
+        f"{'vs flat':>7} | {'doc recall':>10} | {'rows':>7}"
+    )
+    for name, row in report.items():
+        print(
+            f"  {name:>12} | {row['search_ms']['p50']:>8.3f}ms | {row['search_ms']['p95']:>8.3f}ms | "
+            f"{row['retrieve_ms']['p50']:>10.3f}ms | {row['recall_vs_flat'] or 0:>7.2%} | "
+            f"{row['doc_recall'] if row['doc_recall'] is not None else 0:>10.2%} | "
+            f"{row['rows_scanned'] or chunks:>7}"
+        )
+    for name, row in report.items():
+        if row["decisions"]:
+            print(f"\n  {name} decisions: " + ", ".join(f"{k} x{v}" for k, v in row["decisions"].items()))
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "chunks": chunks,
+        "questions": len(questions),
+        "top_k": args.top_k,
+        "modes": report,
+    }, indent=2))
+    print(f"\n💾 Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
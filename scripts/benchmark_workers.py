@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Worker Scaling Benchmark
+========================
+Throughput of the API in multi-worker mode (gunicorn.conf.py) for 1..N
+worker processes, on retrieval-only traffic.
+
+Every request uses confidence_threshold=1.0, so it is answered by the
+confidence gate right after retrieval: the run measures the API +
+embedding + vector search path without Ollama (generation would hide
+worker scaling behind the GPU). Questions get a per-request suffix so the
+shared embedding cache does not turn the run into a cache benchmark
+(--repeat disables that).
+
+For each worker count the script starts gunicorn, waits for /health,
+drives `workers x concurrency` closed-loop clients for --duration seconds
+and stops the server.
+
+Usage:
+    python scripts/benchmark_workers.py --workers 1 2 4
+    python scripts/benchmark_workers.py --workers 1 2 4 8 --concurrency 4 --duration 30
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import statistics
+import subprocess
+import concurrent.futures
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+
+QUESTIONS = [
+    "What is acute rejection?",
+    "Explain HLA antibodies",
+    "What is tacrolimus mechanism?",
+    "Signs of kidney rejection?",
+    "What is crossmatch test?",
+    "When is liver transplant indicated?",
+    "How is CMV prophylaxis managed after transplant?",
+    "What causes chronic allograft nephropathy?",
+]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    """Start gunicorn with the given worker count"""
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "BIND": f"127.0.0.1:{port}",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def wait_ready(api_url: str, server: subprocess.Popen, timeout: float = 600.0):
+    """Wait until /health answers (model loading can take minutes)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        try:
+            if requests.get(f"{api_url}/health", timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    raise TimeoutError("API did not become healthy")
+
+
+def authenticate(api_url: str, username: str, password: str) -> str:
+    response = requests.post(f"{api_url}/token", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def run_load(api_url: str, token: str, clients: int, duration: float, repeat: bool) -> Dict:
+    """Closed-loop load: each client sends its next request when the last one returns"""
+    headers = {"Authorization": f"Bearer {token}"}
+    start_time = time.time()
+
+    def client(client_id: int) -> Dict:
+        session = requests.Session()
+        latencies: List[float] = []
+        errors = 0
+        n = 0
+        while time.time() - start_time < duration:
+            question = QUESTIONS[(client_id + n) % len(QUESTIONS)]
+            if not repeat:
+                question = f"{question} (request {client_id}-{n})"
+            n += 1
+
+            request_start = time.time()
+            try:
+                response = session.post(
+                    f"{api_url}/query",
+                    json={"query": question, "confidence_threshold": 1.0, "priority": "batch"},
+                    headers=headers,
+                    timeout=60
+                )
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+
+            if ok:
+                latencies.append(time.time() - request_start)
+            else:
+                errors += 1
+        return {"latencies": latencies, "errors": errors}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(client, range(clients)))
+
+    elapsed = time.time() - start_time
+    latencies = sorted(l for r in results for l in r["latencies"])
+    errors = sum(r["errors"] for r in results)
+
+    return {
+        "clients": clients,
+        "duration": round(elapsed, 2),
+        "completed": len(latencies),
+        "errors": errors,
+        "queries_per_second": round(len(latencies) / elapsed, 2),
+        "p50_latency": round(statistics.median(latencies), 4) if latencies else None,
+        "p95_latency": round(latencies[int(len(latencies) * 0.95)], 4) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API throughput vs. worker processes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to test")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients per worker")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per worker count")
+    parser.add_argument("--port", type=int, default=8100, help="Port for the benchmark server")
+    parser.add_argument("--repeat", action="store_true", help="Reuse question texts (embedding cache hits)")
+    parser.add_argument("--username", default="admin@transplant.ai")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--output", default="logs/benchmark_workers.json", help="JSON results file")
+    args = parser.parse_args()
+
+    api_url = f"http://127.0.0.1:{args.port}/api/v1"
+
+    print("🔬 Worker Scaling Benchmark (retrieval-only traffic)")
+    print("=" * 60)
+
+    runs = []
+    for workers in args.workers:
+        print(f"\n🚀 {workers} worker(s), {workers * args.concurrency} clients, {args.duration:.0f}s")
+        server = start_server(workers, args.port)
+        try:
+            wait_ready(api_url, server)
+            token = authenticate(api_url, args.username, args.password)
+
+            # Warm-up: first requests per worker load lazy state (tokenizer, pools)
+            run_load(api_url, token, workers * args.concurrency, 3.0, args.repeat)
+
+            metrics = run_load(api_url, token, workers * args.concurrency, args.duration, args.repeat)
+        finally:
+            stop_server(server)
+
+        metrics["workers"] = workers
+        runs.append(metrics)
+        print(
+            f"  {metrics['queries_per_second']:.2f} req/s | "
+            f"p50 {metrics['p50_latency']}s | p95 {metrics['p95_latency']}s | "
+            f"{metrics['errors']} errors"
+        )
+
+    # Scaling relative to the smallest worker count
+    base = runs[0]
+    for run in runs:
+        speedup = run["queries_per_second"] / base["queries_per_second"] if base["queries_per_second"] else 0.0
+        run["speedup"] = round(speedup, 2)
+        run["efficiency"] = round(speedup / (run["workers"] / base["workers"]), 2)
+
+    print("\n📊 Results:")
+    print(f"  {'Workers':>7} | {'req/s':>8} | {'p50 (s)':>8} | {'p95 (s)':>8} | {'Speedup':>7} | {'Efficiency':>10}")
+    for run in runs:
+        print(
+            f"  {run['workers']:>7} | {run['queries_per_second']:>8.2f} | "
+            f"{run['p50_latency'] or 0:>8.4f} | {run['p95_latency'] or 0:>8.4f} | "
+            f"{run['speedup']:>6.2f}x | {run['efficiency'] * 100:>9.0f}%"
+        )
+
+    output = ROOT / args.output
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"cpu_count": os.cpu_count(), "runs": runs}, indent=2))
+    print(f"\n💾 Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ Usage:
     python build_kb.py --config rag_config.toml
     python build_kb.py --config rag_config.toml --validate
     python build_kb.py --config rag_config.toml --stats
+    python build_kb.py --config rag_config.toml --sentence-index
 
 Author: Healthcare RAG MVP
 Version: 2.0 (Production-Ready)
@@ -30,7 +31,7 @@ import re
 import gc
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
 from collections import defaultdict
 
@@ -43,6 +44,10 @@ import spacy
 from sentence_transformers import SentenceTransformer
 import torch
 
+# Organ vocabulary shared with query routing; centroids for routing and coarse search
+from organs import extract_organ, save_organ_centroids
+from hierarchical import group_key, save_group_centroids
+
 
 # ============================================================================
 # CONFIGURATION & DATA STRUCTURES
@@ -95,12 +100,17 @@ class Chunk:
     
     created_at: str = ""
     
+    # Source sentences (kept for the optional sentence index, not serialized)
+    sentences: List[str] = field(default_factory=list, repr=False)
+    
     def __post_init__(self):
         if not self.created_at:
             self.created_at = datetime.utcnow().isoformat()
     
     def to_dict(self) -> Dict:
-        return asdict(self)
+        d = asdict(self)
+        d.pop('sentences')
+        return d
 
 
 @dataclass
@@ -500,28 +510,14 @@ class SectionAwareChunker:
             content_hash=content_hash,
             organ_type=organ_type,
             tier=tier,
-            section_level=section_level
+            section_level=section_level,
+            sentences=list(sentences)
         )
     
     @staticmethod
     def _extract_organ(title: str) -> str:
-        """Extract organ from title"""
-        title_lower = title.lower()
-        
-        organ_map = {
-            "kidney": ["kidney", "renal"],
-            "liver": ["liver", "hepat"],
-            "heart": ["heart", "cardiac"],
-            "lung": ["lung", "pulmonary"],
-            "pancreas": ["pancreas", "islet"],
-            "intestine": ["intestine", "bowel"],
-        }
-        
-        for organ, keywords in organ_map.items():
-            if any(kw in title_lower for kw in keywords):
-                return organ
-        
-        return "foundational"
+        """Extract organ from title (organs.ORGAN_KEYWORDS, shared with query routing)"""
+        return extract_organ(title)
     
     @staticmethod
     def _extract_tier(doc_id: str) -> str:
@@ -629,7 +625,8 @@ class VectorIndexer:
         
         self.logger.info(f"Model loaded on: {device}")
     
-    def index_chunks(self, chunks: List[Chunk]):
+    def index_chunks(self, chunks: List[Chunk], sentence_index_dir: Optional[str] = None,
+                     centroids_dir: Optional[str] = None):
         """Index chunks with batching and memory management"""
         self.logger.section("PHASE 3: Vector Indexing")
         
@@ -638,6 +635,10 @@ class VectorIndexer:
         
         self.logger.info(f"Processing {len(chunks)} chunks in {total_batches} batches")
         
+        # Running embedding sums per organ / document / section (centroids)
+        centroid_sums: Dict[str, Dict[str, np.ndarray]] = {"organ": {}, "document": {}, "section": {}}
+        centroid_counts: Dict[str, Dict[str, int]] = {level: defaultdict(int) for level in centroid_sums}
+        
         for i in range(0, len(chunks), batch_size):
             batch = chunks[i:i+batch_size]
             batch_num = i // batch_size + 1
@@ -662,6 +663,16 @@ class VectorIndexer:
                 metadatas=[self._create_metadata(c) for c in batch]
             )
             
+            for c, embedding in zip(batch, embeddings):
+                for level, key in (
+                    ("organ", c.organ_type),
+                    ("document", group_key("document", c.doc_id, c.section_title)),
+                    ("section", group_key("section", c.doc_id, c.section_title)),
+                ):
+                    sums = centroid_sums[level]
+                    sums[key] = sums.get(key, 0.0) + embedding
+                    centroid_counts[level][key] += 1
+            
             # Memory cleanup
             if batch_num % 10 == 0:
                 if torch.cuda.is_available():
@@ -674,9 +685,102 @@ class VectorIndexer:
         
         self.logger.info(f"Indexed {len(chunks)} chunks successfully")
         
+        if centroids_dir and chunks:
+            self._save_centroids(centroid_sums, centroid_counts, Path(centroids_dir))
+        
+        # Optional sentence-level index (reuses the loaded model)
+        if sentence_index_dir:
+            self._index_sentences(chunks, Path(sentence_index_dir))
+        
         # Clean up GPU memory
         self._cleanup_model()
     
+    def _save_centroids(self, sums: Dict[str, Dict[str, np.ndarray]],
+                        counts: Dict[str, Dict[str, int]], output_dir: Path):
+        """
+        Write centroids (normalized mean chunk embedding) per organ, for query
+        routing (organs.OrganRouter), and per document / section, for
+        coarse-to-fine search (hierarchical.CoarseIndex).
+        """
+        levels = {}
+        for level, level_sums in sums.items():
+            keys = sorted(level_sums)
+            centroids = np.stack([level_sums[key] / counts[level][key] for key in keys])
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+            levels[level] = (keys, centroids, [counts[level][key] for key in keys])
+        
+        model_name = self.embedding_config.model_name
+        save_organ_centroids(output_dir, model_name, *levels.pop("organ"))
+        save_group_centroids(output_dir, model_name, levels)
+        
+        self.logger.info(
+            f"Saved centroids to {output_dir}: " + ", ".join(
+                f"{len(sums[level])} {level}s" for level in sums
+            )
+        )
+    
+    def _index_sentences(self, chunks: List[Chunk], output_dir: Path):
+        """
+        Embed every chunk sentence into a memmapped matrix.
+        
+        Output:
+        - sentence_embeddings.npy: (n_sentences, dim) matrix, openable with mmap_mode='r'
+        - sentence_index.json: chunk IDs, [start, end) row offsets per chunk, sentence texts
+        
+        Rows of one chunk are contiguous, so ranking the sentences of the
+        retrieved chunks at query time is a single matrix product.
+        """
+        self.logger.section("PHASE 3b: Sentence Indexing")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        sentences = []
+        chunk_ids = []
+        offsets = []
+        for c in chunks:
+            start = len(sentences)
+            sentences.extend(c.sentences)
+            chunk_ids.append(c.id)
+            offsets.append([start, len(sentences)])
+        
+        if not sentences:
+            self.logger.warning("No sentences to index")
+            return
+        
+        dim = self.model.get_sentence_embedding_dimension()
+        matrix = np.lib.format.open_memmap(
+            output_dir / "sentence_embeddings.npy",
+            mode="w+",
+            dtype=np.float16,  # Half precision: 2x smaller, ample for ranking
+            shape=(len(sentences), dim)
+        )
+        
+        batch_size = self.embedding_config.batch_size * 4  # Sentences are short
+        for i in range(0, len(sentences), batch_size):
+            with torch.no_grad():
+                matrix[i:i+batch_size] = self.model.encode(
+                    sentences[i:i+batch_size],
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False,
+                    batch_size=batch_size
+                )
+        
+        matrix.flush()
+        del matrix
+        
+        with open(output_dir / "sentence_index.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                "model_name": self.embedding_config.model_name,
+                "dim": dim,
+                "dtype": "float16",
+                "n_sentences": len(sentences),
+                "chunk_ids": chunk_ids,
+                "offsets": offsets,
+                "sentences": sentences,
+            }, f)
+        
+        self.logger.info(f"Indexed {len(sentences)} sentences to {output_dir}")
+    
     def _create_metadata(self, chunk: Chunk) -> Dict:
         """Create metadata for ChromaDB"""
         return {
@@ -829,8 +933,14 @@ class KnowledgeBaseBuilder:
         )
         
         self.saver = ArtifactSaver(self.config, self.logger)
+        
+        # Optional sentence-level embedding index
+        self.sentence_index_config = self.config.get("sentence_index", {})
+        
+        # Organ / document / section centroids (query routing, coarse-to-fine search)
+        self.centroids_dir = self.config.get("routing", {}).get("centroids_dir", "./data/centroids")
     
-    def build(self) -> bool:
+    def build(self, sentence_index: Optional[bool] = None) -> bool:
         """Build KB"""
         try:
             start = datetime.now()
@@ -846,7 +956,13 @@ class KnowledgeBaseBuilder:
                 return False
             
             # Phase 3: Index
-            self.indexer.index_chunks(chunks)
+            if sentence_index is None:
+                sentence_index = self.sentence_index_config.get("enabled", False)
+            sentence_index_dir = (
+                self.sentence_index_config.get("output_dir", "./data/sentence_index")
+                if sentence_index else None
+            )
+            self.indexer.index_chunks(chunks, sentence_index_dir, self.centroids_dir)
             
             # Phase 4: Save
             self.saver.save_all(docs, chunks, self.config)
@@ -1005,6 +1121,9 @@ Examples:
     
     # Show stats only
     python build_kb.py --config rag_config.toml --stats
+    
+    # Build with sentence-level embedding index
+    python build_kb.py --config rag_config.toml --sentence-index
         """
     )
     
@@ -1027,6 +1146,13 @@ Examples:
         help='Show KB statistics (no rebuild)'
     )
     
+    parser.add_argument(
+        '--sentence-index',
+        action='store_true',
+        default=None,
+        help='Also embed every chunk sentence (default: [sentence_index] enabled)'
+    )
+    
     args = parser.parse_args()
     
     # Validate config exists
@@ -1047,7 +1173,7 @@ Examples:
     if args.stats:
         success = builder.stats()
     else:
-        success = builder.build()
+        success = builder.build(sentence_index=args.sentence_index)
         
         if success and args.validate:
             success = builder.validate()
@@ -81,7 +81,8 @@ for model in models:
                 "temperature": 0.2,
                 "max_tokens": 400,
                 "top_p": 0.9,
-                "confidence_threshold": 0.0  # CRITICAL: Bypass confidence gating for research eval
+                "confidence_threshold": 0.0,  # CRITICAL: Bypass confidence gating for research eval
+                "priority": "batch"  # Scheduled behind clinician (interactive) queries
             },
             headers={"Authorization": f"Bearer {token}"},
             timeout=180
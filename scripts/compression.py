@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Context Compression Module - Extractive Sentence Selection
+==========================================================
+
+Shrinks retrieved context before prompt construction so small local LLMs
+spend less time on prompt evaluation.
+
+Algorithm:
+1. Split every retrieved chunk into sentences
+2. Embed all sentences in ONE batched call (retriever's loaded encoder)
+3. Score sentences against the query embedding (single matrix product)
+4. Keep the best sentence of every chunk (citations stay intact)
+5. Fill the remaining budget with the highest-scoring sentences
+6. Re-assemble kept sentences in original order (one per line), grouped by source chunk
+
+Usage:
+    from compression import ContextCompressor
+
+    compressor = ContextCompressor(retriever.model, target_tokens=800)
+    compressed = compressor.compress(result.query_embedding, result.chunks)
+
+When a sentence index is available (build_kb.py --sentence-index), pass its
+precomputed scores to skip sentence encoding entirely:
+
+    ranked = sentence_index.score_chunks(result.query_embedding, chunk_ids)
+    compressed = compressor.compress(result.query_embedding, result.chunks, ranked)
+"""
+
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from retrieval import RetrievedChunk
+
+
+# Sentence boundary: line breaks (list items, tables) or terminal punctuation
+# followed by whitespace and an uppercase letter, digit or opening bracket
+# (chunks are spaCy sentences joined with single spaces by build_kb.py)
+_SENTENCE_SPLIT = re.compile(r'\n+|(?<=[.!?])\s+(?=[A-Z0-9(\[])')
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split chunk text into sentences"""
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+@dataclass
+class CompressionResult:
+    """Compressed chunks with bookkeeping for reporting"""
+    chunks: List[RetrievedChunk]
+    original_tokens: int
+    compressed_tokens: int
+    sentences_total: int
+    sentences_kept: int
+    compression_time: float
+
+    @property
+    def ratio(self) -> float:
+        """Compressed / original token ratio (1.0 = unchanged)"""
+        if self.original_tokens == 0:
+            return 1.0
+        return self.compressed_tokens / self.original_tokens
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary"""
+        return {
+            "original_tokens": self.original_tokens,
+            "compressed_tokens": self.compressed_tokens,
+            "compression_ratio": round(self.ratio, 3),
+            "sentences_total": self.sentences_total,
+            "sentences_kept": self.sentences_kept,
+            "compression_time": round(self.compression_time, 4),
+        }
+
+
+class ContextCompressor:
+    """
+    Query-aware extractive compressor for retrieved chunks.
+
+    Reuses the retriever's SentenceTransformer, so no extra model is loaded.
+    """
+
+    def __init__(
+        self,
+        model,
+        target_tokens: int = 800,
+        min_sentences_per_chunk: int = 1,
+        min_sentence_tokens: int = 4
+    ):
+        """
+        Initialize compressor.
+
+        Args:
+            model: Loaded SentenceTransformer (shared with MedicalRetriever)
+            target_tokens: Token budget for the compressed context
+            min_sentences_per_chunk: Sentences always kept per chunk (citation guarantee)
+            min_sentence_tokens: Shorter fragments are merged into the previous sentence
+        """
+        self.model = model
+        self.target_tokens = target_tokens
+        self.min_sentences_per_chunk = min_sentences_per_chunk
+        self.min_sentence_tokens = min_sentence_tokens
+
+    def compress(
+        self,
+        query_embedding: np.ndarray,
+        chunks: List[RetrievedChunk],
+        sentence_scores: Optional[Dict[str, Tuple[List[str], np.ndarray]]] = None
+    ) -> CompressionResult:
+        """
+        Compress chunks down to the target token budget.
+
+        Args:
+            query_embedding: Normalized query embedding from retrieval
+            chunks: Retrieved chunks (already deduplicated and budgeted)
+            sentence_scores: Optional precomputed {chunk_id: (sentences, scores)}
+                from SentenceIndex.score_chunks; used if it covers every chunk
+
+        Returns:
+            CompressionResult with shortened chunks (same order, same citations)
+        """
+        start_time = time.time()
+        original_tokens = sum(c.token_count for c in chunks)
+
+        use_index = bool(sentence_scores) and all(c.chunk_id in sentence_scores for c in chunks)
+
+        # Split into sentences, remembering the owning chunk
+        sentences: List[str] = []
+        owners: List[int] = []
+        for chunk_idx, chunk in enumerate(chunks):
+            chunk_sentences = (
+                sentence_scores[chunk.chunk_id][0] if use_index else self._split(chunk.text)
+            )
+            for sentence in chunk_sentences:
+                sentences.append(sentence)
+                owners.append(chunk_idx)
+
+        # Nothing to gain: already within budget
+        if original_tokens <= self.target_tokens or not sentences:
+            return CompressionResult(
+                chunks=chunks,
+                original_tokens=original_tokens,
+                compressed_tokens=original_tokens,
+                sentences_total=len(sentences),
+                sentences_kept=len(sentences),
+                compression_time=time.time() - start_time
+            )
+
+        if use_index:
+            scores = np.concatenate([sentence_scores[c.chunk_id][1] for c in chunks])
+        else:
+            scores = self._score(query_embedding, sentences)
+        kept = self._select(sentences, owners, scores, len(chunks))
+
+        # Re-assemble chunks from kept sentences (original sentence order)
+        kept_by_chunk = defaultdict(list)
+        for i in sorted(kept):
+            kept_by_chunk[owners[i]].append(sentences[i])
+
+        compressed_chunks = []
+        for chunk_idx, chunk in enumerate(chunks):
+            if chunk_idx not in kept_by_chunk:
+                continue
+            text = '\n'.join(kept_by_chunk[chunk_idx])
+            compressed_chunks.append(
+                replace(chunk, text=text, token_count=len(text.split()))
+            )
+
+        return CompressionResult(
+            chunks=compressed_chunks,
+            original_tokens=original_tokens,
+            compressed_tokens=sum(c.token_count for c in compressed_chunks),
+            sentences_total=len(sentences),
+            sentences_kept=len(kept),
+            compression_time=time.time() - start_time
+        )
+
+    def _split(self, text: str) -> List[str]:
+        """Split text and merge tiny fragments (list markers, headings)"""
+        merged: List[str] = []
+        for sentence in split_sentences(text):
+            if merged and len(sentence.split()) < self.min_sentence_tokens:
+                merged[-1] = f"{merged[-1]} {sentence}"
+            else:
+                merged.append(sentence)
+        return merged
+
+    def _score(self, query_embedding: np.ndarray, sentences: List[str]) -> np.ndarray:
+        """Cosine similarity of every sentence to the query (one batched encode)"""
+        sentence_embeddings = self.model.encode(
+            sentences,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return sentence_embeddings @ query_embedding
+
+    def _select(
+        self,
+        sentences: List[str],
+        owners: List[int],
+        scores: np.ndarray,
+        n_chunks: int
+    ) -> set:
+        """Pick sentence indices: per-chunk minimum first, then global best-first"""
+        token_counts = [len(s.split()) for s in sentences]
+        order = np.argsort(-scores)
+
+        kept = set()
+        total_tokens = 0
+
+        # Pass 1: guarantee each chunk keeps its best sentence(s)
+        per_chunk = [0] * n_chunks
+        for idx in order:
+            owner = owners[idx]
+            if per_chunk[owner] < self.min_sentences_per_chunk:
+                kept.add(int(idx))
+                per_chunk[owner] += 1
+                total_tokens += token_counts[idx]
+
+        # Pass 2: fill budget with best remaining sentences
+        for idx in order:
+            idx = int(idx)
+            if idx in kept:
+                continue
+            if total_tokens + token_counts[idx] > self.target_tokens:
+                continue
+            kept.add(idx)
+            total_tokens += token_counts[idx]
+
+        return kept
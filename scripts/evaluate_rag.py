@@ -87,7 +87,7 @@ class RAGEvaluator:
         import requests
         response = requests.post(
             f"{self.api_url}/query",
-            json={"query": question},
+            json={"query": question, "priority": "batch"},
             headers={"Authorization": f"Bearer {self.token}"},
             timeout=120
         )
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Coarse-to-Fine Retrieval
+========================
+
+Two-stage vector search over a hierarchy of document or section centroids:
+
+1. Coarse: rank the centroids (normalized mean chunk embedding per
+   document or per section) against the query
+2. Fine: score chunks only inside the top_m groups (more groups are added
+   until they hold at least the requested number of chunks)
+
+Both stages touch far fewer rows than a flat scan as the knowledge base
+grows (groups ~ sections, fine rows ~ top_m sections), at the cost of
+missing chunks in groups whose centroid ranks low; check recall against
+flat search with scripts/benchmark_retrieval.py.
+
+Chunk rows are those of the retriever's FilterIndex. Centroids come from
+build_kb.py (files below); missing or stale files (other groups, embedding
+model or dimension) are recomputed from the index at startup.
+
+Files (in [routing] centroids_dir):
+- document_centroids.npy / section_centroids.npy: (n_groups, dim) float32
+- hierarchy.json: model name, group keys and chunk counts per level
+
+Usage:
+    from hierarchical import CoarseIndex
+
+    coarse = CoarseIndex.build(filter_index, level="section", top_m=8)
+    rows = coarse.candidate_rows(query_embeddings, min_rows=8)
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+LEVELS = ("document", "section")
+
+
+def group_key(level: str, doc_id: str, section_title: str) -> str:
+    """Group of a chunk at the given level"""
+    if level == "document":
+        return doc_id
+    return f"{doc_id}::{section_title}"
+
+
+def save_group_centroids(
+    output_dir: Path,
+    model_name: str,
+    levels: Dict[str, Tuple[List[str], np.ndarray, List[int]]]
+):
+    """
+    Write document / section centroids (build_kb.py).
+
+    Args:
+        levels: level -> (group keys, normalized centroid matrix, chunk counts)
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    meta = {"model_name": model_name}
+    for level, (keys, centroids, counts) in levels.items():
+        np.save(output_dir / f"{level}_centroids.npy", centroids.astype(np.float32))
+        meta[level] = {"keys": keys, "counts": counts}
+
+    with open(output_dir / "hierarchy.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def _load_centroids(
+    centroids_dir: Path,
+    level: str,
+    keys: List[str],
+    dim: int,
+    model_name: Optional[str] = None
+) -> Optional[np.ndarray]:
+    """Stored centroids in `keys` order, None if missing or from another build or model"""
+    if not (centroids_dir / "hierarchy.json").exists():
+        return None
+
+    try:
+        with open(centroids_dir / "hierarchy.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        stored_keys = meta[level]["keys"]
+        if set(stored_keys) != set(keys):
+            return None
+        if model_name is not None and meta.get("model_name") != model_name:
+            return None
+        centroids = np.load(centroids_dir / f"{level}_centroids.npy")
+        if centroids.ndim != 2 or centroids.shape[1] != dim:
+            return None
+        position = {key: i for i, key in enumerate(stored_keys)}
+        return centroids[[position[key] for key in keys]]
+    except Exception as e:
+        logging.warning(f"Failed to load {level} centroids: {e}")
+        return None
+
+
+class CoarseIndex:
+    """Group centroids with the chunk rows of each group"""
+
+    def __init__(self, level: str, keys: List[str], centroids: np.ndarray, rows: List[np.ndarray], top_m: int = 8):
+        """
+        Args:
+            level: "document" or "section"
+            keys: Group key per centroid row
+            centroids: (n_groups, dim) normalized centroid matrix
+            rows: FilterIndex rows of each group
+            top_m: Groups searched per query (fine stage)
+        """
+        self.level = level
+        self.keys = keys
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.rows = rows
+        self.top_m = top_m
+
+    @classmethod
+    def build(
+        cls,
+        filter_index,
+        level: str = "section",
+        centroids_dir: Optional[str] = None,
+        top_m: int = 8,
+        model_name: Optional[str] = None
+    ) -> "CoarseIndex":
+        """
+        Group the rows of a FilterIndex and attach their centroids.
+
+        Args:
+            model_name: Embedding model of the index; stored centroids of
+                another model are recomputed
+
+        Raises:
+            ValueError: Unknown level
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown coarse search level '{level}' (known: {', '.join(LEVELS)})")
+
+        groups: Dict[str, List[int]] = {}
+        for row, metadata in enumerate(filter_index.metadatas):
+            key = group_key(level, metadata.get("doc_id", "unknown"), metadata.get("section_title", ""))
+            groups.setdefault(key, []).append(row)
+
+        keys = list(groups)
+        rows = [np.array(groups[key], dtype=np.int64) for key in keys]
+
+        dim = filter_index.embeddings.shape[1]
+        centroids = _load_centroids(Path(centroids_dir), level, keys, dim, model_name) if centroids_dir else None
+        if centroids is None:
+            centroids = np.zeros((len(rows), dim), dtype=np.float32)
+            for i, group in enumerate(rows):
+                centroids[i] = filter_index.embeddings[group].mean(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        return cls(level, keys, centroids, rows, top_m)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def candidate_rows(self, query_embeddings: np.ndarray, min_rows: int) -> List[np.ndarray]:
+        """
+        Chunk rows to search per query: the top_m groups by centroid score,
+        plus the next best groups until at least `min_rows` rows are covered.
+        """
+        scores = self.centroids @ np.asarray(query_embeddings, dtype=np.float32).T  # (groups, queries)
+
+        candidates = []
+        for column in scores.T:
+            picked = []
+            n_rows = 0
+            for group in np.argsort(-column):
+                if len(picked) >= self.top_m and n_rows >= min_rows:
+                    break
+                picked.append(self.rows[group])
+                n_rows += len(self.rows[group])
+            candidates.append(np.concatenate(picked) if picked else np.empty(0, dtype=np.int64))
+        return candidates
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Organ Keywords and Query Routing
+================================
+
+Organ vocabulary shared by the knowledge base build and query routing.
+
+- ORGAN_KEYWORDS: title keywords per organ; SectionAwareChunker uses them
+  to tag every chunk with its organ_type (first match, else "foundational")
+- OrganRouter: predicts the organ a question is about, so the retriever can
+  search that organ's chunks first:
+  1. Keywords: exactly one organ named in the query (ORGAN_KEYWORDS plus
+     QUERY_KEYWORDS) routes to it; several organs route globally
+  2. Centroids: otherwise the query embedding is compared with per-organ
+     centroids (mean chunk embedding, written by build_kb.py); the best
+     organ is used when it beats the runner-up by `min_margin`
+  Foundational or unsure predictions mean global search.
+
+Files (in [routing] centroids_dir):
+- organ_centroids.npy: (n_organs, dim) float32 matrix, rows normalized
+- organ_centroids.json: model name, organ names and chunk counts per row
+
+Usage:
+    from organs import OrganRouter
+
+    router = OrganRouter.load("./data/centroids")
+    decision = router.route("Signs of kidney rejection?", query_embedding)
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Title keywords per organ (order matters: first match wins)
+ORGAN_KEYWORDS: Dict[str, List[str]] = {
+    "kidney": ["kidney", "renal"],
+    "liver": ["liver", "hepat"],
+    "heart": ["heart", "cardiac"],
+    "lung": ["lung", "pulmonary"],
+    "pancreas": ["pancreas", "islet"],
+    "intestine": ["intestine", "bowel"],
+}
+
+# Extra query terms: questions often name an organ by its scores, tests or diseases
+QUERY_KEYWORDS: Dict[str, List[str]] = {
+    "kidney": ["nephr", "glomerul", "dialysis", "creatinine", "egfr", "bk virus", "polyoma"],
+    "liver": ["meld", "cirrho", "biliary", "bilirubin", "portal vein"],
+    "heart": ["lvad", "ventricular", "coronary", "myocard", "endomyocardial"],
+    "lung": ["bronchiolitis", "clad", "fev1"],
+    "pancreas": ["c-peptide", "pancrea"],
+    "intestine": ["intestin", "short gut"],
+}
+
+# Chunks of no particular organ (immunology, drugs, infections)
+FOUNDATIONAL = "foundational"
+
+
+def extract_organ(title: str) -> str:
+    """Organ of a document title (first keyword match, else foundational)"""
+    title_lower = title.lower()
+
+    for organ, keywords in ORGAN_KEYWORDS.items():
+        if any(kw in title_lower for kw in keywords):
+            return organ
+
+    return FOUNDATIONAL
+
+
+def match_organs(text: str) -> List[str]:
+    """All organs whose title or query keywords occur in the text"""
+    text_lower = text.lower()
+    return [
+        organ for organ in ORGAN_KEYWORDS
+        if any(kw in text_lower for kw in ORGAN_KEYWORDS[organ] + QUERY_KEYWORDS.get(organ, []))
+    ]
+
+
+def save_organ_centroids(
+    output_dir: Path,
+    model_name: str,
+    organs: List[str],
+    centroids: np.ndarray,
+    counts: List[int]
+):
+    """Write organ centroids (build_kb.py)"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    np.save(output_dir / "organ_centroids.npy", centroids.astype(np.float32))
+
+    with open(output_dir / "organ_centroids.json", 'w', encoding='utf-8') as f:
+        json.dump({"model_name": model_name, "organs": organs, "counts": counts}, f, indent=2)
+
+
+def mean_centroids(labels: List[str], embeddings: np.ndarray) -> Dict[str, np.ndarray]:
+    """Normalized mean embedding per label"""
+    labels = np.asarray(labels)
+    centroids = {}
+    for label in np.unique(labels).tolist():
+        centroid = embeddings[labels == label].mean(axis=0)
+        centroids[label] = centroid / max(np.linalg.norm(centroid), 1e-12)
+    return centroids
+
+
+@dataclass
+class RouteDecision:
+    """Where the router sends a query"""
+    organ: Optional[str]  # None = global search
+    method: str  # "keyword", "centroid" or "global"
+    confidence: float  # 1.0 for keywords, centroid margin otherwise
+    fallback: bool = False  # Routed search was weak; global results were used
+
+    def to_dict(self) -> Dict:
+        return {
+            "organ": self.organ,
+            "method": self.method,
+            "confidence": round(self.confidence, 4),
+            "fallback": self.fallback,
+        }
+
+
+class OrganRouter:
+    """Query -> organ prediction from keywords and organ centroids"""
+
+    def __init__(
+        self,
+        organs: List[str],
+        centroids: np.ndarray,
+        min_margin: float = 0.05,
+        model_name: Optional[str] = None
+    ):
+        """
+        Args:
+            organs: organ_type of each centroid row (organs present in the index)
+            centroids: (n_organs, dim) normalized centroid matrix
+            min_margin: Cosine margin over the runner-up needed to route by centroid
+            model_name: Embedding model the centroids were computed with (None = live index)
+        """
+        self.organs = organs
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.min_margin = min_margin
+        self.model_name = model_name
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    @classmethod
+    def load(cls, centroids_dir: str, **kwargs) -> Optional["OrganRouter"]:
+        """Open the centroids written by build_kb.py, else None"""
+        centroids_dir = Path(centroids_dir)
+        if not (centroids_dir / "organ_centroids.json").exists():
+            return None
+
+        try:
+            with open(centroids_dir / "organ_centroids.json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            return cls(
+                meta["organs"],
+                np.load(centroids_dir / "organ_centroids.npy"),
+                model_name=meta.get("model_name"),
+                **kwargs
+            )
+        except Exception as e:
+            logging.warning(f"Failed to load organ centroids: {e}")
+            return None
+
+    @classmethod
+    def from_embeddings(cls, organ_types: List[str], embeddings: np.ndarray, **kwargs) -> "OrganRouter":
+        """Centroids from chunk embeddings (knowledge bases built without centroid files)"""
+        centroids = mean_centroids(organ_types, embeddings)
+        return cls(list(centroids), np.stack(list(centroids.values())), **kwargs)
+
+    def route(self, query: str, query_embedding: np.ndarray) -> RouteDecision:
+        """Predict the organ of a query (organ None = search globally)"""
+        named = match_organs(query)
+        if len(named) == 1:
+            organ = named[0]
+            # Organs without chunks have no sub-index
+            if organ in self.organs:
+                return RouteDecision(organ, "keyword", 1.0)
+            return RouteDecision(None, "global", 0.0)
+        if len(named) > 1:
+            # Comparisons across organs need the whole knowledge base
+            return RouteDecision(None, "global", 0.0)
+
+        if len(self.organs) < 2:
+            return RouteDecision(None, "global", 0.0)
+
+        scores = self.centroids @ np.asarray(query_embedding, dtype=np.float32)
+        second, best = np.argsort(scores)[-2:]
+        margin = float(scores[best] - scores[second])
+        organ = self.organs[best]
+        if organ == FOUNDATIONAL or margin < self.min_margin:
+            return RouteDecision(None, "global", margin)
+        return RouteDecision(organ, "centroid", margin)
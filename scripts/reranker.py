@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Cross-Encoder Reranker - Bounded CPU Cost
+=========================================
+
+Optional second retrieval stage: over-fetch N candidates by vector search,
+then rescore (query, chunk) pairs with a small cross-encoder in ONE batched
+call and keep the best top_k.
+
+Cost controls:
+- Single worker thread: at most one rerank batch runs at a time
+- Per-request time budget: if scores are not ready in time, the request
+  falls back to vector order (the batch still finishes and fills the cache)
+- Bounded queue: with max_pending batches already queued or running, new
+  requests use vector order at once instead of queueing behind them
+- LRU cache of (query, chunk_id) scores: repeated queries skip the model
+
+Usage:
+    from reranker import CrossEncoderReranker
+
+    reranker = CrossEncoderReranker("cross-encoder/ms-marco-MiniLM-L-6-v2")
+    chunks, reranked = reranker.rerank(query, candidates)
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Dict, List, Tuple
+
+from sentence_transformers import CrossEncoder
+
+
+class CrossEncoderReranker:
+    """CPU cross-encoder with score cache and per-request time budget"""
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        time_budget_ms: int = 250,
+        cache_size: int = 4096,
+        batch_size: int = 32,
+        max_length: int = 512,
+        max_pending: int = 2
+    ):
+        """
+        Initialize reranker.
+
+        Args:
+            model_name: HuggingFace cross-encoder (small models only: runs on CPU)
+            time_budget_ms: Max time a request waits for scores before falling back
+            cache_size: Max cached (query, chunk_id) scores
+            batch_size: Cross-encoder batch size
+            max_length: Max tokens per (query, chunk) pair
+            max_pending: Max batches queued or running on the worker thread
+        """
+        self.model = CrossEncoder(model_name, device="cpu", max_length=max_length)
+        self.model_name = model_name
+        self.time_budget = time_budget_ms / 1000
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.stats = {"calls": 0, "cache_hits": 0, "cache_misses": 0, "timeouts": 0, "skipped": 0}
+
+    @staticmethod
+    def _query_key(query: str) -> str:
+        """Normalized query hash (cache key prefix)"""
+        return hashlib.sha1(" ".join(query.lower().split()).encode()).hexdigest()
+
+    def rerank(self, query: str, chunks: List) -> Tuple[List, bool]:
+        """
+        Reorder chunks by cross-encoder score.
+
+        Args:
+            query: User question
+            chunks: Candidate RetrievedChunk objects in vector order
+
+        Returns:
+            (chunks, reranked) - vector order and False if the budget was exceeded
+        """
+        if not chunks:
+            return chunks, False
+
+        query_key = self._query_key(query)
+        scores: Dict[str, float] = {}
+        missing = []
+
+        with self._lock:
+            self.stats["calls"] += 1
+            for chunk in chunks:
+                key = (query_key, chunk.chunk_id)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[chunk.chunk_id] = self._cache[key]
+                else:
+                    missing.append(chunk)
+            self.stats["cache_hits"] += len(chunks) - len(missing)
+            self.stats["cache_misses"] += len(missing)
+
+        if missing:
+            # Timed-out batches keep running; don't let them pile up
+            with self._lock:
+                if self._pending >= self.max_pending:
+                    self.stats["skipped"] += 1
+                    return chunks, False
+                self._pending += 1
+
+            future = self._executor.submit(self._predict, query, query_key, missing)
+            future.add_done_callback(self._release)
+            try:
+                scores.update(future.result(timeout=self.time_budget))
+            except TimeoutError:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                logging.warning(
+                    f"Rerank exceeded {self.time_budget * 1000:.0f}ms budget, using vector order"
+                )
+                return chunks, False
+
+        for chunk in chunks:
+            chunk.rerank_score = scores[chunk.chunk_id]
+
+        return sorted(chunks, key=lambda c: c.rerank_score, reverse=True), True
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _predict(self, query: str, query_key: str, chunks: List) -> Dict[str, float]:
+        """Score pairs in one batched call and cache them (runs on worker thread)"""
+        pair_scores = self.model.predict(
+            [(query, chunk.text) for chunk in chunks],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        )
+        scores = {chunk.chunk_id: float(s) for chunk, s in zip(chunks, pair_scores)}
+
+        with self._lock:
+            for chunk_id, score in scores.items():
+                self._cache[(query_key, chunk_id)] = score
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return scores
@@ -9,6 +9,10 @@ Features:
 - Semantic search with ChromaDB
 - Duplicate removal (token overlap-based)
 - Context budget enforcement (2500 tokens max)
+- Optional cross-encoder reranking (over-fetch + rerank, time-bounded)
+- Organ/tier filtering on precomputed row bitmaps (FilterIndex)
+- Optional query routing to organ sub-indexes (organs.OrganRouter)
+- Optional coarse-to-fine search via section/document centroids (hierarchical.CoarseIndex)
 - Metadata-rich results with citations
 
 Usage:
@@ -23,10 +27,12 @@ Version: 1.0
 
 import os
 import sys
+import time
 import logging
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+from typing import Callable, ClassVar, List, Dict, Optional, Union
+from dataclasses import dataclass, field, fields
 
 # Disable telemetry
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
@@ -40,6 +46,20 @@ import chromadb
 from sentence_transformers import SentenceTransformer
 from rank_bm25 import BM25Okapi
 
+from organs import FOUNDATIONAL, OrganRouter, RouteDecision
+from hierarchical import CoarseIndex
+
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer("retrieval")
+except ImportError:  # Tracing is optional
+    _tracer = None
+
+
+def _span(name: str):
+    """Child span of the caller's trace (no-op without opentelemetry)"""
+    return _tracer.start_as_current_span(name) if _tracer is not None else nullcontext()
+
 
 # ============================================================================
 # DATA STRUCTURES
@@ -58,6 +78,7 @@ class RetrievedChunk:
     token_count: int
     similarity_score: float
     rank: int
+    rerank_score: Optional[float] = None  # Cross-encoder score (if reranked)
     
     def format_citation(self) -> str:
         """Format as citation string"""
@@ -74,11 +95,57 @@ class RetrievedChunk:
             "tier": self.tier,
             "token_count": self.token_count,
             "similarity_score": self.similarity_score,
+            "rerank_score": self.rerank_score,
             "rank": self.rank,
             "citation": self.format_citation()
         }
 
 
+@dataclass
+class RetrievalTimings:
+    """
+    Per-stage retrieval timings in nanoseconds (time.perf_counter_ns).
+    
+    Optional stages (bm25, rerank) stay None when they did not run.
+    """
+    encode_ns: int = 0      # model.encode (query embedding)
+    query_ns: int = 0       # Vector search (collection.query / filter index)
+    parse_ns: int = 0       # _parse_results
+    bm25_ns: Optional[int] = None    # BM25 scoring + fusion (hybrid only)
+    route_ns: Optional[int] = None   # Organ routing decision (routed only)
+    rerank_ns: Optional[int] = None  # Cross-encoder rerank
+    dedup_ns: int = 0       # _deduplicate
+    budget_ns: int = 0      # _enforce_budget
+    total_ns: int = 0       # Whole retrieve() call
+    
+    # Stage names used by metrics sinks (rag_stage_seconds{stage=...})
+    STAGE_NAMES: ClassVar[Dict[str, str]] = {
+        "encode_ns": "embedding",
+        "query_ns": "vector_search",
+        "parse_ns": "parse",
+        "bm25_ns": "bm25",
+        "route_ns": "routing",
+        "rerank_ns": "rerank",
+        "dedup_ns": "dedup",
+        "budget_ns": "budget",
+        "total_ns": "retrieval",
+    }
+    
+    def to_dict(self) -> Dict[str, float]:
+        """Milliseconds per stage (stages that did not run are omitted)"""
+        return {
+            f"{f.name[:-3]}_ms": round(getattr(self, f.name) / 1e6, 3)
+            for f in fields(self) if getattr(self, f.name) is not None
+        }
+    
+    def stage_seconds(self) -> Dict[str, float]:
+        """Seconds per stage keyed by metrics stage name"""
+        return {
+            self.STAGE_NAMES[f.name]: getattr(self, f.name) / 1e9
+            for f in fields(self) if getattr(self, f.name) is not None
+        }
+
+
 @dataclass
 class RetrievalResult:
     """Complete retrieval result with metadata"""
@@ -86,6 +153,10 @@ class RetrievalResult:
     chunks: List[RetrievedChunk]
     total_tokens: int
     retrieval_time: float
+    query_embedding: Optional[np.ndarray] = None  # Reused by later stages (compression)
+    reranked: bool = False
+    timings: RetrievalTimings = field(default_factory=RetrievalTimings)
+    routing: Optional[RouteDecision] = None  # Set when the query was routed
     
     def format_context(self) -> str:
         """Format chunks as context for LLM"""
@@ -113,6 +184,142 @@ class RetrievalResult:
         return citations
 
 
+# ============================================================================
+# FILTER INDEX
+# ============================================================================
+
+class FilterIndex:
+    """
+    In-memory copy of the collection for metadata-filtered search.
+    
+    Chroma evaluates a `where` clause by scanning the metadata table before
+    searching, so filtered queries are slower than unfiltered ones. Here
+    every organ_type / tier value (written at build time by
+    SectionAwareChunker._extract_organ / _extract_tier) maps to a
+    precomputed row bitmap; a filter is one AND of two bitmaps, and the
+    search is an exact dot product over the matching rows only, so the
+    smaller the subset, the faster the search.
+    
+    Embeddings are normalized, so scores rank exactly like the collection's
+    cosine distance (distance = 1 - score).
+    """
+    
+    FIELDS: ClassVar[tuple] = ("organ_type", "tier")
+    
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[Dict], embeddings: np.ndarray):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.embeddings = embeddings / np.maximum(norms, 1e-12)
+        
+        # field -> value -> row bitmap
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        for name in self.FIELDS:
+            values = np.array([metadata.get(name, "unknown") for metadata in metadatas])
+            self.bitmaps[name] = {value: values == value for value in np.unique(values).tolist()}
+        
+        # (organ, tier) -> (row indices, embedding rows); filled on first use
+        self._subsets: Dict[tuple, tuple] = {}
+    
+    @classmethod
+    def from_collection(cls, collection) -> "FilterIndex":
+        """Load ids, texts, metadata and embeddings of the whole collection"""
+        results = collection.get(include=["documents", "metadatas", "embeddings"])
+        return cls(results["ids"], results["documents"], results["metadatas"], results["embeddings"])
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def values(self, name: str) -> List[str]:
+        """Known values of a metadata field (e.g. "organ_type")"""
+        return sorted(self.bitmaps[name])
+    
+    def _bitmap(self, name: str, value: str) -> np.ndarray:
+        bitmap = self.bitmaps[name].get(value)
+        if bitmap is None:
+            raise ValueError(
+                f"Unknown {name} filter '{value}' (known: {', '.join(self.values(name))})"
+            )
+        return bitmap
+    
+    def subset(self, organ_filter: Union[str, tuple, None], tier_filter: Optional[str]) -> tuple:
+        """
+        Rows matching both filters (None = no condition on that field; a
+        tuple of organs matches any of them).
+        
+        Returns:
+            (row indices, their embeddings)
+        
+        Raises:
+            ValueError: Filter value not present in the collection
+        """
+        key = (organ_filter, tier_filter)
+        subset = self._subsets.get(key)
+        if subset is None:
+            mask = np.ones(len(self.ids), dtype=bool)
+            if organ_filter:
+                organs = (organ_filter,) if isinstance(organ_filter, str) else organ_filter
+                organ_mask = np.zeros(len(self.ids), dtype=bool)
+                for organ in organs:
+                    organ_mask |= self._bitmap("organ_type", organ)
+                mask &= organ_mask
+            if tier_filter:
+                mask &= self._bitmap("tier", tier_filter)
+            rows = np.flatnonzero(mask)
+            subset = (rows, self.embeddings[rows])
+            self._subsets[key] = subset
+        return subset
+    
+    def get(self, organ_filter: Optional[str], tier_filter: Optional[str]) -> Dict:
+        """Matching rows in collection.get() format"""
+        rows, _ = self.subset(organ_filter, tier_filter)
+        return {
+            "ids": [self.ids[i] for i in rows],
+            "documents": [self.documents[i] for i in rows],
+            "metadatas": [self.metadatas[i] for i in rows],
+        }
+    
+    def query(
+        self,
+        query_embeddings: np.ndarray,
+        n_results: int,
+        organ_filter: Union[str, tuple, None],
+        tier_filter: Optional[str]
+    ) -> Dict:
+        """Top matching rows per query in collection.query() format"""
+        rows, matrix = self.subset(organ_filter, tier_filter)
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        
+        scores = matrix @ np.asarray(query_embeddings, dtype=np.float32).T  # (rows, queries)
+        for column in scores.T:
+            self._append_top(results, rows, column, n_results)
+        return results
+    
+    def query_rows(self, query_embeddings: np.ndarray, n_results: int, rows: List[np.ndarray]) -> Dict:
+        """Top rows per query among that query's own candidate rows (coarse-to-fine search)"""
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_embedding, candidate_rows in zip(np.asarray(query_embeddings, dtype=np.float32), rows):
+            column = self.embeddings[candidate_rows] @ query_embedding
+            self._append_top(results, candidate_rows, column, n_results)
+        return results
+    
+    def _append_top(self, results: Dict, rows: np.ndarray, scores: np.ndarray, n_results: int):
+        """Add the n best of `rows` (by `scores`) to collection.query()-style results"""
+        n_results = min(n_results, len(rows))
+        if n_results > 0:
+            top = np.argpartition(-scores, n_results - 1)[:n_results]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.empty(0, dtype=int)
+        results["ids"].append([self.ids[rows[i]] for i in top])
+        results["documents"].append([self.documents[rows[i]] for i in top])
+        results["metadatas"].append([self.metadatas[rows[i]] for i in top])
+        results["distances"].append((1.0 - scores[top]).tolist())
+
+
 # ============================================================================
 # MEDICAL RETRIEVER
 # ============================================================================
@@ -148,10 +355,14 @@ class MedicalRetriever:
         )
         
         # Load ChromaDB WITHOUT embedding function (we handle embeddings ourselves)
-        self.client = chromadb.PersistentClient(path=chroma_path)
-        self.collection = self.client.get_collection(
-            name=self.config["chroma"]["collection_name"]
-        )
+        self.chroma_path = chroma_path
+        self._connect()
+        
+        # Precomputed organ/tier row sets for filtered searches ([chroma] filter_index);
+        # a snapshot of the collection, built once and shared by forked workers
+        self.filter_index = None
+        if self.config["chroma"].get("filter_index", True):
+            self.filter_index = FilterIndex.from_collection(self.collection)
         
         # Retrieval parameters
         self.default_top_k = 8
@@ -160,10 +371,130 @@ class MedicalRetriever:
         self.hybrid_mode = False  # Disable hybrid search (RRF scoring bug)
         self.bm25_weight = 0.3  # BM25 contribution (0.3 = 30% keyword, 70% semantic)
         
+        # Called with every RetrievalTimings (e.g. the API's metrics histograms)
+        self.timing_sink: Optional[Callable[[RetrievalTimings], None]] = None
+        
+        # Optional query embedding cache with get/put/get_many/put_many
+        # (e.g. the API's shared SQLite cache, app/cache.py)
+        self.embedding_cache = None
+        
+        # Optional cross-encoder reranking stage
+        reranker_config = self.config.get("reranker", {})
+        self.rerank_mode = reranker_config.get("enabled", False)
+        self.rerank_candidates = reranker_config.get("candidates", 20)
+        self.reranker = None
+        if self.rerank_mode or reranker_config.get("preload", False):
+            self.reranker = self._load_reranker(reranker_config)
+        
+        # Optional organ routing (searches run on filter index subsets)
+        routing_config = self.config.get("routing", {})
+        self.route_mode = routing_config.get("enabled", False)
+        self.route_min_similarity = routing_config.get("min_similarity", 0.35)
+        self.route_include_foundational = routing_config.get("include_foundational", True)
+        self.router = None
+        if self.filter_index is not None:
+            self.router = self._load_router(routing_config)
+        
+        # Optional coarse-to-fine search for unfiltered queries ([coarse_search])
+        coarse_config = self.config.get("coarse_search", {})
+        self.coarse_mode = coarse_config.get("enabled", False)
+        self.coarse_index = None
+        if self.filter_index is not None:
+            if self.filter_index.embeddings.shape[1] == self.model.get_sentence_embedding_dimension():
+                self.coarse_index = CoarseIndex.build(
+                    self.filter_index,
+                    level=coarse_config.get("level", "section"),
+                    centroids_dir=routing_config.get("centroids_dir", "./data/centroids"),
+                    top_m=coarse_config.get("top_m", 8),
+                    model_name=embedding_config["model_name"]
+                )
+            else:
+                # Index from another embedding model: flat search only
+                logging.warning("Coarse search disabled: indexed embeddings do not match the query model")
+        
         print(f"✓ Retriever initialized")
         print(f"  Model: {embedding_config['model_name']}")
         print(f"  Collection: {self.collection.count()} chunks")
         print(f"  Hybrid search: {'Enabled' if self.hybrid_mode else 'Disabled'}")
+        if self.filter_index is not None:
+            print(
+                f"  Filter index: {len(self.filter_index.bitmaps['organ_type'])} organs, "
+                f"{len(self.filter_index.bitmaps['tier'])} tiers"
+            )
+        print(f"  Reranker: {self.reranker.model_name if self.reranker else 'Disabled'}")
+        print(f"  Routing: {'Enabled' if self.route_mode and self.router else 'Disabled'}")
+        if self.coarse_mode and self.coarse_index is not None:
+            print(f"  Coarse search: top {self.coarse_index.top_m} of {len(self.coarse_index)} {self.coarse_index.level}s")
+        else:
+            print("  Coarse search: Disabled")
+    
+    def _connect(self):
+        """Open the Chroma client and collection"""
+        self.client = chromadb.PersistentClient(path=self.chroma_path)
+        self.collection = self.client.get_collection(
+            name=self.config["chroma"]["collection_name"]
+        )
+    
+    def reconnect(self):
+        """
+        Re-open Chroma in a forked worker process.
+        
+        SQLite handles opened before fork() must not be used by the child;
+        Chroma caches one client per path, so that cache is cleared first.
+        """
+        try:
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        except (ImportError, AttributeError):
+            pass
+        self._connect()
+    
+    @staticmethod
+    def _load_reranker(reranker_config: Dict):
+        """Load cross-encoder reranker from [reranker] config"""
+        from reranker import CrossEncoderReranker
+        
+        return CrossEncoderReranker(
+            model_name=reranker_config.get("model_name", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+            time_budget_ms=reranker_config.get("time_budget_ms", 250),
+            cache_size=reranker_config.get("cache_size", 4096),
+            batch_size=reranker_config.get("batch_size", 32),
+            max_pending=reranker_config.get("max_pending", 2)
+        )
+    
+    def _load_router(self, routing_config: Dict) -> Optional[OrganRouter]:
+        """
+        Organ centroids from build_kb.py, or computed from the filter index.
+        
+        None (routing disabled) if the indexed embeddings do not match the
+        query encoder's dimension.
+        """
+        index = self.filter_index
+        dim = self.model.get_sentence_embedding_dimension()
+        if index.embeddings.shape[1] != dim:
+            logging.warning(
+                f"Routing disabled: indexed embeddings have dimension {index.embeddings.shape[1]}, "
+                f"query model {dim}"
+            )
+            return None
+        
+        min_margin = routing_config.get("min_margin", 0.05)
+        router = OrganRouter.load(
+            routing_config.get("centroids_dir", "./data/centroids"), min_margin=min_margin
+        )
+        stale = router is not None and (
+            router.model_name != self.config["embeddings"]["model_name"]
+            or router.dim != dim
+            or not set(router.organs) <= set(index.values("organ_type"))
+        )
+        if router is None or stale:
+            # Missing, or from another build of the knowledge base / embedding model
+            router = OrganRouter.from_embeddings(
+                [metadata.get("organ_type", "unknown") for metadata in index.metadatas],
+                index.embeddings,
+                min_margin=min_margin
+            )
+        return router
     
     def retrieve(
         self,
@@ -171,7 +502,10 @@ class MedicalRetriever:
         top_k: int = None,
         organ_filter: Optional[str] = None,
         tier_filter: Optional[str] = None,
-        use_hybrid: bool = None
+        use_hybrid: bool = None,
+        use_reranker: bool = None,
+        use_routing: bool = None,
+        use_coarse: bool = None
     ) -> RetrievalResult:
         """
         Retrieve relevant chunks for a query.
@@ -182,12 +516,20 @@ class MedicalRetriever:
             organ_filter: Filter by organ (e.g., "kidney", "liver")
             tier_filter: Filter by tier (e.g., "Tier 2: Kidney")
             use_hybrid: Enable BM25 + vector hybrid search (default: self.hybrid_mode)
+            use_reranker: Over-fetch candidates and rerank with the cross-encoder
+                (default: self.rerank_mode; requires [reranker] enabled or preload)
+            use_routing: Search the predicted organ's chunks first (default:
+                self.route_mode; vector-only searches without filters)
+            use_coarse: Two-stage search of unfiltered, unrouted queries: rank
+                section/document centroids, then chunks of the top groups
+                (default: self.coarse_mode; vector-only searches)
         
         Returns:
-            RetrievalResult with chunks and metadata
+            RetrievalResult with chunks, metadata and per-stage timings
         """
-        import time
-        start_time = time.time()
+        clock = time.perf_counter_ns
+        start_ns = clock()
+        timings = RetrievalTimings()
         
         if top_k is None:
             top_k = self.default_top_k
@@ -195,66 +537,222 @@ class MedicalRetriever:
         if use_hybrid is None:
             use_hybrid = self.hybrid_mode
         
+        if use_reranker is None:
+            use_reranker = self.rerank_mode
+        use_reranker = use_reranker and self.reranker is not None
+        
+        if use_routing is None:
+            use_routing = self.route_mode
+        use_routing = use_routing and self.router is not None and not (organ_filter or tier_filter)
+        
+        if use_coarse is None:
+            use_coarse = self.coarse_mode
+        
+        # Over-fetch candidates for the reranker
+        n_candidates = max(top_k, self.rerank_candidates) if use_reranker else top_k
+        
+        self.validate_filters(organ_filter, tier_filter)
+        
+        # Embed query once (shared by search and downstream stages)
+        stage_start = clock()
+        with _span("retrieval.encode"):
+            query_embedding = self._encode_query(query)
+        timings.encode_ns = clock() - stage_start
+        
         # Use hybrid search if enabled
+        decision = None
         if use_hybrid:
-            chunks = self._hybrid_retrieve(query, top_k, organ_filter, tier_filter)
+            chunks = self._hybrid_retrieve(query, query_embedding, n_candidates, organ_filter, tier_filter, timings)
+        elif use_routing:
+            chunks, decision = self._routed_retrieve(query, query_embedding, n_candidates, timings, use_coarse)
         else:
-            chunks = self._vector_only_retrieve(query, top_k, organ_filter, tier_filter)
+            chunks = self._vector_only_retrieve(
+                query_embedding, n_candidates, organ_filter, tier_filter, timings, use_coarse
+            )
+        
+        result = self._finish_retrieval(
+            query, query_embedding, chunks, top_k, use_reranker, timings, start_ns
+        )
+        result.routing = decision
+        return result
+    
+    def _finish_retrieval(
+        self,
+        query: str,
+        query_embedding: np.ndarray,
+        chunks: List[RetrievedChunk],
+        top_k: int,
+        use_reranker: bool,
+        timings: RetrievalTimings,
+        start_ns: int
+    ) -> RetrievalResult:
+        """Rerank, dedup, budget and rank search candidates (shared by batch_retrieve)"""
+        clock = time.perf_counter_ns
+        
+        # Rerank (falls back to vector order if over time budget)
+        reranked = False
+        if use_reranker:
+            stage_start = clock()
+            with _span("retrieval.rerank"):
+                chunks, reranked = self.reranker.rerank(query, chunks)
+            timings.rerank_ns = clock() - stage_start
+        chunks = chunks[:top_k]
         
         # Deduplicate
-        chunks = self._deduplicate(chunks)
+        stage_start = clock()
+        with _span("retrieval.dedup"):
+            chunks = self._deduplicate(chunks)
+        timings.dedup_ns = clock() - stage_start
         
         # Enforce context budget
-        chunks = self._enforce_budget(chunks)
+        stage_start = clock()
+        with _span("retrieval.budget"):
+            chunks = self._enforce_budget(chunks)
+        timings.budget_ns = clock() - stage_start
         
         # Assign ranks
         for i, chunk in enumerate(chunks, 1):
             chunk.rank = i
         
-        elapsed = time.time() - start_time
+        timings.total_ns = clock() - start_ns
+        
+        if self.timing_sink is not None:
+            try:
+                self.timing_sink(timings)
+            except Exception as e:
+                logging.debug(f"Retrieval timing sink failed: {e}")
         
         return RetrievalResult(
             query=query,
             chunks=chunks,
             total_tokens=sum(c.token_count for c in chunks),
-            retrieval_time=elapsed
+            retrieval_time=timings.total_ns / 1e9,
+            query_embedding=query_embedding,
+            reranked=reranked,
+            timings=timings
         )
     
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Embed query manually (don't use ChromaDB's embedding function)"""
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get(query)
+            if cached is not None:
+                return cached
+        
+        embedding = self.model.encode(
+            query,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        
+        if self.embedding_cache is not None:
+            self.embedding_cache.put(query, embedding)
+        return embedding
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed many queries with one model call (cached ones are skipped)"""
+        cached = self.embedding_cache.get_many(queries) if self.embedding_cache is not None else {}
+        missing = list(dict.fromkeys(q for q in queries if q not in cached))
+        
+        if missing:
+            embeddings = self.model.encode(
+                missing,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+            fresh = dict(zip(missing, embeddings))
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(fresh)
+            cached.update(fresh)
+        
+        return np.stack([cached[q] for q in queries])
+    
     def _vector_only_retrieve(
         self,
-        query: str,
+        query_embedding: np.ndarray,
         top_k: int,
         organ_filter: Optional[str],
-        tier_filter: Optional[str]
+        tier_filter: Optional[str],
+        timings: Optional[RetrievalTimings] = None,
+        coarse: bool = False
     ) -> List[RetrievedChunk]:
         """Original vector-only retrieval"""
-        # Embed query manually (don't use ChromaDB's embedding function)
-        query_embedding = self.model.encode(
-            query,
-            convert_to_numpy=True,
-            normalize_embeddings=True
-        )
+        if timings is None:
+            timings = RetrievalTimings()
         
-        # Build filter
-        where_clause = self._build_filter(organ_filter, tier_filter)
+        # Query with our embeddings
+        stage_start = time.perf_counter_ns()
+        with _span("retrieval.vector_search"):
+            results = self._search(query_embedding[np.newaxis], top_k, organ_filter, tier_filter, coarse)
+        timings.query_ns = time.perf_counter_ns() - stage_start
         
-        # Query ChromaDB with our embeddings
-        results = self.collection.query(
-            query_embeddings=[query_embedding.tolist()],
-            n_results=top_k,
-            where=where_clause,
-            include=["documents", "metadatas", "distances"]
+        # Parse results
+        stage_start = time.perf_counter_ns()
+        chunks = self._parse_results(results)
+        timings.parse_ns = time.perf_counter_ns() - stage_start
+        
+        return chunks
+    
+    def _route(self, query: str, query_embedding: np.ndarray, timings: RetrievalTimings) -> RouteDecision:
+        stage_start = time.perf_counter_ns()
+        with _span("retrieval.route"):
+            decision = self.router.route(query, query_embedding)
+        timings.route_ns = time.perf_counter_ns() - stage_start
+        return decision
+    
+    def _route_scope(self, organ: str) -> Union[str, tuple]:
+        """Organ filter of a routed search"""
+        if self.route_include_foundational and organ != FOUNDATIONAL:
+            return (organ, FOUNDATIONAL)
+        return organ
+    
+    def _routed_good_enough(self, chunks: List[RetrievedChunk], top_k: int) -> bool:
+        """Routed candidates are used unless too few or too weak"""
+        return len(chunks) >= top_k and chunks[0].similarity_score >= self.route_min_similarity
+    
+    def _routed_retrieve(
+        self,
+        query: str,
+        query_embedding: np.ndarray,
+        top_k: int,
+        timings: RetrievalTimings,
+        coarse: bool = False
+    ) -> tuple:
+        """
+        Vector search in the predicted organ's sub-index, falling back to
+        global search (coarse-to-fine with `coarse`) when the router is
+        unsure or the routed results are weak (fewer than top_k, best
+        similarity below min_similarity).
+        
+        Returns:
+            (chunks, RouteDecision)
+        """
+        decision = self._route(query, query_embedding, timings)
+        if decision.organ is None:
+            return self._vector_only_retrieve(query_embedding, top_k, None, None, timings, coarse), decision
+        
+        chunks = self._vector_only_retrieve(
+            query_embedding, top_k, self._route_scope(decision.organ), None, timings
         )
+        if self._routed_good_enough(chunks, top_k):
+            return chunks, decision
         
-        # Parse results
-        return self._parse_results(results)
+        # Both searches count towards the stage timings
+        routed_query_ns, routed_parse_ns = timings.query_ns, timings.parse_ns
+        chunks = self._vector_only_retrieve(query_embedding, top_k, None, None, timings, coarse)
+        timings.query_ns += routed_query_ns
+        timings.parse_ns += routed_parse_ns
+        decision.fallback = True
+        return chunks, decision
     
     def _hybrid_retrieve(
         self,
         query: str,
+        query_embedding: np.ndarray,
         top_k: int,
         organ_filter: Optional[str],
-        tier_filter: Optional[str]
+        tier_filter: Optional[str],
+        timings: Optional[RetrievalTimings] = None
     ) -> List[RetrievedChunk]:
         """
         Hybrid BM25 + vector search with Reciprocal Rank Fusion (RRF)
@@ -264,33 +762,43 @@ class MedicalRetriever:
         2. Get top-k results from BM25
         3. Combine using RRF: score = sum(1 / (rank + 60))
         4. Return top-k by combined score
+        
+        Timings: collection.get + query count as query_ns, BM25 + fusion as bm25_ns.
         """
-        # Get all documents from ChromaDB for BM25
-        all_results = self.collection.get(
-            include=["documents", "metadatas"],
-            where=self._build_filter(organ_filter, tier_filter)
-        )
+        if timings is None:
+            timings = RetrievalTimings()
+        clock = time.perf_counter_ns
+        
+        # Get all (matching) documents for BM25
+        stage_start = clock()
+        if self.filter_index is not None:
+            all_results = self.filter_index.get(organ_filter, tier_filter)
+        else:
+            all_results = self.collection.get(
+                include=["documents", "metadatas"],
+                where=self._build_filter(organ_filter, tier_filter)
+            )
         
         if not all_results["documents"]:
+            timings.query_ns = clock() - stage_start
             return []
         
         # Step 1: Vector search with manual embeddings
-        query_embedding = self.model.encode(
-            query,
-            convert_to_numpy=True,
-            normalize_embeddings=True
-        )
-        
-        vector_results = self.collection.query(
-            query_embeddings=[query_embedding.tolist()],
-            n_results=min(top_k * 2, len(all_results["documents"])),  # Get 2x for fusion
-            where=self._build_filter(organ_filter, tier_filter),
-            include=["documents", "metadatas", "distances"]
-        )
+        with _span("retrieval.vector_search"):
+            vector_results = self._search(
+                query_embedding[np.newaxis],
+                min(top_k * 2, len(all_results["documents"])),  # Get 2x for fusion
+                organ_filter,
+                tier_filter
+            )
+        timings.query_ns = clock() - stage_start
         
+        stage_start = clock()
         vector_chunks = self._parse_results(vector_results)
+        timings.parse_ns = clock() - stage_start
         
         # Step 2: BM25 search
+        stage_start = clock()
         tokenized_corpus = [doc.lower().split() for doc in all_results["documents"]]
         bm25 = BM25Okapi(tokenized_corpus)
         
@@ -323,7 +831,7 @@ class MedicalRetriever:
             # Store chunk object if not already stored
             if f"{chunk_id}_obj" not in chunk_scores:
                 chunk = RetrievedChunk(
-                    chunk_id=metadata.get("doc_id", "unknown") + f":chunk_{metadata.get('chunk_index', 0)}",
+                    chunk_id=all_results["ids"][idx],
                     text=doc,
                     doc_id=metadata.get("doc_id", "unknown"),
                     doc_title=metadata.get("doc_title", "Unknown Document"),
@@ -344,9 +852,49 @@ class MedicalRetriever:
                 if chunk_obj:
                     chunk_obj.similarity_score = score  # Use RRF score
                     sorted_chunks.append(chunk_obj)
+        timings.bm25_ns = clock() - stage_start
         
         return sorted_chunks[:top_k]
     
+    def _search(
+        self,
+        query_embeddings: np.ndarray,
+        n_results: int,
+        organ_filter: Union[str, tuple, None],
+        tier_filter: Optional[str],
+        coarse: bool = False
+    ) -> Dict:
+        """
+        Vector search for one or more query embeddings (collection.query format).
+        
+        Filtered searches run on the filter index; unfiltered ones (or all,
+        without the index) use the Chroma collection, or with `coarse` the
+        chunks of each query's best sections/documents (CoarseIndex).
+        """
+        if (organ_filter or tier_filter) and self.filter_index is not None:
+            return self.filter_index.query(query_embeddings, n_results, organ_filter, tier_filter)
+        
+        if coarse and self.coarse_index is not None and not (organ_filter or tier_filter):
+            rows = self.coarse_index.candidate_rows(query_embeddings, min_rows=n_results)
+            return self.filter_index.query_rows(query_embeddings, n_results, rows)
+        
+        return self.collection.query(
+            query_embeddings=query_embeddings.tolist(),
+            n_results=n_results,
+            where=self._build_filter(organ_filter, tier_filter),
+            include=["documents", "metadatas", "distances"]
+        )
+    
+    def validate_filters(self, organ_filter: Optional[str], tier_filter: Optional[str]):
+        """
+        Check filter values against the knowledge base (needs the filter index).
+        
+        Raises:
+            ValueError: Unknown organ or tier
+        """
+        if self.filter_index is not None and (organ_filter or tier_filter):
+            self.filter_index.subset(organ_filter, tier_filter)
+    
     def _build_filter(
         self,
         organ_filter: Optional[str],
@@ -356,29 +904,31 @@ class MedicalRetriever:
         if not organ_filter and not tier_filter:
             return None
         
-        where_clause = {}
+        conditions = []
         
         if organ_filter:
-            where_clause["organ_type"] = organ_filter
+            conditions.append({"organ_type": organ_filter})
         
         if tier_filter:
-            where_clause["tier"] = tier_filter
+            conditions.append({"tier": tier_filter})
         
-        return where_clause
+        # Chroma accepts one field per clause; several must be combined with $and
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
     
-    def _parse_results(self, results: Dict) -> List[RetrievedChunk]:
-        """Parse ChromaDB results into RetrievedChunk objects"""
+    def _parse_results(self, results: Dict, index: int = 0) -> List[RetrievedChunk]:
+        """Parse ChromaDB results (query `index` of a multi-query call) into RetrievedChunk objects"""
         chunks = []
         
-        for doc, metadata, distance in zip(
-            results["documents"][0],
-            results["metadatas"][0],
-            results["distances"][0]
+        for chunk_id, doc, metadata, distance in zip(
+            results["ids"][index],
+            results["documents"][index],
+            results["metadatas"][index],
+            results["distances"][index]
         ):
             similarity = 1 - distance  # Convert distance to similarity
             
             chunk = RetrievedChunk(
-                chunk_id=metadata.get("doc_id", "unknown") + f":chunk_{metadata.get('chunk_index', 0)}",
+                chunk_id=chunk_id,  # ChromaDB ID (matches build_kb chunk IDs)
                 text=doc,
                 doc_id=metadata.get("doc_id", "unknown"),
                 doc_title=metadata.get("doc_title", "Unknown Document"),
@@ -455,10 +1005,164 @@ class MedicalRetriever:
     def batch_retrieve(
         self,
         queries: List[str],
-        top_k: int = None
+        top_k: Union[int, List[int], None] = None,
+        use_reranker: Union[bool, List[Optional[bool]], None] = None,
+        organ_filter: Union[str, List[Optional[str]], None] = None,
+        tier_filter: Union[str, List[Optional[str]], None] = None,
+        use_hybrid: Optional[bool] = None,
+        use_routing: Optional[bool] = None,
+        use_coarse: Optional[bool] = None
     ) -> List[RetrievalResult]:
-        """Retrieve for multiple queries (useful for evaluation)"""
-        return [self.retrieve(q, top_k) for q in queries]
+        """
+        Retrieve for multiple queries in one pass.
+        
+        All queries are embedded with a single model.encode() call and, in
+        vector-only mode, searched with one vector search per distinct
+        filter; rerank, dedup and budget then run per query. Hybrid mode
+        still fuses BM25 per query (with the batched embeddings).
+        
+        Args:
+            queries: User questions
+            top_k: One value for all queries or one per query (default: 8)
+            use_reranker: One value for all queries or one per query
+            organ_filter: Filter by organ, for all queries or one per query
+            tier_filter: Filter by tier, for all queries or one per query
+            use_hybrid: BM25 + vector hybrid search (default: self.hybrid_mode)
+            use_routing: Route unfiltered queries to organ sub-indexes
+                (default: self.route_mode; vector-only mode)
+            use_coarse: Coarse-to-fine search for unfiltered, unrouted queries
+                (default: self.coarse_mode; vector-only mode)
+        
+        Returns:
+            One RetrievalResult per query, in order. Shared stages (encode,
+            vector_search) are reported amortized: batch time / len(queries).
+        """
+        if not queries:
+            return []
+        
+        clock = time.perf_counter_ns
+        start_ns = clock()
+        n = len(queries)
+        
+        top_ks = top_k if isinstance(top_k, list) else [top_k] * n
+        top_ks = [k if k is not None else self.default_top_k for k in top_ks]
+        rerank_flags = use_reranker if isinstance(use_reranker, list) else [use_reranker] * n
+        rerank_flags = [
+            (self.rerank_mode if flag is None else flag) and self.reranker is not None
+            for flag in rerank_flags
+        ]
+        n_candidates = [
+            max(k, self.rerank_candidates) if flag else k
+            for k, flag in zip(top_ks, rerank_flags)
+        ]
+        organ_filters = organ_filter if isinstance(organ_filter, list) else [organ_filter] * n
+        tier_filters = tier_filter if isinstance(tier_filter, list) else [tier_filter] * n
+        for organ, tier in set(zip(organ_filters, tier_filters)):
+            self.validate_filters(organ, tier)
+        
+        # One encoder call for the whole batch
+        stage_start = clock()
+        with _span("retrieval.encode"):
+            embeddings = self._encode_queries(queries)
+        encode_ns = (clock() - stage_start) // n
+        
+        timings = [RetrievalTimings(encode_ns=encode_ns) for _ in queries]
+        decisions: List[Optional[RouteDecision]] = [None] * n
+        
+        if use_hybrid is None:
+            use_hybrid = self.hybrid_mode
+        
+        if use_hybrid:
+            candidates = [
+                self._hybrid_retrieve(query, embedding, k, organ, tier, t)
+                for query, embedding, k, organ, tier, t in zip(
+                    queries, embeddings, n_candidates, organ_filters, tier_filters, timings
+                )
+            ]
+        else:
+            if use_routing is None:
+                use_routing = self.route_mode
+            if use_coarse is None:
+                use_coarse = self.coarse_mode
+            
+            # Routed queries search their organ's sub-index (explicit filters win)
+            search_filters = list(zip(organ_filters, tier_filters))
+            if use_routing and self.router is not None:
+                for i, query in enumerate(queries):
+                    if organ_filters[i] or tier_filters[i]:
+                        continue
+                    decisions[i] = self._route(query, embeddings[i], timings[i])
+                    if decisions[i].organ is not None:
+                        search_filters[i] = (self._route_scope(decisions[i].organ), None)
+            
+            candidates = [None] * n
+            self._grouped_search(
+                embeddings, search_filters, n_candidates, timings, candidates, range(n), use_coarse
+            )
+            
+            # Weak routed results: one global search for all of them
+            fallback = [
+                i for i, decision in enumerate(decisions)
+                if decision is not None and decision.organ is not None
+                and not self._routed_good_enough(candidates[i], n_candidates[i])
+            ]
+            if fallback:
+                routed_ns = {i: (timings[i].query_ns, timings[i].parse_ns) for i in fallback}
+                self._grouped_search(
+                    embeddings, [(None, None)] * n, n_candidates, timings, candidates, fallback, use_coarse
+                )
+                for i in fallback:
+                    timings[i].query_ns += routed_ns[i][0]
+                    timings[i].parse_ns += routed_ns[i][1]
+                    decisions[i].fallback = True
+        
+        # Per-query totals: amortized shared work + own stages
+        shared_ns = clock() - start_ns
+        batch_results = []
+        for i, query in enumerate(queries):
+            own_start = clock()
+            result = self._finish_retrieval(
+                query, embeddings[i], candidates[i], top_ks[i], rerank_flags[i],
+                timings[i], own_start - shared_ns // n
+            )
+            result.routing = decisions[i]
+            batch_results.append(result)
+        
+        return batch_results
+    
+    def _grouped_search(
+        self,
+        embeddings: np.ndarray,
+        filters: List[tuple],
+        n_candidates: List[int],
+        timings: List[RetrievalTimings],
+        candidates: List,
+        indexes,
+        coarse: bool = False
+    ):
+        """
+        Vector search for the queries at `indexes` (batch_retrieve): one
+        search call per distinct (organ, tier) filter, each query keeping its
+        own candidate count. Fills candidates[i] and timings[i].
+        """
+        clock = time.perf_counter_ns
+        groups = {}
+        for i in indexes:
+            groups.setdefault(filters[i], []).append(i)
+        
+        for (organ, tier), members in groups.items():
+            stage_start = clock()
+            with _span("retrieval.vector_search"):
+                results = self._search(
+                    embeddings[members], max(n_candidates[i] for i in members), organ, tier, coarse
+                )
+            query_ns = (clock() - stage_start) // len(members)
+            
+            for j, i in enumerate(members):
+                timings[i].query_ns = query_ns
+                stage_start = clock()
+                candidates[i] = self._parse_results(results, j)[:n_candidates[i]]
+                timings[i].parse_ns = clock() - stage_start
 
 
 # ============================================================================
@@ -473,11 +1177,15 @@ def format_results_for_display(result: RetrievalResult) -> str:
     output.append(f"Query: {result.query}")
     output.append(f"Retrieved: {len(result.chunks)} chunks ({result.total_tokens} tokens)")
     output.append(f"Time: {result.retrieval_time:.3f}s")
+    output.append("Stages: " + ", ".join(
+        f"{name[:-3]} {ms:.2f}ms" for name, ms in result.timings.to_dict().items() if name != "total_ms"
+    ))
     output.append("=" * 80)
     output.append("")
     
     for chunk in result.chunks:
-        output.append(f"[Rank {chunk.rank}] Similarity: {chunk.similarity_score:.3f}")
+        rerank_info = f" | Rerank: {chunk.rerank_score:.3f}" if chunk.rerank_score is not None else ""
+        output.append(f"[Rank {chunk.rank}] Similarity: {chunk.similarity_score:.3f}{rerank_info}")
         output.append(f"Source: {chunk.format_citation()}")
         output.append(f"Organ: {chunk.organ_type} | Tier: {chunk.tier} | Tokens: {chunk.token_count}")
         output.append("-" * 80)
@@ -508,6 +1216,7 @@ def main():
     parser.add_argument("--top_k", type=int, default=8, help="Number of results")
     parser.add_argument("--organ", type=str, help="Filter by organ")
     parser.add_argument("--tier", type=str, help="Filter by tier")
+    parser.add_argument("--rerank", action="store_true", help="Rerank with cross-encoder")
     parser.add_argument("--chroma", type=str, default="./data/chroma", help="ChromaDB path")
     parser.add_argument("--config", type=str, default="rag_config.toml", help="Config path")
     
@@ -516,6 +1225,8 @@ def main():
     # Initialize retriever
     print("Initializing retriever...")
     retriever = MedicalRetriever(args.chroma, args.config)
+    if args.rerank and retriever.reranker is None:
+        retriever.reranker = retriever._load_reranker(retriever.config.get("reranker", {}))
     print()
     
     # Retrieve
@@ -530,7 +1241,8 @@ def main():
         args.query,
         top_k=args.top_k,
         organ_filter=args.organ,
-        tier_filter=args.tier
+        tier_filter=args.tier,
+        use_reranker=args.rerank or None
     )
     
     # Display
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Sentence Index - Query-Time Sentence Ranking
+============================================
+
+Loads the sentence-level embedding index written by
+`build_kb.py --sentence-index` and ranks the sentences of retrieved chunks
+against a query embedding without re-encoding any text.
+
+Files (in [sentence_index] output_dir):
+- sentence_embeddings.npy: (n_sentences, dim) float16 matrix, memory-mapped
+- sentence_index.json: chunk IDs, [start, end) row offsets, sentence texts
+
+Usage:
+    from sentence_index import SentenceIndex
+
+    index = SentenceIndex.load("./data/sentence_index", model_name, dim, collection.count())
+    ranked = index.score_chunks(result.query_embedding, [c.chunk_id for c in result.chunks])
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class SentenceIndex:
+    """Memory-mapped sentence embeddings with a sentence -> chunk offset map"""
+
+    def __init__(self, index_dir: str):
+        """
+        Open an existing sentence index.
+
+        Args:
+            index_dir: Directory containing sentence_embeddings.npy and sentence_index.json
+        """
+        index_dir = Path(index_dir)
+
+        with open(index_dir / "sentence_index.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.model_name = meta["model_name"]
+        self.sentences: List[str] = meta["sentences"]
+        self.offsets: Dict[str, Tuple[int, int]] = {
+            chunk_id: (start, end)
+            for chunk_id, (start, end) in zip(meta["chunk_ids"], meta["offsets"])
+        }
+
+        # Pages are loaded lazily by the OS; only touched rows cost memory
+        self.embeddings = np.load(index_dir / "sentence_embeddings.npy", mmap_mode='r')
+
+    @classmethod
+    def load(
+        cls,
+        index_dir: str,
+        model_name: Optional[str] = None,
+        dim: Optional[int] = None,
+        n_chunks: Optional[int] = None
+    ) -> Optional["SentenceIndex"]:
+        """
+        Open the index if it was built and matches the live knowledge base, else None.
+
+        Args:
+            index_dir: Directory written by build_kb.py --sentence-index
+            model_name: Embedding model of the retriever
+            dim: Embedding dimension of the retriever
+            n_chunks: Chunks in the collection (a rebuild without
+                --sentence-index leaves an index of the old chunks behind)
+        """
+        if not (Path(index_dir) / "sentence_index.json").exists():
+            return None
+
+        try:
+            index = cls(index_dir)
+        except Exception as e:
+            logging.warning(f"Failed to load sentence index: {e}")
+            return None
+
+        mismatch = index.mismatch(model_name, dim, n_chunks)
+        if mismatch:
+            logging.warning(f"Sentence index disabled ({mismatch}); rebuild with build_kb.py --sentence-index")
+            return None
+        return index
+
+    def __len__(self) -> int:
+        return len(self.sentences)
+
+    def mismatch(
+        self,
+        model_name: Optional[str] = None,
+        dim: Optional[int] = None,
+        n_chunks: Optional[int] = None
+    ) -> Optional[str]:
+        """Why the index does not belong to the live knowledge base, None if it does"""
+        if model_name is not None and self.model_name != model_name:
+            return f"built with {self.model_name}, retriever uses {model_name}"
+        if dim is not None and self.embeddings.shape[1] != dim:
+            return f"dimension {self.embeddings.shape[1]}, retriever uses {dim}"
+        if n_chunks is not None and len(self.offsets) != n_chunks:
+            return f"{len(self.offsets)} chunks indexed, collection has {n_chunks}"
+        return None
+
+    def score_chunks(
+        self,
+        query_embedding: np.ndarray,
+        chunk_ids: List[str]
+    ) -> Dict[str, Tuple[List[str], np.ndarray]]:
+        """
+        Score all sentences of the given chunks with one matrix product.
+
+        Args:
+            query_embedding: Normalized query embedding
+            chunk_ids: Retrieved chunk IDs (unknown IDs are skipped)
+
+        Returns:
+            {chunk_id: (sentences in original order, cosine scores)}
+        """
+        spans = [
+            (chunk_id, self.offsets[chunk_id])
+            for chunk_id in chunk_ids if chunk_id in self.offsets
+        ]
+        if not spans:
+            return {}
+
+        rows = np.concatenate([np.arange(start, end) for _, (start, end) in spans])
+        scores = self.embeddings[rows].astype(np.float32) @ query_embedding.astype(np.float32)
+
+        ranked = {}
+        position = 0
+        for chunk_id, (start, end) in spans:
+            n = end - start
+            ranked[chunk_id] = (self.sentences[start:end], scores[position:position + n])
+            position += n
+
+        return ranked
+
+
+def best_sentence_preview(
+    sentences: List[str],
+    scores: np.ndarray,
+    max_chars: int = 200
+) -> str:
+    """
+    Build a source preview from the highest-scoring sentences.
+
+    Always includes the best sentence; adds the next best while the preview
+    stays within max_chars. Sentences are shown in document order.
+    """
+    if not sentences:
+        return ""
+
+    order = np.argsort(-scores)
+    picked = [int(order[0])]
+    length = len(sentences[picked[0]])
+
+    for idx in order[1:]:
+        idx = int(idx)
+        if length + len(sentences[idx]) + 1 > max_chars:
+            continue
+        picked.append(idx)
+        length += len(sentences[idx]) + 1
+
+    return " ".join(sentences[i] for i in sorted(picked))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Admission Control Tests
+=======================
+
+Unit tests for app/admission.py and the generation gateway's priority
+scheduling (no API, Ollama server or knowledge base needed).
+
+Usage:
+    python -m pytest test_admission.py
+"""
+
+import time
+import asyncio
+
+import pytest
+
+from app.admission import BATCH, INTERACTIVE, AdmissionController, AdmissionRejected
+
+
+async def _settle():
+    """Let queued acquire() tasks run until they block"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _waiter(controller: AdmissionController, name: str, admitted: list, priority: str = INTERACTIVE):
+    """Task acquiring a slot; appends `name` to `admitted` once it holds it"""
+    async def acquire():
+        ticket = await controller.acquire(priority=priority)
+        admitted.append(name)
+        return ticket
+    return asyncio.ensure_future(acquire())
+
+
+def test_acquire_release_fifo_order():
+    """Waiters get slots in arrival order as slots are released"""
+    async def main():
+        controller = AdmissionController(max_in_flight=1, initial_service_time=0.01)
+        first = await controller.acquire()
+        admitted = []
+        tasks = [_waiter(controller, name, admitted) for name in ("a", "b", "c")]
+        await _settle()
+        assert admitted == []
+        assert controller.queued_by_priority()[INTERACTIVE] == 3
+
+        first.release()
+        for expected in (["a"], ["a", "b"], ["a", "b", "c"]):
+            await _settle()
+            assert admitted == expected
+            assert controller.in_flight == 1
+            tasks[len(expected) - 1].result().release()
+
+        assert controller.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_queue_full_rejects_with_429():
+    async def main():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, initial_service_time=0.01)
+        held = await controller.acquire()
+        queued = _waiter(controller, "queued", [])
+        await _settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.status_code == 429
+        assert int(rejected.value.headers["Retry-After"]) >= 1
+
+        held.release()
+        await _settle()
+        queued.result().release()
+
+    asyncio.run(main())
+
+
+def test_deadline_rejects_with_503():
+    async def main():
+        # Estimated wait (one generation of ~10s) exceeds the deadline: fail fast
+        controller = AdmissionController(max_in_flight=1, max_wait=1.0, initial_service_time=10.0)
+        held = await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.status_code == 503
+        assert rejected.value.headers["Retry-After"] == "10"
+        assert controller.queued == 0
+
+        # Estimate fits, but the slot is not freed in time: give up after max_wait
+        controller._service_time = 0.01
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(max_wait=0.05)
+        assert rejected.value.status_code == 503
+        assert controller.queued == 0
+
+        held.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_double_release_is_noop():
+    async def main():
+        controller = AdmissionController(max_in_flight=1, initial_service_time=0.01)
+        ticket = await controller.acquire()
+        admitted = []
+        tasks = [_waiter(controller, name, admitted) for name in ("a", "b")]
+        await _settle()
+
+        ticket.release()
+        ticket.release()
+        await _settle()
+        # The second release must not free another slot
+        assert admitted == ["a"]
+        assert controller.in_flight == 1
+
+        tasks[0].result().release()
+        await _settle()
+        tasks[1].result().release()
+        tasks[1].result().release()
+        assert controller.in_flight == 0
+        assert controller.stats()["in_flight_by_priority"] == {INTERACTIVE: 0, BATCH: 0}
+
+    asyncio.run(main())
+
+
+def test_interactive_before_batch():
+    """A queued interactive request gets the next free slot before older batch work"""
+    async def main():
+        controller = AdmissionController(
+            max_in_flight=3, batch_max_in_flight=2, batch_min_in_flight=1, initial_service_time=0.01
+        )
+        running_batch = await controller.acquire(priority=BATCH)  # Fair share already met
+        running = [await controller.acquire(), await controller.acquire()]
+
+        admitted = []
+        batch = _waiter(controller, "batch", admitted, BATCH)
+        await _settle()
+        interactive = _waiter(controller, "interactive", admitted)
+        await _settle()
+        assert admitted == []
+
+        running[0].release()
+        await _settle()
+        assert admitted == ["interactive"]
+
+        running[1].release()
+        await _settle()
+        assert admitted == ["interactive", "batch"]
+
+        for ticket in (running_batch, interactive.result(), batch.result()):
+            ticket.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_batch_fair_share_with_full_interactive_queue():
+    """Batch work still runs while the interactive queue is always full"""
+    async def main():
+        controller = AdmissionController(
+            max_in_flight=2, max_queue=2, batch_min_in_flight=1, initial_service_time=0.01
+        )
+        running = [await controller.acquire(), await controller.acquire()]
+        admitted = []
+        queued = [_waiter(controller, f"interactive-{i}", admitted) for i in range(2)]
+        batch = _waiter(controller, "batch", admitted, BATCH)
+        await _settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.status_code == 429
+
+        # The first free slot goes to batch (fair share), not the full interactive queue
+        running[0].release()
+        await _settle()
+        assert admitted == ["batch"]
+        assert controller.stats()["in_flight_by_priority"] == {INTERACTIVE: 1, BATCH: 1}
+
+        # Once batch holds its share, interactive requests get the free slots again
+        running[1].release()
+        await _settle()
+        assert admitted == ["batch", "interactive-0"]
+
+        batch.result().release()
+        await _settle()
+        assert admitted == ["batch", "interactive-0", "interactive-1"]
+        queued[0].result().release()
+        queued[1].result().release()
+        assert controller.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_gateway_aged_batch_does_not_overtake_interactive():
+    """GenerationGateway._pick: the affinity timeout applies within a priority class"""
+    pytest.importorskip("ollama")
+    from app.generation import GenerationGateway, _Waiter
+
+    gateway = GenerationGateway("http://localhost:11434", affinity_max_wait=10.0)
+    gateway.loaded_model = "gemma3:1b"
+
+    batch = _Waiter("gemma3:1b", BATCH)
+    batch.enqueued_at = time.monotonic() - 60  # Way past affinity_max_wait
+    interactive = _Waiter("phi3:mini", INTERACTIVE)
+    gateway._waiters = [batch, interactive]
+    assert gateway._pick() is interactive
+
+    # No interactive waiter: the aged batch waiter goes next
+    gateway._waiters = [batch]
+    assert gateway._pick() is batch
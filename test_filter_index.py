@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Filter Index Tests
+==================
+
+Unit tests for scripts/retrieval.py's FilterIndex (organ/tier row bitmaps)
+and MedicalRetriever._build_filter, checked against a plain Python filter
+over the metadata (no ChromaDB collection or embedding model needed).
+
+Usage:
+    python -m pytest test_filter_index.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("rank_bm25")
+
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+
+from retrieval import FilterIndex, MedicalRetriever
+
+# (organ_type, tier) pairs as written by build_kb.py; "foundational" spans two tiers
+LABELS = [
+    ("foundational", "Tier 1: Foundational"),
+    ("kidney", "Tier 2: Kidney"),
+    ("liver", "Tier 3: Liver"),
+    ("heart", "Tier 4: Heart/Lung"),
+    ("foundational", "Tier 6: Emerging"),
+]
+
+FILTERS = [
+    ("kidney", None),                                # Organ only
+    (("kidney", "liver"), None),                     # Any of several organs
+    (None, "Tier 6: Emerging"),                      # Tier only
+    ("foundational", "Tier 1: Foundational"),        # Both
+    ("kidney", "Tier 1: Foundational"),              # Both, no overlap
+]
+
+
+def _make_index(n: int = 60, dim: int = 16, seed: int = 0) -> FilterIndex:
+    rng = np.random.default_rng(seed)
+    metadatas = []
+    for i in range(n):
+        organ, tier = LABELS[i % len(LABELS)]
+        metadatas.append({"organ_type": organ, "tier": tier, "section_title": f"Section {i}"})
+    return FilterIndex(
+        ids=[f"chunk_{i}" for i in range(n)],
+        documents=[f"text {i}" for i in range(n)],
+        metadatas=metadatas,
+        embeddings=rng.normal(size=(n, dim))
+    )
+
+
+def _matches(metadata: dict, organ_filter, tier_filter) -> bool:
+    """Reference filter: plain comparisons on one row's metadata"""
+    if organ_filter:
+        organs = (organ_filter,) if isinstance(organ_filter, str) else organ_filter
+        if metadata["organ_type"] not in organs:
+            return False
+    return not tier_filter or metadata["tier"] == tier_filter
+
+
+def _where_matches(metadata: dict, where) -> bool:
+    """Evaluate a Chroma where clause (equality and $and only) on one row"""
+    if where is None:
+        return True
+    if "$and" in where:
+        return all(_where_matches(metadata, clause) for clause in where["$and"])
+    return all(metadata.get(key) == value for key, value in where.items())
+
+
+def _top_ids(index: FilterIndex, query: np.ndarray, rows: list, n_results: int) -> list:
+    """Reference search: score every candidate row, best first"""
+    scores = {i: float(index.embeddings[i] @ query) for i in rows}
+    return [index.ids[i] for i in sorted(rows, key=lambda i: -scores[i])[:n_results]]
+
+
+@pytest.mark.parametrize("organ_filter,tier_filter", FILTERS)
+def test_subset_matches_plain_filter(organ_filter, tier_filter):
+    index = _make_index()
+    expected = [i for i, metadata in enumerate(index.metadatas) if _matches(metadata, organ_filter, tier_filter)]
+
+    rows, matrix = index.subset(organ_filter, tier_filter)
+    assert rows.tolist() == expected
+    np.testing.assert_array_equal(matrix, index.embeddings[expected])
+    assert index.get(organ_filter, tier_filter)["ids"] == [index.ids[i] for i in expected]
+
+    # Second call is served from the subset cache
+    assert index.subset(organ_filter, tier_filter)[0] is rows
+
+
+def test_no_filter_selects_all_rows():
+    index = _make_index()
+    rows, _ = index.subset(None, None)
+    assert rows.tolist() == list(range(len(index)))
+
+
+@pytest.mark.parametrize("organ_filter,tier_filter", FILTERS)
+def test_query_matches_plain_search(organ_filter, tier_filter):
+    index = _make_index()
+    queries = index.embeddings[[0, 7, 33]] + 0.1
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    expected_rows = [i for i, metadata in enumerate(index.metadatas) if _matches(metadata, organ_filter, tier_filter)]
+
+    results = index.query(queries, n_results=5, organ_filter=organ_filter, tier_filter=tier_filter)
+    assert len(results["ids"]) == len(queries)
+    for q, query in enumerate(queries):
+        assert results["ids"][q] == _top_ids(index, query, expected_rows, 5)
+        assert all(_matches(metadata, organ_filter, tier_filter) for metadata in results["metadatas"][q])
+        assert results["distances"][q] == sorted(results["distances"][q])
+
+
+def test_query_rows_searches_each_querys_candidates():
+    index = _make_index()
+    queries = index.embeddings[[3, 10]]
+    candidates = [
+        np.array([i for i, m in enumerate(index.metadatas) if _matches(m, "liver", None)]),
+        np.array([i for i, m in enumerate(index.metadatas) if _matches(m, None, "Tier 6: Emerging")]),
+    ]
+
+    results = index.query_rows(queries, n_results=4, rows=candidates)
+    for q, query in enumerate(queries):
+        assert results["ids"][q] == _top_ids(index, query, candidates[q].tolist(), 4)
+
+    # Fewer candidates than n_results, and none at all
+    results = index.query_rows(queries, n_results=4, rows=[candidates[0][:2], np.array([], dtype=int)])
+    assert len(results["ids"][0]) == 2
+    assert results["ids"][1] == []
+
+
+@pytest.mark.parametrize("organ_filter,tier_filter", [("lung", None), (None, "Tier 9: Unknown"), ("kidney", "Tier 9")])
+def test_unknown_value_raises(organ_filter, tier_filter):
+    index = _make_index()
+    with pytest.raises(ValueError, match="Unknown"):
+        index.subset(organ_filter, tier_filter)
+    with pytest.raises(ValueError):
+        index.query(index.embeddings[:1], n_results=3, organ_filter=organ_filter, tier_filter=tier_filter)
+
+
+@pytest.mark.parametrize("organ_filter,tier_filter", [f for f in FILTERS if not isinstance(f[0], tuple)])
+def test_build_filter_matches_filter_index(organ_filter, tier_filter):
+    """The Chroma where clause (used without a FilterIndex) selects the same rows"""
+    index = _make_index()
+    where = MedicalRetriever._build_filter(None, organ_filter, tier_filter)
+    if organ_filter and tier_filter:
+        assert where == {"$and": [{"organ_type": organ_filter}, {"tier": tier_filter}]}
+
+    rows, _ = index.subset(organ_filter, tier_filter)
+    expected = [i for i, metadata in enumerate(index.metadatas) if _where_matches(metadata, where)]
+    assert rows.tolist() == expected
+
+
+def test_build_filter_single_and_no_condition():
+    assert MedicalRetriever._build_filter(None, None, None) is None
+    assert MedicalRetriever._build_filter(None, "kidney", None) == {"organ_type": "kidney"}
+    assert MedicalRetriever._build_filter(None, None, "Tier 2: Kidney") == {"tier": "Tier 2: Kidney"}